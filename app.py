@@ -1,16 +1,67 @@
 import logging
-from flask import Flask, render_template, request, jsonify
+import time
+import zlib
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
+from werkzeug.wsgi import wrap_file
+from flask.json.provider import DefaultJSONProvider
 from tracker.config import load_config, DEFAULT_CONFIG
-from tracker.api import fetch_flightaware, fetch_flightradar24
-from tracker.local import fetch_local_data
-from tracker.core import deconflict_data
-from tracker.geo import haversine_distance, calculate_az_el
+from tracker.ingest import get_engine, diff_snapshots, area_key
+from tracker.tracks import FIELDS as TRACK_FIELDS
+from tracker.recorder import check_window
+from tracker.flight import Flight
+from tracker.encoding import encode_snapshot, negotiate, dumps, full_body
+from tracker.receivers import get_network
+from tracker import metrics
+from tracker.profiling import Stopwatch, CaptureBusy, capture_cprofile, sample_stacks
+from tracker.shared import SnapshotReader, shared_directory
+from tracker.view import parse_bounds, select_flights, MAX_ZOOM
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+class FlightJSONProvider(DefaultJSONProvider):
+    """
+    Serializes Flight records as the plain dicts they replace.
+    """
+    @staticmethod
+    def default(o):
+        if isinstance(o, Flight):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
 app = Flask(__name__)
+app.json = FlightJSONProvider(app)
+
+# Seconds between keepalive comments on an idle event stream
+STREAM_KEEPALIVE_S = 15
+
+# Endpoints that need the in-process ingestion engine's state, which worker
+# processes do not have
+ENGINE_ENDPOINTS = {"get_track", "get_tracks", "get_recordings", "get_receivers", "get_metrics"}
+
+_reader = None
+
+def shared_reader():
+    """
+    The SnapshotReader when this process is a worker (`server.mode: worker`)
+    serving snapshots published by `python -m tracker.shared`, else None.
+    """
+    global _reader
+    config = load_config()
+    if config.get('server', {}).get('mode', 'single') != 'worker':
+        return None
+    directory = shared_directory(config)
+    if _reader is None or _reader.directory != directory:
+        _reader = SnapshotReader(directory)
+    return _reader
+
+@app.before_request
+def reject_engine_endpoints_in_workers():
+    engine_only = request.endpoint in ENGINE_ENDPOINTS or (
+        request.endpoint == "capture_profile" and request.args.get('mode') == "cprofile")
+    if engine_only and shared_reader():
+        return jsonify({"messages": ["Not available from worker processes"]}), 503
 
 @app.route('/')
 def index():
@@ -25,50 +76,299 @@ def index():
                           default_lon=config['observer']['longitude'],
                           default_radius=config['observer']['radius_nm'])
 
+def parse_area_args():
+    return float(request.args.get('lat')), float(request.args.get('lon')), float(request.args.get('radius'))
+
+def parse_view_args():
+    """
+    Returns (bounds, zoom, limit) from the optional `bounds`
+    ("south,west,north,east"), `zoom` and `limit` arguments, or None when
+    the client asked for the whole area.
+    """
+    bounds = request.args.get('bounds')
+    zoom = request.args.get('zoom')
+    limit = request.args.get('limit')
+    if bounds is None and zoom is None and limit is None:
+        return None
+    bounds = parse_bounds(bounds) if bounds is not None else None
+    zoom = int(zoom) if zoom is not None else None
+    limit = int(limit) if limit is not None else None
+    if zoom is not None and not 0 <= zoom <= MAX_ZOOM:
+        raise ValueError(f"zoom out of range: {zoom}")
+    if limit is not None and not 0 < limit <= load_config().get('view', {}).get('max_limit', 5000):
+        raise ValueError(f"limit out of range: {limit}")
+    return (bounds, zoom, limit)
+
+def view_body(snapshot, view, ref_lat):
+    bounds, zoom, limit = view
+    flights, clusters = select_flights(snapshot.flights, ref_lat, bounds, zoom, limit, load_config().get('view'))
+    return {"version": snapshot.version, "flights": flights, "clusters": clusters,
+            "total": len(snapshot.flights), "messages": list(snapshot.messages), "usage": list(snapshot.usage)}
+
+def view_variant(snapshot, view, ref_lat):
+    """
+    Returns (encoding cache variant, body builder, ETag suffix) for a view.
+    """
+    tag = f"v{zlib.crc32(repr(view).encode()):08x}"
+    return ("view",) + view, (lambda: view_body(snapshot, view, ref_lat)), tag
+
 @app.route('/api/flights')
 def get_flights():
-    # Load config (cached)
-    config = load_config()
-
     try:
-        lat = float(request.args.get('lat'))
-        lon = float(request.args.get('lon'))
-        radius = float(request.args.get('radius'))
+        lat, lon, radius = parse_area_args()
+        view = parse_view_args()
     except (TypeError, ValueError):
         return jsonify({"flights": [], "messages": ["Invalid parameters"]}), 400
 
-    local_data, local_errors = fetch_local_data()
-    fa_data, fa_errors = fetch_flightaware(lat, lon, radius)
-    fr24_data, fr24_errors = fetch_flightradar24(lat, lon, radius)
+    reader = shared_reader()
+    if reader:
+        return shared_flights(reader, area_key(lat, lon, radius))
+
+    # Sources are polled by the background ingestion engine; requests only
+    # read the latest published snapshot for their area.
+    engine = get_engine()
+    snapshot = engine.get_snapshot(lat, lon, radius)
+    if snapshot.version == 0:
+        return jsonify({"flights": [], "messages": list(snapshot.messages), "version": 0})
+
+    # since=<version> returns only what changed relative to that snapshot, as
+    # long as it is still inside the server's recent-version window. A view
+    # (bounds / zoom / limit) always gets a full body.
+    since = request.args.get('since', type=int)
+    base = engine.get_version(lat, lon, radius, since) if since and not view else None
+    etag = f"{since}-{snapshot.version}" if base else str(snapshot.version)
+
+    # Each snapshot is encoded (and compressed) once; every client polling
+    # it is sent the same cached bytes.
+    if view:
+        variant, build, tag = view_variant(snapshot, view, lat)
+        etag = f"{etag}-{tag}"
+    elif base:
+        variant = ("delta", since)
+        build = lambda: {"version": snapshot.version, "since": since, **diff_snapshots(base, snapshot),
+                         "messages": list(snapshot.messages), "usage": list(snapshot.usage)}
+    else:
+        variant, build = ("full",), lambda: full_body(snapshot)
+
+    if request.args.get('profile') == '1':
+        if not load_config().get('profiling', {}).get('request_profile', False):
+            return jsonify({"flights": [], "messages": ["Request profiling is disabled"]}), 403
+        return profiled_response(snapshot, build)
+
+    body, encoding = encode_snapshot(snapshot, variant, build, negotiate(request.accept_encodings),
+                                     load_config().get('encoding'))
+    if encoding:
+        etag = f"{etag}-{encoding}" # Each content coding is a distinct representation
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    return response
+
+def shared_flights(reader, area):
+    """
+    Worker mode: sends the area's snapshot file as published by the
+    ingestion process, without reading the body into Python. `since` and
+    `profile` are ignored; clients always get the full body.
+    """
+    timeout = load_config().get('ingest', {}).get('first_snapshot_timeout_s', 15)
+    snapshot = reader.wait(area, None, timeout, negotiate(request.accept_encodings))
+    if snapshot is None:
+        return jsonify({"flights": [], "messages": ["Waiting for first data cycle"], "version": 0})
+
+    # The publisher's epoch keeps ETags unique across its restarts
+    etag = snapshot.tag
+    if snapshot.coding:
+        etag = f"{etag}-{snapshot.coding}"
+    if request.if_none_match.contains(etag):
+        snapshot.close()
+        response = Response(status=304)
+    else:
+        # A file body lets the server use sendfile(2) when it supports it
+        response = Response(wrap_file(request.environ, snapshot.file), mimetype='application/json',
+                            direct_passthrough=True)
+        response.content_length = snapshot.length
+        if snapshot.coding:
+            response.headers['Content-Encoding'] = snapshot.coding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    return response
 
-    clean_data = deconflict_data(fa_data, fr24_data, local_data)
+def profiled_response(snapshot, build):
+    """
+    The response body plus a `profile` of the cycle that built the snapshot
+    and of this request's own serialization. Never cached or compressed.
+    """
+    with Stopwatch() as build_time:
+        body = build()
+    with Stopwatch() as serialize_time:
+        size = len(dumps(body))
+    body["profile"] = {
+        **snapshot.profile,
+        "snapshot_age_s": round(time.time() - snapshot.created, 3),
+        "request": {
+            "build": build_time.as_dict(),
+            "serialize": serialize_time.as_dict(bytes=size),
+        },
+    }
+    response = Response(dumps(body), mimetype='application/json')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
-    obs_alt = config['observer'].get('altitude_m', 0)
+@app.route('/api/tracks/<hex_id>')
+def get_track(hex_id):
+    try:
+        since = float(request.args['since']) if 'since' in request.args else None
+    except ValueError:
+        return jsonify({"messages": ["Invalid parameters"]}), 400
+
+    hex_id = hex_id.strip().lower()
+    points = get_engine().tracks.get(hex_id, since)
+    if points is None:
+        return jsonify({"hex_id": hex_id, "fields": list(TRACK_FIELDS), "points": [], "messages": ["Unknown aircraft"]}), 404
+    return jsonify({"hex_id": hex_id, "fields": list(TRACK_FIELDS), "points": points})
+
+@app.route('/api/tracks')
+def get_tracks():
+    try:
+        since = float(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({"tracks": {}, "messages": ["Invalid parameters"]}), 400
+
+    return jsonify({"fields": list(TRACK_FIELDS), "tracks": get_engine().tracks.since(since)})
+
+@app.route('/api/recordings')
+def get_recordings():
+    recorder = get_engine().recorder
+    if recorder is None:
+        return jsonify({"records": [], "messages": ["Recorder is disabled"]}), 404
+    conf = load_config().get('recorder', {})
+    try:
+        start = float(request.args.get('start'))
+        end = float(request.args.get('end'))
+        check_window(start, end)
+        limit = int(request.args.get('limit', conf.get('max_query_records', 100000)))
+    except (TypeError, ValueError):
+        return jsonify({"records": [], "messages": ["Invalid parameters"]}), 400
+    max_query_s = conf.get('max_query_s', 86400)
+    if end - start > max_query_s:
+        return jsonify({"records": [], "messages": [f"Window longer than {max_query_s}s"]}), 400
+    if not 0 < limit <= conf.get('max_query_records', 100000):
+        return jsonify({"records": [], "messages": ["Invalid parameters"]}), 400
+
+    # One extra record tells a full page from a truncated one
+    records = recorder.query(start, end, request.args.get('hex_id'), limit + 1)
+    if len(records) > limit:
+        return jsonify({"records": records[:limit], "truncated": True,
+                        "messages": [f"Truncated to {limit} records"]})
+    return jsonify({"records": records, "truncated": False})
+
+@app.route('/api/receivers')
+def get_receivers():
+    return jsonify({"receivers": get_network().health()})
+
+@app.route('/metrics')
+def get_metrics():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
-    # Calculate distance and Az/El for each flight
-    for f in clean_data:
-        if f['lat'] is not None and f['lon'] is not None:
-             f['distance_from_obs'] = haversine_distance(lat, lon, f['lat'], f['lon'])
+@app.route('/admin/profile')
+def capture_profile():
+    """
+    Profiles live traffic for `seconds` and returns the dump: `mode=sample`
+    (default) samples every thread's stack into collapsed flamegraph text,
+    `mode=cprofile` profiles the ingestion engine into a pstats file.
+    """
+    conf = load_config().get('profiling', {})
+    if not conf.get('capture_enabled', False):
+        return jsonify({"messages": ["Profile capture is disabled"]}), 403
+    token = conf.get('admin_token')
+    if token and request.headers.get('X-Admin-Token') != token:
+        return jsonify({"messages": ["Invalid admin token"]}), 403
 
-             # Calculate Azimuth and Elevation
-             # Aircraft altitude is usually in feet in our normalized data (from FR24/FA/Local)
-             # We need to convert it to meters for the calculation.
-             # f['altitude'] is feet.
-             ac_alt_m = (f.get('altitude', 0) or 0) * 0.3048
+    mode = request.args.get('mode', 'sample')
+    seconds = request.args.get('seconds', 10, type=float)
+    if mode not in ("sample", "cprofile") or not 0 < seconds <= conf.get('max_capture_s', 60):
+        return jsonify({"messages": ["Invalid parameters"]}), 400
 
-             az, el = calculate_az_el(lat, lon, obs_alt, f['lat'], f['lon'], ac_alt_m)
-             f['azimuth'] = az
-             f['elevation'] = el
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    try:
+        if mode == "cprofile":
+            response = Response(capture_cprofile(seconds), mimetype='application/octet-stream')
+            filename = f"tracker-{stamp}.pstats"
         else:
-             f['distance_from_obs'] = float('inf')
-             f['azimuth'] = 0
-             f['elevation'] = 0
+            stacks = sample_stacks(seconds, conf.get('sample_interval_ms', 5) / 1000)
+            response = Response(stacks, mimetype='text/plain')
+            filename = f"tracker-{stamp}.collapsed"
+    except CaptureBusy:
+        return jsonify({"messages": ["Another capture is already running"]}), 409
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@app.route('/api/stream')
+def stream_flights():
+    """
+    Server-Sent Events stream pushing every new snapshot for the area.
+    """
+    try:
+        lat, lon, radius = parse_area_args()
+        view = parse_view_args()
+    except (TypeError, ValueError):
+        return jsonify({"flights": [], "messages": ["Invalid parameters"]}), 400
+
+    reader = shared_reader()
+    if reader:
+        return event_stream(shared_events(reader, area_key(lat, lon, radius)))
+
+    engine = get_engine()
+
+    def events():
+        version = 0
+        while True:
+            snapshot = engine.wait_for_snapshot(lat, lon, radius, version, STREAM_KEEPALIVE_S)
+            if snapshot is None or snapshot.version <= version:
+                # Comment line keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            version = snapshot.version
+            # Shares the encoded body with /api/flights
+            if view:
+                variant, build, _ = view_variant(snapshot, view, lat)
+            else:
+                variant, build = ("full",), lambda: full_body(snapshot)
+            payload, _ = encode_snapshot(snapshot, variant, build)
+            yield b"id: %d\nevent: flights\ndata: %s\n\n" % (version, payload)
+
+    return event_stream(events())
+
+def shared_events(reader, area):
+    """
+    Worker mode: events from the snapshot files of the ingestion process.
+    """
+    tag = None
+    while True:
+        snapshot = reader.wait(area, tag, STREAM_KEEPALIVE_S)
+        if snapshot is None or snapshot.tag == tag:
+            if snapshot is not None:
+                snapshot.close()
+            yield ": keepalive\n\n"
+            continue
+        with snapshot.file:
+            payload = snapshot.file.read(snapshot.length)
+        tag = snapshot.tag
+        yield b"id: %s\nevent: flights\ndata: %s\n\n" % (tag.encode(), payload)
 
-    return jsonify({"flights": clean_data, "messages": local_errors + fa_errors + fr24_errors})
+def event_stream(events):
+    return Response(stream_with_context(events), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 if __name__ == '__main__':
     config = load_config()
     host = config['server']['host']
     port = config['server']['port']
     logger.info(f"Starting Flight Tracker on http://{host}:{port}")
-    app.run(host=host, port=port, debug=True)
+    app.run(host=host, port=port, debug=True, threaded=True)
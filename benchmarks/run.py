@@ -0,0 +1,148 @@
+"""
+Pipeline benchmark.
+
+    python -m benchmarks.run --sizes 100 1000 10000 --output bench_results.json
+    python -m benchmarks.run --compare bench_results.json
+
+Times normalization, deconfliction, geo enrichment, JSON serialization and gzip
+separately on synthetic multi-source traffic and writes machine-readable
+results so runs from different commits can be compared.
+"""
+import argparse
+import copy
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from benchmarks.synthetic import generate_sources
+from tracker.api import normalize_fa_response, normalize_fr24_response
+from tracker.core import Deconflictor, deconflict_data
+from tracker.encoding import DEFAULT_ENCODING, compress, dumps
+from tracker.ingest import enrich_flights
+from tracker.local import normalize_aircraft_json
+
+DEFAULT_SIZES = (100, 1000, 5000, 20000, 50000)
+CENTER = (39.0, -75.0)
+
+def _timed(fn, repeat, setup=None):
+    """
+    Runs `fn(setup())` `repeat` times, returning (durations, last result).
+    Setup time is excluded from the measurement.
+    """
+    durations, result = [], None
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        result = fn(arg) if setup else fn()
+        durations.append(time.perf_counter() - start)
+    return durations, result
+
+def _summary(durations):
+    return {"min_s": min(durations), "median_s": statistics.median(durations),
+            "mean_s": statistics.fmean(durations), "runs": len(durations)}
+
+def bench_size(n, repeat, seed=0):
+    aircraft_json, fa_response, fr24_response = generate_sources(n, seed=seed, center=CENTER)
+    stages = {}
+
+    def normalize():
+        return (normalize_aircraft_json(aircraft_json, "Local (1090)"),
+                normalize_fa_response(fa_response),
+                normalize_fr24_response(fr24_response))
+    durations, (local, fa, fr24) = _timed(normalize, repeat)
+    stages["normalize"] = _summary(durations)
+
+    # deconflict_data and enrich_flights mutate their input, so each run gets fresh copies
+    durations, merged = _timed(lambda inputs: deconflict_data(*inputs), repeat,
+                               setup=lambda: copy.deepcopy((fa, fr24, local)))
+    stages["deconflict"] = _summary(durations)
+
+    # Steady state: the same traffic again, with associations already learned
+    deconflictor = Deconflictor()
+    for _ in range(Deconflictor.ASSOCIATION_MIN_CONFIDENCE):
+        deconflictor.merge(*copy.deepcopy((fa, fr24, local)))
+    durations, _ = _timed(lambda inputs: deconflictor.merge(*inputs), repeat,
+                          setup=lambda: copy.deepcopy((fa, fr24, local)))
+    stages["deconflict_warm"] = _summary(durations)
+
+    durations, enriched = _timed(lambda flights: enrich_flights(flights, CENTER[0], CENTER[1], 0), repeat,
+                                 setup=lambda: copy.deepcopy(merged))
+    stages["enrich"] = _summary(durations)
+
+    body = {"flights": enriched, "messages": []}
+    durations, encoded = _timed(lambda: dumps(body), repeat)
+    stages["serialize"] = _summary(durations)
+
+    durations, compressed = _timed(lambda: compress(encoded, "gzip", DEFAULT_ENCODING), repeat)
+    stages["gzip"] = _summary(durations)
+
+    return {
+        "aircraft": n,
+        "inputs": {"local": len(local), "flightaware": len(fa), "flightradar24": len(fr24)},
+        "merged": len(merged),
+        "payload_bytes": len(encoded),
+        "gzip_bytes": len(compressed),
+        "stages": stages,
+    }
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(baseline, current):
+    """
+    Prints median-time ratios (current / baseline) per size and stage.
+    """
+    base = {r["aircraft"]: r for r in baseline["results"]}
+    for result in current["results"]:
+        old = base.get(result["aircraft"])
+        if not old:
+            continue
+        for stage, timing in result["stages"].items():
+            if stage in old["stages"]:
+                ratio = timing["median_s"] / old["stages"][stage]["median_s"]
+                print(f"{result['aircraft']:>6} {stage:<10} {ratio:6.2f}x")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    # Read the baseline first: it may be the file this run overwrites
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = []
+    for n in args.sizes:
+        result = bench_size(n, args.repeat, args.seed)
+        results.append(result)
+        timings = "  ".join(f"{k}={v['median_s'] * 1000:.1f}ms" for k, v in result["stages"].items())
+        print(f"{n:>6} aircraft  merged={result['merged']:<6} {timings}")
+
+    report = {
+        "commit": _git_commit(),
+        "created": time.time(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if baseline:
+        compare(baseline, report)
+
+if __name__ == "__main__":
+    main()
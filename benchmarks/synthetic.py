@@ -0,0 +1,89 @@
+import math
+import random
+from datetime import datetime, timezone
+from tracker.geo import EARTH_RADIUS_NM
+
+def _offset(lat, lon, distance_nm, bearing_deg):
+    """
+    Moves a point `distance_nm` along `bearing_deg` (flat-earth, fine for small offsets).
+    """
+    d_lat = distance_nm * math.cos(math.radians(bearing_deg)) / EARTH_RADIUS_NM
+    d_lon = distance_nm * math.sin(math.radians(bearing_deg)) / (EARTH_RADIUS_NM * math.cos(math.radians(lat)))
+    return lat + math.degrees(d_lat), lon + math.degrees(d_lon)
+
+def generate_fleet(n, center=(39.0, -75.0), radius_nm=250, seed=0):
+    """
+    Generates `n` ground-truth aircraft spread uniformly over a disc.
+    """
+    rng = random.Random(seed)
+    fleet = []
+    hex_ids = rng.sample(range(0x100000, 0xFFFFFF), n)
+    for i, hex_int in enumerate(hex_ids):
+        distance = radius_nm * math.sqrt(rng.random())
+        lat, lon = _offset(center[0], center[1], distance, rng.uniform(0, 360))
+        fleet.append({
+            "hex": f"{hex_int:06x}",
+            "callsign": f"{rng.choice(['UAL', 'DAL', 'AAL', 'SWA', 'JBU', 'N'])}{rng.randint(1, 9999)}",
+            "lat": lat, "lon": lon,
+            "altitude": rng.randint(0, 450) * 100,
+            "speed": rng.randint(80, 550),
+            "heading": rng.randint(0, 359),
+            "type": rng.choice(["B738", "A320", "E75L", "C172", "B77W"]),
+        })
+    return fleet
+
+def generate_sources(n, local_fraction=0.8, fa_fraction=0.6, fr24_fraction=0.7,
+                     missing_hex_fraction=0.1, callsign_mismatch_fraction=0.05,
+                     position_jitter_nm=1.0, now=1700000000, seed=0, **fleet_args):
+    """
+    Builds raw source payloads for a synthetic fleet of `n` aircraft.
+
+    Each source sees a random subset of the fleet (the fractions control
+    overlap). FlightAware always keys by ident, so it never hex-matches local
+    data; FR24 drops the hex for `missing_hex_fraction` of its aircraft and
+    reports a different callsign for `callsign_mismatch_fraction`. Remote
+    positions are jittered by up to `position_jitter_nm` to produce spatial
+    near-duplicates.
+
+    Returns (aircraft_json, fa_response, fr24_response) in the same shapes the
+    real receiver and APIs return.
+    """
+    rng = random.Random(seed + 1)
+    fleet = generate_fleet(n, seed=seed, **fleet_args)
+
+    def jittered(a):
+        return _offset(a["lat"], a["lon"], rng.uniform(0, position_jitter_nm), rng.uniform(0, 360))
+
+    aircraft = []
+    for a in fleet:
+        if rng.random() < local_fraction:
+            aircraft.append({
+                "hex": a["hex"], "flight": f"{a['callsign']:<8}", "lat": a["lat"], "lon": a["lon"],
+                "alt_baro": a["altitude"], "gs": a["speed"], "track": a["heading"],
+                "category": "A3", "seen": round(rng.uniform(0, 30), 1)
+            })
+
+    fa_flights = []
+    for a in fleet:
+        if rng.random() < fa_fraction:
+            lat, lon = jittered(a)
+            ts = datetime.fromtimestamp(now - rng.randint(0, 60), timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            fa_flights.append({
+                "ident": a["callsign"], "aircraft_type": a["type"],
+                "last_position": {"latitude": lat, "longitude": lon, "altitude": a["altitude"] // 100,
+                                  "groundspeed": a["speed"], "heading": a["heading"], "timestamp": ts}
+            })
+
+    fr24_data = []
+    for a in fleet:
+        if rng.random() < fr24_fraction:
+            lat, lon = jittered(a)
+            callsign = a["callsign"] if rng.random() >= callsign_mismatch_fraction else f"X{a['callsign']}"
+            fr24_data.append({
+                "hex": None if rng.random() < missing_hex_fraction else a["hex"].upper(),
+                "callsign": callsign, "lat": lat, "lon": lon, "alt": a["altitude"],
+                "gs": a["speed"], "track": a["heading"], "type": a["type"],
+                "updated": now - rng.randint(0, 60)
+            })
+
+    return {"now": now, "aircraft": aircraft}, {"flights": fa_flights}, {"data": fr24_data}
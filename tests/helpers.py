@@ -0,0 +1,18 @@
+# Fixtures shared by the engine-driven test modules
+
+def make_flight(hex_id, source, lat=40.0, lon=-74.0, ts=1000):
+    return {
+        "source": source, "hex_id": hex_id, "callsign": hex_id,
+        "lat": lat, "lon": lon, "heading": 90, "altitude": 10000,
+        "speed": 300, "type": "B738", "timestamp": ts
+    }
+
+class CountingFetcher:
+    def __init__(self, flights, errors=None):
+        self.flights = flights
+        self.errors = errors or []
+        self.calls = 0
+
+    def __call__(self, area):
+        self.calls += 1
+        return list(self.flights), list(self.errors)
@@ -0,0 +1,110 @@
+import unittest
+import gzip
+import os
+import sys
+from unittest.mock import patch
+
+# Add parent dir to path to import tracker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as tracker_app
+from tracker.ingest import Snapshot
+from tracker.flight import Flight
+from tracker.tracks import TrackStore
+
+def make_flight(hex_id, lat=40.0, ts=1000):
+    return {"source": "Local (1090)", "hex_id": hex_id, "lat": lat, "lon": -74.0, "timestamp": ts}
+
+class FakeEngine:
+    def __init__(self, *snapshots):
+        self.history = {s.version: s for s in snapshots}
+        self.current = snapshots[-1]
+        self.tracks = TrackStore()
+        for s in snapshots:
+            self.tracks.record(s.flights, now=s.version)
+
+    def get_snapshot(self, lat, lon, radius_nm):
+        return self.current
+
+    def get_version(self, lat, lon, radius_nm, version):
+        return self.history.get(version)
+
+class TestFlightsEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.v1 = Snapshot(1, 0, (), (make_flight("aaa"), make_flight("bbb")), ())
+        self.v2 = Snapshot(2, 0, (), (make_flight("aaa", 40.1, 1010), make_flight("ccc")), ())
+        patcher = patch('app.get_engine', return_value=FakeEngine(self.v1, self.v2))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = tracker_app.app.test_client()
+        self.url = '/api/flights?lat=40&lon=-74&radius=50'
+
+    def test_full_response_has_version_and_etag(self):
+        r = self.client.get(self.url)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json['version'], 2)
+        self.assertEqual(len(r.json['flights']), 2)
+        self.assertEqual(r.headers['ETag'], '"2"')
+
+    def test_flight_records_serialize_like_dicts(self):
+        as_dict = {"source": "Local (1090)", "hex_id": "aaa", "callsign": "aaa", "lat": 40.0, "lon": -74.0,
+                   "heading": 0, "altitude": 1000, "speed": 100, "type": "A1", "timestamp": 1000,
+                   "distance_from_obs": 1.0, "azimuth": 2.0, "elevation": 3.0}
+        bodies = []
+        for flight in (as_dict, Flight.from_dict(as_dict)):
+            with patch('app.get_engine', return_value=FakeEngine(Snapshot(3, 0, (), (flight,), ()))):
+                bodies.append(self.client.get(self.url).data)
+        self.assertEqual(bodies[0], bodies[1])
+
+    def test_gzip_response_is_encoded_once(self):
+        flights = tuple(make_flight(f"{i:06x}") for i in range(100))
+        engine = FakeEngine(Snapshot(3, 0, (), flights, ()))
+        with patch('app.get_engine', return_value=engine):
+            plain = self.client.get(self.url)
+            with patch('tracker.encoding.dumps') as dumps:
+                zipped = self.client.get(self.url, headers={'Accept-Encoding': 'gzip'})
+                dumps.assert_not_called() # Reuses the identity encoding of the first request
+            again = self.client.get(self.url, headers={'Accept-Encoding': 'gzip'})
+            cached = self.client.get(self.url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': '"3-gzip"'})
+
+        self.assertEqual(zipped.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(zipped.headers['ETag'], '"3-gzip"')
+        self.assertIn('Accept-Encoding', zipped.headers['Vary'])
+        self.assertEqual(gzip.decompress(zipped.data), plain.data)
+        self.assertEqual(again.data, zipped.data)
+        self.assertEqual(cached.status_code, 304)
+
+    def test_if_none_match_returns_304(self):
+        r = self.client.get(self.url, headers={'If-None-Match': '"2"'})
+        self.assertEqual(r.status_code, 304)
+        self.assertEqual(r.data, b'')
+
+    def test_since_returns_delta(self):
+        r = self.client.get(self.url + '&since=1')
+        self.assertEqual(r.json['since'], 1)
+        self.assertEqual([f['hex_id'] for f in r.json['added']], ["ccc"])
+        self.assertEqual([f['hex_id'] for f in r.json['updated']], ["aaa"])
+        self.assertEqual(r.json['removed'], ["bbb"])
+        self.assertNotIn('flights', r.json)
+
+    def test_since_outside_window_falls_back_to_full(self):
+        r = self.client.get(self.url + '&since=99')
+        self.assertEqual(len(r.json['flights']), 2)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/flights?lat=x').status_code, 400)
+
+    def test_track_endpoints(self):
+        r = self.client.get('/api/tracks/aaa')
+        self.assertEqual(r.json['fields'][:3], ["timestamp", "lat", "lon"])
+        self.assertEqual([p[1] for p in r.json['points']], [40.0, 40.1])
+        self.assertEqual(self.client.get('/api/tracks/zzz').status_code, 404)
+        r = self.client.get('/api/tracks/AAA')
+        self.assertEqual((r.status_code, r.json['hex_id']), (200, "aaa"))
+
+        r = self.client.get('/api/tracks?since=1005')
+        self.assertEqual(list(r.json['tracks']), ["aaa"])
+
+if __name__ == '__main__':
+    unittest.main()
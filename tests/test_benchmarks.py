@@ -0,0 +1,36 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+
+# Add parent dir to path to import tracker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.synthetic import generate_sources
+from benchmarks import run
+
+class TestSyntheticTraffic(unittest.TestCase):
+
+    def test_overlap_fractions(self):
+        aircraft_json, fa, fr24 = generate_sources(2000, local_fraction=0.5, fa_fraction=0.0,
+                                                   fr24_fraction=1.0, missing_hex_fraction=1.0)
+        self.assertAlmostEqual(len(aircraft_json['aircraft']) / 2000, 0.5, delta=0.05)
+        self.assertEqual(fa['flights'], [])
+        self.assertEqual(len(fr24['data']), 2000)
+        self.assertTrue(all(f['hex'] is None for f in fr24['data']))
+
+    def test_deterministic(self):
+        self.assertEqual(generate_sources(50, seed=3), generate_sources(50, seed=3))
+
+    def test_run_writes_results(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "results.json")
+            run.main(["--sizes", "50", "--repeat", "1", "--output", output])
+            with open(output) as f:
+                report = json.load(f)
+        stages = report['results'][0]['stages']
+        self.assertEqual(set(stages), {"normalize", "deconflict", "deconflict_warm", "enrich", "serialize", "gzip"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import yaml
+
+# Add parent dir to path to import tracker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tracker.config import ConfigStore, DEFAULT_CONFIG, merge_defaults, validate_config
+from tracker.watcher import get_watcher
+
+class TestConfigStore(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.path = os.path.join(self.test_dir, "config.yaml")
+        self.store = ConfigStore(self.path)
+
+    def write(self, config):
+        with open(self.path, 'w') as f:
+            yaml.safe_dump(config, f)
+
+    def test_missing_file_is_created_with_defaults(self):
+        config = self.store.current()
+        self.assertTrue(os.path.exists(self.path))
+        self.assertEqual(config['observer']['radius_nm'], DEFAULT_CONFIG['observer']['radius_nm'])
+        self.assertIs(self.store.current(), config)
+
+    def test_snapshot_is_read_only(self):
+        self.write({"local_sources": {"receivers": [{"name": "north", "source": "/n"}]}})
+        config = self.store.current()
+        with self.assertRaises(TypeError):
+            config['observer']['radius_nm'] = 10
+        self.assertIsInstance(config['local_sources']['receivers'], tuple)
+
+    def test_nested_defaults_are_merged(self):
+        self.write({"observer": {"latitude": 51.5}, "ingest": None})
+        config = self.store.current()
+        self.assertEqual(config['observer']['latitude'], 51.5)
+        self.assertEqual(config['observer']['radius_nm'], 50)
+        self.assertEqual(config['ingest']['fetch_budget_s'], DEFAULT_CONFIG['ingest']['fetch_budget_s'])
+
+    def test_invalid_reload_keeps_previous_snapshot(self):
+        self.write({"observer": {"radius_nm": 25}})
+        config = self.store.current()
+        for bad in ({"observer": {"radius_nm": "far"}}, {"tracks": True}, "not: [valid", ""):
+            if isinstance(bad, str):
+                with open(self.path, 'w') as f:
+                    f.write(bad)
+            else:
+                self.write(bad)
+            self.assertFalse(self.store.reload())
+            self.assertIs(self.store.current(), config)
+
+    def test_reload_notifies_subscribers(self):
+        self.write({"observer": {"radius_nm": 25}})
+        self.store.current()
+        changes = []
+        self.store.subscribe(lambda old, new: changes.append((old['observer']['radius_nm'], new['observer']['radius_nm'])))
+
+        self.assertFalse(self.store.reload()) # Unchanged
+        self.write({"observer": {"radius_nm": 80}})
+        self.assertTrue(self.store.reload())
+        self.assertEqual(changes, [(25, 80)])
+
+    @unittest.skipIf(get_watcher() is None, "inotify unavailable")
+    def test_file_change_is_picked_up_by_watcher(self):
+        self.write({"observer": {"radius_nm": 25}})
+        self.store.current()
+        reloaded = threading.Event()
+        self.store.subscribe(lambda old, new: reloaded.set())
+
+        self.write({"observer": {"radius_nm": 30}})
+        self.assertTrue(reloaded.wait(5))
+        self.assertEqual(self.store.current()['observer']['radius_nm'], 30)
+
+class TestValidation(unittest.TestCase):
+
+    def test_defaults_are_valid(self):
+        self.assertEqual(validate_config(merge_defaults({})), [])
+
+    def test_type_errors(self):
+        config = merge_defaults({"ingest": {"max_workers": "8"}, "recorder": {"enabled": 1},
+                                 "api_keys": {"google_maps": None}})
+        self.assertEqual(validate_config(config), ["ingest.max_workers must be a number",
+                                                   "recorder.enabled must be true or false"])
+
+    def test_receivers(self):
+        config = merge_defaults({"local_sources": {"receivers": [
+            {"name": "north", "source": "/n"},
+            {"name": "north", "sbs": "host:30003"},
+            {"name": "south", "source": "/s", "beast": "host:30005"},
+            {"source": "/w"},
+        ]}})
+        self.assertEqual(validate_config(config), [
+            "local_sources.receivers[1] repeats the name 'north'",
+            "local_sources.receivers[2] needs exactly one of source, sbs or beast",
+            "local_sources.receivers[3] needs a name",
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
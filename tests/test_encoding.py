@@ -0,0 +1,96 @@
+import unittest
+import gzip
+import json
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+# Add parent dir to path to import tracker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from werkzeug.datastructures import Accept
+from tracker import encoding
+from tracker.encoding import dumps, encode_snapshot, negotiate
+from tracker.flight import Flight
+from tracker.ingest import Snapshot
+
+def make_snapshot(n):
+    flights = tuple(Flight("Local (1090)", f"{i:06x}", f"CALL{i}", 40.0 + i / 1000, -74.0, 90, 30000, 450, "A3", 1000)
+                    for i in range(n))
+    return Snapshot(1, 0.0, (), flights, ("FR24 Error: 500",))
+
+def body_of(snapshot):
+    return {"flights": list(snapshot.flights), "messages": list(snapshot.messages)}
+
+class TestEncoding(unittest.TestCase):
+
+    def test_dumps_flights_like_dicts(self):
+        snapshot = make_snapshot(2)
+        expected = {"flights": [f.to_dict() for f in snapshot.flights], "messages": ["FR24 Error: 500"]}
+        self.assertEqual(json.loads(dumps(body_of(snapshot))), expected)
+
+    def test_stdlib_fallback(self):
+        snapshot = make_snapshot(2)
+        with patch('tracker.encoding.orjson', None):
+            fallback = dumps(body_of(snapshot))
+        self.assertEqual(json.loads(fallback), json.loads(dumps(body_of(snapshot))))
+
+    def test_negotiate(self):
+        self.assertEqual(negotiate(Accept([("gzip", 1), ("deflate", 1)])), "gzip")
+        self.assertIsNone(negotiate(Accept([("deflate", 1)])))
+        self.assertIsNone(negotiate(Accept([])))
+        with patch('tracker.encoding.brotli', object()):
+            self.assertEqual(negotiate(Accept([("gzip", 1), ("br", 1)])), "br")
+
+    def test_encoded_once_per_variant_and_coding(self):
+        snapshot = make_snapshot(200)
+        calls = []
+        def build():
+            calls.append(1)
+            return body_of(snapshot)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(encode_snapshot(snapshot, ("full",), build, "gzip")))
+                   for _ in range(8)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        body, coding = results[0]
+        self.assertEqual(coding, "gzip")
+        plain, plain_coding = encode_snapshot(snapshot, ("full",), build)
+        self.assertIsNone(plain_coding)
+        self.assertEqual(gzip.decompress(body), plain)
+        self.assertEqual(len(calls), 1)
+
+    def test_view_variants_do_not_evict_full_body(self):
+        snapshot = make_snapshot(1)
+        for i in range(encoding.MAX_CACHED_VIEWS + 10):
+            encode_snapshot(snapshot, ("view", i), lambda: body_of(snapshot))
+        self.assertEqual(sum(1 for v, _ in snapshot.encodings if v[0] == "view"), encoding.MAX_CACHED_VIEWS)
+
+        calls = []
+        def build():
+            calls.append(1)
+            return body_of(snapshot)
+        for _ in range(3):
+            encode_snapshot(snapshot, ("full",), build)
+        self.assertEqual(len(calls), 1)
+
+    def test_small_bodies_are_not_compressed(self):
+        snapshot = make_snapshot(1)
+        body, coding = encode_snapshot(snapshot, ("full",), lambda: body_of(snapshot), "gzip")
+        self.assertIsNone(coding)
+        self.assertEqual(json.loads(body)["messages"], ["FR24 Error: 500"])
+
+    @unittest.skipIf(encoding.brotli is None, "brotli not installed")
+    def test_brotli(self):
+        snapshot = make_snapshot(200)
+        body, coding = encode_snapshot(snapshot, ("full",), lambda: body_of(snapshot), "br")
+        self.assertEqual(coding, "br")
+        self.assertEqual(encoding.brotli.decompress(body), encode_snapshot(snapshot, ("full",), None)[0])
+
+if __name__ == '__main__':
+    unittest.main()
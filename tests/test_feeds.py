@@ -0,0 +1,187 @@
+import unittest
+import os
+import socket
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+# Add parent dir to path to import tracker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tracker.feeds import (LiveStateTable, SBSDecoder, BeastDecoder, ModeSDecoder, FeedClient,
+                           parse_sbs_line, split_beast_frames, modes_crc)
+from tracker.local import fetch_local_data, normalize_aircraft_json
+
+SBS_LINES = [
+    "MSG,1,1,1,4CA2D6,1,2024/01/01,12:00:00.000,2024/01/01,12:00:00.000,RYR123  ,,,,,,,,,,,0",
+    "MSG,3,1,1,4CA2D6,1,2024/01/01,12:00:00.100,2024/01/01,12:00:00.100,,35000,,,51.5,-0.12,,,0,0,0,0",
+    "MSG,4,1,1,4CA2D6,1,2024/01/01,12:00:00.200,2024/01/01,12:00:00.200,,,430,92.5,,,-64,,,,,0",
+]
+
+# Reference DF17 messages: identification, even + odd airborne position, velocity
+IDENT = "8D4840D6202CC371C32CE0576098"
+POSITION_ODD = "8D40621D58C386435CC412692AD6"
+POSITION_EVEN = "8D40621D58C382D690C8AC2863A7"
+VELOCITY = "8D485020994409940838175B284F"
+
+def beast_frame(hex_msg, timestamp=0x1a1a1a1a1a1a, signal=0x1a):
+    # Default timestamp and signal contain 0x1a, which must be escaped
+    body = timestamp.to_bytes(6, 'big') + bytes([signal]) + bytes.fromhex(hex_msg)
+    return b'\x1a\x33' + body.replace(b'\x1a', b'\x1a\x1a')
+
+class StandInReceiver:
+    """
+    Accepts one connection and sends canned bytes, like dump1090's net ports.
+    """
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.server = socket.create_server(("127.0.0.1", 0))
+        self.address = f"127.0.0.1:{self.server.getsockname()[1]}"
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        conn, _ = self.server.accept()
+        with conn:
+            # Send in small chunks so messages are split across reads
+            for i in range(0, len(self.payload), 5):
+                conn.sendall(self.payload[i:i + 5])
+            time.sleep(1)
+
+    def close(self):
+        self.server.close()
+
+def wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+class TestSBS(unittest.TestCase):
+
+    def test_parse_lines(self):
+        self.assertEqual(parse_sbs_line(SBS_LINES[0]), ("4CA2D6", {"flight": "RYR123"}))
+        self.assertEqual(parse_sbs_line(SBS_LINES[1]), ("4CA2D6", {"alt_baro": 35000, "lat": 51.5, "lon": -0.12}))
+        self.assertIsNone(parse_sbs_line("STA,,5,179,400AE7,10103"))
+
+    def test_decoder_handles_split_lines(self):
+        table = LiveStateTable()
+        decoder = SBSDecoder(table)
+        data = "\r\n".join(SBS_LINES).encode() + b"\r\n"
+        for i in range(0, len(data), 7):
+            decoder.feed(data[i:i + 7])
+
+        flights = normalize_aircraft_json(table.document(), "Local (SBS)")
+        self.assertEqual(len(flights), 1)
+        f = flights[0]
+        self.assertEqual(f['hex_id'], '4ca2d6')
+        self.assertEqual(f['callsign'], 'RYR123')
+        self.assertEqual((f['lat'], f['lon'], f['altitude'], f['speed'], f['heading']), (51.5, -0.12, 35000, 430, 92.5))
+
+    def test_stale_aircraft_expire(self):
+        now = [1000.0]
+        table = LiveStateTable(clock=lambda: now[0])
+        table.update("abc123", lat=1.0, lon=2.0)
+        now[0] += 61
+        self.assertEqual(table.document()['aircraft'], [])
+        self.assertEqual(len(table), 0)
+
+class TestModeS(unittest.TestCase):
+
+    def setUp(self):
+        self.table = LiveStateTable()
+        self.decoder = ModeSDecoder(self.table)
+
+    def decode(self, hex_msg):
+        self.decoder.decode(bytes.fromhex(hex_msg))
+
+    def test_crc(self):
+        msg = bytes.fromhex(IDENT)
+        self.assertEqual(modes_crc(msg), int.from_bytes(msg[-3:], 'big'))
+
+    def test_identification(self):
+        self.decode(IDENT)
+        self.assertEqual(self.table.get("4840d6")['flight'], "KLM1023")
+
+    def test_position_needs_even_and_odd(self):
+        self.decode(POSITION_ODD)
+        self.assertNotIn('lat', self.table.get("40621d"))
+        self.decode(POSITION_EVEN)
+        aircraft = self.table.get("40621d")
+        self.assertAlmostEqual(aircraft['lat'], 52.2572, places=4)
+        self.assertAlmostEqual(aircraft['lon'], 3.91937, places=4)
+        self.assertEqual(aircraft['alt_baro'], 38000)
+
+    def test_stale_cpr_frames_dropped(self):
+        now = [1000.0]
+        self.table.clock = lambda: now[0]
+        self.decoder = ModeSDecoder(self.table)
+        self.decode(POSITION_ODD)
+        self.assertIn("40621d", self.decoder._cpr)
+        now[0] += 61
+        self.decode(POSITION_EVEN) # Sweeps before storing the new frame
+        self.assertNotIn('lat', self.table.get("40621d")) # Not paired with the stale odd frame
+        self.assertEqual(list(self.decoder._cpr["40621d"]), [0])
+
+    def test_velocity(self):
+        self.decode(VELOCITY)
+        aircraft = self.table.get("485020")
+        self.assertAlmostEqual(aircraft['gs'], 159.2, places=1)
+        self.assertAlmostEqual(aircraft['track'], 182.9, places=1)
+
+    def test_corrupt_message_ignored(self):
+        msg = bytearray.fromhex(IDENT)
+        msg[5] ^= 0x01
+        self.decoder.decode(bytes(msg))
+        self.assertEqual(len(self.table), 0)
+
+class TestBeast(unittest.TestCase):
+
+    def test_escaped_frames_split_across_reads(self):
+        data = beast_frame(IDENT) + b'\x1a\x34' + b'\x00' * 11 + beast_frame(VELOCITY)
+        frames, consumed = split_beast_frames(data[:20])
+        self.assertEqual((frames, consumed), ([], 0))
+
+        frames, consumed = split_beast_frames(data)
+        self.assertEqual(consumed, len(data))
+        self.assertEqual([f[3].hex().upper() for f in frames], [IDENT, VELOCITY])
+        self.assertEqual(frames[0][1], 0x1a1a1a1a1a1a)
+
+    def test_decoder(self):
+        table = LiveStateTable()
+        decoder = BeastDecoder(table)
+        data = b''.join(beast_frame(m) for m in (IDENT, POSITION_ODD, POSITION_EVEN, VELOCITY))
+        for i in range(0, len(data), 3):
+            decoder.feed(data[i:i + 3])
+        self.assertEqual(len(table), 3)
+        self.assertIn('lat', table.get("40621d"))
+
+class TestFeedClient(unittest.TestCase):
+
+    def test_sbs_feed(self):
+        receiver = StandInReceiver(("\r\n".join(SBS_LINES) + "\r\n").encode())
+        self.addCleanup(receiver.close)
+        client = FeedClient(receiver.address, "sbs").start()
+        self.addCleanup(client.stop)
+        self.assertTrue(wait_for(lambda: (client.table.get("4ca2d6") or {}).get('gs') == 430))
+
+    def test_beast_feed_through_fetch_local_data(self):
+        receiver = StandInReceiver(beast_frame(POSITION_ODD) + beast_frame(POSITION_EVEN))
+        self.addCleanup(receiver.close)
+        client = FeedClient(receiver.address, "beast").start()
+        self.addCleanup(client.stop)
+        self.assertTrue(wait_for(lambda: 'lat' in (client.table.get("40621d") or {})))
+
+        config = {'local_sources': {'dump1090': '/nonexistent', 'dump978': '/nonexistent', 'beast': receiver.address}}
+        with patch('tracker.local.load_config', return_value=config), \
+             patch('tracker.local.get_feed', return_value=client) as get_feed:
+            flights, errors = fetch_local_data()
+        get_feed.assert_called_once_with(receiver.address, "beast")
+        self.assertEqual(errors, [])
+        self.assertEqual([(f['hex_id'], f['source'], f['altitude']) for f in flights], [("40621d", "Local (Beast)", 38000)])
+
+if __name__ == '__main__':
+    unittest.main()
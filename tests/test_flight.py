@@ -0,0 +1,72 @@
+import unittest
+import copy
+import json
+import os
+import pickle
+import sys
+
+# Add parent dir to path to import tracker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tracker.flight import Flight, as_flight, json_default
+
+AS_DICT = {
+    "source": "Local (1090)", "hex_id": "abc123", "callsign": "TEST1", "lat": 40.0, "lon": -74.0,
+    "heading": 90, "altitude": 35000, "speed": 450, "type": "A3", "timestamp": 1000
+}
+
+class TestFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.flight = Flight.from_dict(AS_DICT)
+
+    def test_behaves_like_the_dict_it_replaces(self):
+        f = self.flight
+        self.assertEqual(f['lat'], 40.0)
+        self.assertEqual(f.get('speed'), 450)
+        self.assertIsNone(f.get('azimuth'))
+        self.assertEqual(f.get('nonsense', 'x'), 'x')
+        self.assertNotIn('azimuth', f)
+        self.assertEqual(dict(f), AS_DICT)
+        self.assertEqual(list(f), list(AS_DICT))
+        self.assertEqual(len(f), 10)
+        self.assertEqual(f, AS_DICT)
+        self.assertEqual(AS_DICT, f)
+        with self.assertRaises(KeyError):
+            f['azimuth']
+
+    def test_enrichment_fields_appear_when_set(self):
+        f = self.flight
+        f['distance_from_obs'] = 1.5
+        f.azimuth = 90.0
+        f.elevation = 10.0
+        self.assertEqual(len(f), 13)
+        self.assertEqual(list(f.to_dict())[-3:], ["distance_from_obs", "azimuth", "elevation"])
+
+    def test_unknown_fields_rejected(self):
+        with self.assertRaises(KeyError):
+            self.flight['squawk'] = '7700'
+        with self.assertRaises(AttributeError):
+            self.flight.squawk = '7700'
+
+    def test_copy_is_independent(self):
+        self.flight.azimuth = 1.0
+        for clone in (self.flight.copy(), copy.copy(self.flight), copy.deepcopy(self.flight),
+                      pickle.loads(pickle.dumps(self.flight))):
+            self.assertEqual(clone, self.flight)
+            clone.lat = 0.0
+            self.assertEqual(self.flight.lat, 40.0)
+
+    def test_json_matches_dict_output(self):
+        self.flight.distance_from_obs = float('inf')
+        self.flight.azimuth = 0
+        self.flight.elevation = 0
+        expected = json.dumps(dict(AS_DICT, distance_from_obs=float('inf'), azimuth=0, elevation=0))
+        self.assertEqual(json.dumps(self.flight, default=json_default), expected)
+
+    def test_as_flight(self):
+        self.assertIs(as_flight(self.flight), self.flight)
+        self.assertIsInstance(as_flight(AS_DICT), Flight)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,9 @@
 import unittest
 import math
-from tracker.geo import calculate_az_el
+import random
+from unittest.mock import patch
+from tracker import geo
+from tracker.geo import calculate_az_el, haversine_distance, haversine_distance_batch, calculate_az_el_batch
 
 class TestGeoCalc(unittest.TestCase):
 
@@ -58,5 +61,43 @@ class TestGeoCalc(unittest.TestCase):
         self.assertAlmostEqual(az, 0.0, delta=0.1)
         self.assertAlmostEqual(el, 0.0, delta=1.0) # Approx check
 
+class TestGeoBatch(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(42)
+        self.obs = (39.0, -75.0, 120.0)
+        self.lats = [self.obs[0], self.obs[0]] + [39.0 + rng.uniform(-2, 2) for _ in range(200)]
+        self.lons = [self.obs[1], self.obs[1]] + [-75.0 + rng.uniform(-2, 2) for _ in range(200)]
+        # Coincident points directly above and below the observer, then a random fleet.
+        self.alts = [5000.0, 0.0] + [rng.uniform(0, 12000) for _ in range(200)]
+
+    def check_matches_scalar(self, delta=None):
+        distances = haversine_distance_batch(self.obs[0], self.obs[1], self.lats, self.lons)
+        azimuths, elevations = calculate_az_el_batch(*self.obs, self.lats, self.lons, self.alts)
+        self.assertEqual(len(azimuths), len(self.lats))
+        for i, (t_lat, t_lon, t_alt) in enumerate(zip(self.lats, self.lons, self.alts)):
+            self.assertAlmostEqual(distances[i], haversine_distance(self.obs[0], self.obs[1], t_lat, t_lon), places=6)
+            az, el = calculate_az_el(*self.obs, t_lat, t_lon, t_alt)
+            if delta is None:
+                self.assertEqual((azimuths[i], elevations[i]), (az, el))
+            else:
+                self.assertAlmostEqual(azimuths[i], az, delta=delta)
+                self.assertAlmostEqual(elevations[i], el, delta=delta)
+        self.assertEqual((azimuths[0], elevations[0]), (0.0, 90.0))
+        self.assertEqual((azimuths[1], elevations[1]), (0.0, -90.0))
+
+    def test_pure_python_matches_scalar(self):
+        with patch.object(geo, 'np', None):
+            self.check_matches_scalar()
+
+    @unittest.skipUnless(geo.np is not None, "NumPy not installed")
+    def test_numpy_matches_scalar(self):
+        # Vectorized float ops can land a hair either side of a rounding boundary
+        self.check_matches_scalar(delta=0.1001)
+
+    def test_empty_batch(self):
+        self.assertEqual(haversine_distance_batch(0, 0, [], []), [])
+        self.assertEqual(calculate_az_el_batch(0, 0, 0, [], [], []), ([], []))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,158 @@
+import unittest
+import copy
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+# Add parent dir to path to import tracker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tracker.config import DEFAULT_CONFIG
+from tracker.ingest import IngestionEngine, Snapshot, diff_snapshots
+from helpers import CountingFetcher, make_flight
+
+class BlockingFetcher(CountingFetcher):
+    def __init__(self, flights):
+        super().__init__(flights)
+        self.release = threading.Event()
+
+    def __call__(self, area):
+        self.release.wait(5)
+        return super().__call__(area)
+
+@patch('tracker.ingest.load_config', return_value=DEFAULT_CONFIG)
+class TestIngestionEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.local = CountingFetcher([make_flight("abc123", "Local (1090)")])
+        self.fa = CountingFetcher([make_flight("ABC123", "FlightAware", ts=900)])
+        self.fr24 = CountingFetcher([], ["FR24 Error: 500 - boom"])
+        self.engine = IngestionEngine({
+            "local": self.local, "flightaware": self.fa, "flightradar24": self.fr24
+        })
+
+    def test_first_read_before_cycle_returns_placeholder(self, _):
+        snapshot = self.engine.get_snapshot(40.0, -74.0, 50, timeout=0)
+        self.assertEqual(snapshot.version, 0)
+        self.assertEqual(snapshot.flights, ())
+
+    def test_cycle_publishes_deconflicted_enriched_snapshot(self, _):
+        self.engine.get_snapshot(40.0, -74.0, 50, timeout=0)
+        self.engine.run_cycle()
+
+        snapshot = self.engine.get_snapshot(40.0, -74.0, 50)
+        self.assertGreater(snapshot.version, 0)
+        self.assertEqual(len(snapshot.flights), 1)
+        flight = snapshot.flights[0]
+        self.assertIn("FA", flight['source'])
+        self.assertAlmostEqual(flight['distance_from_obs'], 0.0)
+        self.assertEqual(list(snapshot.messages), ["FR24 Error: 500 - boom"])
+
+    def test_readers_share_one_upstream_fetch(self, _):
+        self.engine.get_snapshot(40.0, -74.0, 50, timeout=0)
+        self.engine.run_cycle()
+        for _ in range(10):
+            self.engine.get_snapshot(40.0, -74.0, 50)
+        self.engine.run_cycle() # Nothing is due yet
+        self.assertEqual(self.fa.calls, 1)
+        self.assertEqual(self.local.calls, 1)
+
+    def test_local_source_is_shared_between_areas(self, _):
+        self.engine.get_snapshot(40.0, -74.0, 50, timeout=0)
+        self.engine.get_snapshot(41.0, -75.0, 20, timeout=0)
+        self.engine.run_cycle()
+        self.assertEqual(self.local.calls, 1)
+        self.assertEqual(self.fa.calls, 2)
+
+    def test_cached_results_are_not_mutated_by_deconfliction(self, _):
+        self.engine.get_snapshot(40.0, -74.0, 50, timeout=0)
+        self.engine.run_cycle()
+        self.assertEqual(self.local.flights[0]['source'], "Local (1090)")
+        self.assertNotIn('distance_from_obs', self.local.flights[0])
+
+    def test_wait_for_snapshot_wakes_on_publish(self, _):
+        self.engine.get_snapshot(40.0, -74.0, 50, timeout=0)
+        self.engine.run_cycle()
+        first = self.engine.get_snapshot(40.0, -74.0, 50)
+
+        # Nothing new within the timeout: the current snapshot comes back
+        self.assertIs(self.engine.wait_for_snapshot(40.0, -74.0, 50, first.version, 0.05), first)
+
+        publisher = threading.Timer(0.05, lambda: self.engine._publish(first.area, 0, time.time()))
+        publisher.start()
+        newer = self.engine.wait_for_snapshot(40.0, -74.0, 50, first.version, 5)
+        publisher.join()
+        self.assertGreater(newer.version, first.version)
+
+    def test_recent_versions_window(self, _):
+        config = copy.deepcopy(DEFAULT_CONFIG)
+        config['ingest']['history_versions'] = 2
+        with patch('tracker.ingest.load_config', return_value=config):
+            self.engine.get_snapshot(40.0, -74.0, 50, timeout=0)
+            self.engine.run_cycle()
+            area = self.engine.get_snapshot(40.0, -74.0, 50).area
+            versions = [self.engine.get_snapshot(40.0, -74.0, 50).version]
+            for _ in range(2):
+                self.engine._publish(area, 0, time.time())
+                versions.append(self.engine.get_snapshot(40.0, -74.0, 50).version)
+
+        self.assertIsNone(self.engine.get_version(40.0, -74.0, 50, versions[0]))
+        self.assertEqual(self.engine.get_version(40.0, -74.0, 50, versions[1]).version, versions[1])
+
+class TestDiffSnapshots(unittest.TestCase):
+
+    def test_added_updated_removed(self):
+        a, b, c = make_flight("aaa", "FA"), make_flight("bbb", "FA"), make_flight("ccc", "FA")
+        moved_b = dict(b, lat=41.0)
+        old = Snapshot(1, 0, (), (a, b, c), ())
+        new = Snapshot(2, 0, (), (dict(a), moved_b, make_flight("ddd", "FA")), ())
+
+        delta = diff_snapshots(old, new)
+        self.assertEqual([f['hex_id'] for f in delta['added']], ["ddd"])
+        self.assertEqual(delta['updated'], [moved_b])
+        self.assertEqual(delta['removed'], ["ccc"])
+
+class TestFetchBudget(unittest.TestCase):
+
+    def setUp(self):
+        config = copy.deepcopy(DEFAULT_CONFIG)
+        config['ingest']['fetch_budget_s'] = 0.2
+        patcher = patch('tracker.ingest.load_config', return_value=config)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.local = CountingFetcher([make_flight("abc123", "Local (1090)")])
+        self.fa = BlockingFetcher([make_flight("def456", "FlightAware", lat=40.5)])
+        self.fr24 = CountingFetcher([])
+        self.engine = IngestionEngine({
+            "local": self.local, "flightaware": self.fa, "flightradar24": self.fr24
+        })
+        self.addCleanup(self.fa.release.set)
+
+    def test_slow_source_does_not_stall_cycle(self):
+        self.engine.get_snapshot(40.0, -74.0, 50, timeout=0)
+        started = time.monotonic()
+        self.engine.run_cycle()
+        self.assertLess(time.monotonic() - started, 2)
+
+        snapshot = self.engine.get_snapshot(40.0, -74.0, 50)
+        self.assertEqual([f['hex_id'] for f in snapshot.flights], ["abc123"])
+        self.assertEqual(list(snapshot.messages), ["FlightAware late: still waiting for response (no data yet)"])
+
+    def test_late_result_is_collected_by_next_cycle(self):
+        self.engine.get_snapshot(40.0, -74.0, 50, timeout=0)
+        self.engine.run_cycle()
+        self.engine.run_cycle() # Still in flight, must not be resubmitted
+        self.fa.release.set()
+        time.sleep(0.1)
+        self.engine.run_cycle()
+
+        snapshot = self.engine.get_snapshot(40.0, -74.0, 50)
+        self.assertEqual(sorted(f['hex_id'] for f in snapshot.flights), ["abc123", "def456"])
+        self.assertEqual(list(snapshot.messages), [])
+        self.assertEqual(self.fa.calls, 1)
+
+if __name__ == '__main__':
+    unittest.main()
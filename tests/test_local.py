@@ -2,13 +2,17 @@ import unittest
 import json
 import time
 import os
+import shutil
 import sys
+import tempfile
 from unittest.mock import patch, mock_open
 
 # Add parent dir to path to import tracker
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from tracker.local import fetch_local_data, normalize_local_flight
+from tracker import local
+from tracker.local import fetch_local_data, normalize_local_flight, fetch_json_from_path_or_url
+from tracker.watcher import get_watcher
 from tracker.core import deconflict_data
 
 class TestLocalData(unittest.TestCase):
@@ -88,5 +92,48 @@ class TestLocalData(unittest.TestCase):
         self.assertEqual(merged[0]['lat'], 40.2) # Should update to fresher FA
         self.assertIn("Local", merged[0]['source']) # But keep tracking source label
 
+class TestChangeAwareReads(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, "aircraft.json")
+        self.write({"now": 1700000000.0, "aircraft": [{"hex": "abc123", "lat": 40.0, "lon": -74.0, "seen": 1}]})
+
+    def write(self, data):
+        # dump1090 writes a temporary file and renames it over aircraft.json
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def check_reuse_and_reload(self):
+        first = fetch_json_from_path_or_url(self.path)
+        with patch('tracker.local._json_loads', side_effect=AssertionError("reparsed")):
+            self.assertIs(fetch_json_from_path_or_url(self.path), first)
+
+        self.write({"now": 1700000001.0, "aircraft": []})
+        deadline = time.time() + 2
+        second = fetch_json_from_path_or_url(self.path)
+        while second is first and time.time() < deadline: # Give inotify a moment
+            time.sleep(0.01)
+            second = fetch_json_from_path_or_url(self.path)
+        self.assertEqual(second['now'], 1700000001.0)
+
+    def test_polling_fallback(self):
+        with patch('tracker.local.get_watcher', return_value=None):
+            self.check_reuse_and_reload()
+
+    @unittest.skipIf(get_watcher() is None, "inotify not available")
+    def test_inotify(self):
+        self.check_reuse_and_reload()
+
+    def test_normalized_results_reused_for_unchanged_document(self):
+        data = fetch_json_from_path_or_url(self.path)
+        first = local.normalize_aircraft_json_cached(data, "Local (test)")
+        with patch('tracker.local.normalize_aircraft_json', side_effect=AssertionError("renormalized")):
+            again = local.normalize_aircraft_json_cached(fetch_json_from_path_or_url(self.path), "Local (test)")
+        self.assertEqual(again, first)
+
 if __name__ == '__main__':
     unittest.main()
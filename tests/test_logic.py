@@ -1,5 +1,7 @@
 import unittest
+import copy
 import math
+import random
 import sys
 import os
 
@@ -7,7 +9,7 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from tracker.geo import haversine_distance, get_bounding_box
-from tracker.core import deconflict_data
+from tracker.core import deconflict_data, Deconflictor, SpatialIndex
 from tracker.api import parse_fa_time
 
 class TestFlightTracker(unittest.TestCase):
@@ -147,5 +149,149 @@ class TestFlightTracker(unittest.TestCase):
         ts = parse_fa_time("2023-01-01T12:00:00Z")
         self.assertTrue(ts > 0)
 
+def reference_deconflict(fa_data, fr24_data, local_data):
+    """
+    The original linear-scan deconfliction, kept to check the indexed version against.
+    """
+    merged_results = {}
+    def clean_id(f): return str(f['hex_id']).strip().lower()
+    for f in local_data:
+        merged_results[clean_id(f)] = f
+
+    def absorb(existing, f_new, source_label):
+        if f_new.get('timestamp', 0) > existing.get('timestamp', 0):
+            for k in ('lat', 'lon', 'heading', 'altitude', 'speed', 'timestamp'):
+                existing[k] = f_new[k]
+        if "Local" in existing['source']:
+            if source_label not in existing['source']:
+                existing['source'] += f" + {source_label}"
+        else:
+            existing['source'] = "Merged"
+
+    def exact(fs, label):
+        rest = []
+        for f in fs:
+            if clean_id(f) in merged_results:
+                absorb(merged_results[clean_id(f)], f, label)
+            else:
+                rest.append(f)
+        return rest
+
+    def spatial(fs, label):
+        rest = []
+        for c in fs:
+            best, min_dist = None, float('inf')
+            for m in merged_results.values():
+                if m['lat'] and m['lon'] and c['lat'] and c['lon']:
+                    dist = haversine_distance(m['lat'], m['lon'], c['lat'], c['lon'])
+                    if dist < min_dist and dist <= 6.0:
+                        min_dist, best = dist, m
+            if best:
+                absorb(best, c, label)
+            else:
+                rest.append(c)
+        for f in rest:
+            merged_results[clean_id(f)] = f
+
+    unmerged_fa = exact(fa_data, "FA")
+    unmerged_fr24 = exact(fr24_data, "FR24")
+    spatial(unmerged_fa, "FA")
+    spatial(unmerged_fr24, "FR24")
+    return sorted(merged_results.values(), key=lambda x: x['hex_id'])
+
+class TestSpatialIndex(unittest.TestCase):
+
+    def random_flights(self, rng, n, source, centers, id_pool):
+        flights = []
+        for _ in range(n):
+            c_lat, c_lon = rng.choice(centers)
+            lat = max(-90.0, min(90.0, c_lat + rng.uniform(-0.3, 0.3)))
+            lon = (c_lon + rng.uniform(-0.3, 0.3) + 180) % 360 - 180
+            roll = rng.random()
+            if roll < 0.03:
+                lat = None
+            elif roll < 0.05:
+                lon = 0.0
+            elif roll < 0.1 and flights:
+                # Exact duplicate position to exercise distance ties
+                lat, lon = flights[-1]['lat'], flights[-1]['lon']
+            flights.append({
+                "source": source, "hex_id": rng.choice(id_pool), "callsign": "X",
+                "lat": lat, "lon": lon, "heading": rng.randint(0, 359),
+                "altitude": rng.randint(0, 40000), "speed": rng.randint(0, 500),
+                "type": "B738", "timestamp": rng.randint(1000, 1010)
+            })
+        return flights
+
+    def test_matches_linear_scan_on_random_inputs(self):
+        rng = random.Random(1234)
+        centers = [(40.0, -74.0), (0.05, 179.95), (89.97, 10.0), (-89.95, -120.0), (51.5, 0.0)]
+        for trial in range(40):
+            id_pool = [f"{i:06x}" for i in range(rng.randint(20, 400))]
+            local = self.random_flights(rng, rng.randint(0, 60), "Local (1090)", centers, id_pool)
+            fa = self.random_flights(rng, rng.randint(0, 60), "FlightAware", centers, [i.upper() for i in id_pool])
+            fr24 = self.random_flights(rng, rng.randint(0, 60), "Flightradar24", centers, id_pool)
+
+            expected = reference_deconflict(*copy.deepcopy((fa, fr24, local)))
+            actual = deconflict_data(*copy.deepcopy((fa, fr24, local)))
+            self.assertEqual(actual, expected, f"Mismatch in trial {trial}")
+
+    def test_nearest_wraps_antimeridian(self):
+        flights = {"a": {"lat": 10.0, "lon": 179.99}}
+        index = SpatialIndex(flights, 6.0)
+        self.assertEqual(index.nearest({"lat": 10.0, "lon": -179.99}), "a")
+        self.assertIsNone(index.nearest({"lat": 10.0, "lon": -179.0}))
+
+def flight(hex_id, source, lat, lon, ts=1000):
+    return {"source": source, "hex_id": hex_id, "callsign": hex_id, "lat": lat, "lon": lon,
+            "heading": 90, "altitude": 10000, "speed": 300, "type": "B738", "timestamp": ts}
+
+class TestDeconflictor(unittest.TestCase):
+
+    def setUp(self):
+        self.now = [1000.0]
+        self.deconflictor = Deconflictor(association_ttl_s=300, clock=lambda: self.now[0])
+
+    def cycle(self, offset=0.0):
+        local = [flight(f"{i:06x}", "Local (1090)", 40.0 + i * 0.5 + offset, -74.0) for i in range(5)]
+        fa = [flight(f"UAL{i}", "FlightAware", 40.001 + i * 0.5 + offset, -74.0, ts=999) for i in range(5)]
+        fr24 = [flight(f"DAL{i}", "Flightradar24", 40.0 + i * 0.5 + offset, -74.002, ts=999) for i in range(5)]
+        inputs = (fa, fr24, local)
+        expected = deconflict_data(*copy.deepcopy(inputs))
+        self.assertEqual(self.deconflictor.merge(*copy.deepcopy(inputs)), expected)
+        return self.deconflictor.stats
+
+    def test_known_pairs_skip_spatial_search(self):
+        self.assertEqual(self.cycle(), {"association_hits": 0, "spatial_searches": 10})
+        # A pairing must be confirmed once more before it is trusted
+        self.assertEqual(self.cycle(0.01), {"association_hits": 0, "spatial_searches": 10})
+        self.assertEqual(self.cycle(0.02), {"association_hits": 10, "spatial_searches": 0})
+        self.assertEqual(self.deconflictor.associations[("FA", "ual3")].target, "000003")
+
+    def test_associations_expire(self):
+        self.cycle()
+        self.cycle()
+        self.now[0] += 301
+        self.assertEqual(self.cycle()["spatial_searches"], 10)
+
+    def test_drifted_pair_is_searched_again(self):
+        self.cycle()
+        self.cycle()
+        local = [flight("000000", "Local (1090)", 40.0, -74.0), flight("000001", "Local (1090)", 41.0, -74.0)]
+        fa = [flight("UAL0", "FlightAware", 41.001, -74.0, ts=999)] # UAL0 is now next to 000001
+        merged = self.deconflictor.merge(fa, [], local)
+        self.assertEqual(self.deconflictor.stats, {"association_hits": 0, "spatial_searches": 1})
+        self.assertEqual([f['source'] for f in merged], ["Local (1090)", "Local (1090) + FA"])
+        self.assertEqual(self.deconflictor.associations[("FA", "ual0")].target, "000001")
+
+    def test_index_follows_moving_and_departing_flights(self):
+        deconflictor = Deconflictor()
+        deconflictor.merge([], [], [flight("a", "Local (1090)", 40.0, -74.0), flight("b", "Local (1090)", 45.0, -74.0)])
+        merged = deconflictor.merge([flight("UAL1", "FlightAware", 50.0, -74.0, ts=999)], [],
+                                    [flight("a", "Local (1090)", 50.0, -74.0)])
+        self.assertEqual(len(merged), 1)
+        self.assertEqual(merged[0]['source'], "Local (1090) + FA")
+        self.assertEqual(set(deconflictor._index.ranks), {"a"})
+
 if __name__ == '__main__':
     unittest.main()
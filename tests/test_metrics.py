@@ -0,0 +1,101 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+# Add parent dir to path to import tracker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as tracker_app
+from tracker import metrics
+from tracker.config import DEFAULT_CONFIG
+from tracker.ingest import IngestionEngine
+from tracker.metrics import Registry, Counter, Gauge, Histogram
+from helpers import CountingFetcher, make_flight
+
+def sample(text, name):
+    """
+    Value of the sample line `name` (including labels) in rendered output, or 0.
+    """
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_and_gauge(self):
+        counter = Counter("jobs_total", "Jobs run.", ["kind"], registry=self.registry)
+        gauge = Gauge("queue_depth", "Queued jobs.", registry=self.registry)
+        counter.labels("a").inc()
+        counter.labels(kind="a").inc(2)
+        counter.labels("b\"x").inc()
+        gauge.set(4.5)
+        self.assertEqual(self.registry.render(), "\n".join([
+            "# HELP jobs_total Jobs run.",
+            "# TYPE jobs_total counter",
+            'jobs_total{kind="a"} 3',
+            'jobs_total{kind="b\\"x"} 1',
+            "# HELP queue_depth Queued jobs.",
+            "# TYPE queue_depth gauge",
+            "queue_depth 4.5",
+        ]) + "\n")
+        with self.assertRaises(ValueError):
+            counter.labels("a").inc(-1)
+        with self.assertRaises(ValueError):
+            counter.inc() # Labelled metrics need labels()
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1), registry=self.registry)
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value)
+        text = self.registry.render()
+        self.assertEqual(sample(text, 'latency_seconds_bucket{le="0.1"}'), 2)
+        self.assertEqual(sample(text, 'latency_seconds_bucket{le="1"}'), 3)
+        self.assertEqual(sample(text, 'latency_seconds_bucket{le="+Inf"}'), 4)
+        self.assertEqual(sample(text, 'latency_seconds_count'), 4)
+        self.assertAlmostEqual(sample(text, 'latency_seconds_sum'), 3.65)
+
+    def test_duplicate_names_rejected(self):
+        Counter("x_total", "X.", registry=self.registry)
+        with self.assertRaises(ValueError):
+            Gauge("x_total", "X.", registry=self.registry)
+
+class TestPipelineMetrics(unittest.TestCase):
+
+    def test_cycle_and_response_are_measured(self):
+        before = metrics.render()
+        config = DEFAULT_CONFIG
+        local = CountingFetcher([make_flight("abc123", "Local (1090)")])
+        fa = CountingFetcher([make_flight("ABC123", "FlightAware"), make_flight("def456", "FlightAware", lat=45.0)])
+        fr24 = CountingFetcher([], ["FR24 Error: 500 - boom"])
+        with patch('tracker.ingest.load_config', return_value=config):
+            engine = IngestionEngine({"local": local, "flightaware": fa, "flightradar24": fr24})
+            self.addCleanup(engine.stop)
+            engine.get_snapshot(40.0, -74.0, 50, timeout=0)
+            engine.run_cycle()
+
+        with patch('app.get_engine', return_value=engine):
+            client = tracker_app.app.test_client()
+            self.assertEqual(client.get('/api/flights?lat=40&lon=-74&radius=50').status_code, 200)
+            response = client.get('/metrics')
+        self.assertEqual(response.headers['Content-Type'], metrics.CONTENT_TYPE)
+        after = response.get_data(as_text=True)
+
+        def delta(name):
+            return sample(after, name) - sample(before, name)
+
+        self.assertEqual(delta('tracker_fetch_seconds_count{source="flightaware"}'), 1)
+        self.assertEqual(delta('tracker_upstream_errors_total{source="flightradar24"}'), 1)
+        self.assertEqual(delta('tracker_deconflict_flights_total{result="merged"}'), 1)
+        self.assertEqual(delta('tracker_deconflict_flights_total{result="unmerged"}'), 1)
+        for stage in ("deconflict", "enrich", "serialize"):
+            self.assertEqual(delta(f'tracker_stage_seconds_count{{stage="{stage}"}}'), 1)
+        self.assertEqual(delta('tracker_snapshots_published_total'), 1)
+        self.assertGreater(delta('tracker_snapshot_bytes_sum'), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+import copy
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+# Add parent dir to path to import tracker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as tracker_app
+from tracker import profiling
+from tracker.config import DEFAULT_CONFIG
+from tracker.ingest import IngestionEngine
+from tracker.profiling import Stopwatch, CaptureBusy, capture_cprofile, sample_stacks, profiled
+from helpers import CountingFetcher, make_flight
+
+def spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+class TestProfiling(unittest.TestCase):
+
+    def test_stopwatch(self):
+        with Stopwatch() as timer:
+            spin(0.01)
+        self.assertGreaterEqual(timer.wall, 0.01)
+        self.assertGreater(timer.cpu, 0)
+        self.assertEqual(set(timer.as_dict(flights=3)), {"wall_ms", "cpu_ms", "flights"})
+
+    def test_cprofile_capture_sees_profiled_calls_on_other_threads(self):
+        def busy_loop():
+            spin(0.01)
+
+        def worker():
+            while profiling._capture is None:
+                time.sleep(0.001)
+            profiled(busy_loop)
+
+        threading.Thread(target=worker, daemon=True).start()
+        dump = capture_cprofile(0.2)
+
+        with tempfile.NamedTemporaryFile(suffix=".pstats", delete=False) as f:
+            f.write(dump)
+        self.addCleanup(os.remove, f.name)
+        functions = {name for _, _, name in pstats.Stats(f.name).stats}
+        self.assertIn("busy_loop", functions)
+        self.assertIsNone(profiling._capture)
+
+    def test_sampling_returns_collapsed_stacks(self):
+        stop = threading.Event()
+
+        def busy_loop():
+            while not stop.is_set():
+                spin(0.001)
+
+        thread = threading.Thread(target=busy_loop, name="busy", daemon=True)
+        thread.start()
+        try:
+            stacks = sample_stacks(0.1, 0.001)
+        finally:
+            stop.set()
+        lines = [line for line in stacks.splitlines() if line.startswith("busy;")]
+        self.assertTrue(lines)
+        self.assertTrue(all(int(line.rsplit(" ", 1)[1]) > 0 for line in lines))
+        self.assertTrue(any("busy_loop (test_profiling.py:" in line for line in lines))
+
+    def test_one_capture_at_a_time(self):
+        with profiling._capture_lock:
+            with self.assertRaises(CaptureBusy):
+                sample_stacks(0.01)
+
+class TestProfileEndpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.config = copy.deepcopy(DEFAULT_CONFIG)
+        patcher = patch('app.load_config', return_value=self.config)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        with patch('tracker.ingest.load_config', return_value=self.config):
+            self.engine = IngestionEngine({
+                "local": CountingFetcher([make_flight("abc123", "Local (1090)")]),
+                "flightaware": CountingFetcher([make_flight("ABC123", "FlightAware")]),
+                "flightradar24": CountingFetcher([], ["FR24 Error: 500 - boom"]),
+            })
+            self.addCleanup(self.engine.stop)
+            self.engine.get_snapshot(40.0, -74.0, 50, timeout=0)
+            self.engine.run_cycle()
+        patcher = patch('app.get_engine', return_value=self.engine)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = tracker_app.app.test_client()
+
+    def test_request_profile_is_gated_by_config(self):
+        url = '/api/flights?lat=40&lon=-74&radius=50&profile=1'
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.config['profiling']['request_profile'] = True
+        r = self.client.get(url)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.json['flights']), 1)
+        profile = r.json['profile']
+        self.assertEqual(set(profile['sources']), {"local", "flightaware", "flightradar24"})
+        self.assertEqual(profile['sources']['flightradar24']['errors'], 1)
+        self.assertIn('wall_ms', profile['sources']['local'])
+        self.assertEqual(profile['stages']['deconflict']['flights_in'], 2)
+        self.assertEqual(profile['stages']['deconflict']['merged'], 1)
+        self.assertIn('cpu_ms', profile['stages']['enrich'])
+        self.assertGreater(profile['request']['serialize']['bytes'], 0)
+        self.assertEqual(r.headers['Cache-Control'], 'no-store')
+
+    def test_capture_endpoint(self):
+        self.assertEqual(self.client.get('/admin/profile?seconds=0.05').status_code, 403)
+
+        self.config['profiling'].update(capture_enabled=True, admin_token="secret")
+        self.assertEqual(self.client.get('/admin/profile?seconds=0.05').status_code, 403)
+        headers = {'X-Admin-Token': 'secret'}
+        self.assertEqual(self.client.get('/admin/profile?seconds=999', headers=headers).status_code, 400)
+        self.assertEqual(self.client.get('/admin/profile?mode=perf', headers=headers).status_code, 400)
+
+        r = self.client.get('/admin/profile?seconds=0.05&mode=cprofile', headers=headers)
+        self.assertEqual(r.status_code, 200)
+        self.assertIn('.pstats', r.headers['Content-Disposition'])
+        r = self.client.get('/admin/profile?seconds=0.05', headers=headers)
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.mimetype.startswith('text/plain'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+# Add parent dir to path to import tracker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tracker.receivers import Receiver, ReceiverNetwork, merge_receivers, fetch_local_sources
+
+NOW = 1700000000.0
+
+def aircraft(hex_id, seen, lat=40.0, lon=-74.0):
+    return {"hex": hex_id, "flight": hex_id.upper(), "lat": lat, "lon": lon, "seen": seen}
+
+class TestMerge(unittest.TestCase):
+
+    def test_freshest_report_wins_and_label_names_receivers(self):
+        north, south = Receiver("north", source="/n"), Receiver("south", source="/s")
+        results = [
+            (north, north.entries({"now": NOW, "aircraft": [aircraft("ABC123", 5.0, lat=41.0), aircraft("def456", 1.0)]}, NOW)),
+            (south, south.entries({"now": NOW, "aircraft": [aircraft("abc123", 0.5, lat=42.0)]}, NOW)),
+        ]
+        flights = {f['hex_id']: f for f in merge_receivers(results)}
+
+        self.assertEqual(flights['abc123']['lat'], 42.0)
+        self.assertEqual(flights['abc123']['source'], "Local (south, north)")
+        self.assertEqual(flights['abc123']['timestamp'], int(NOW - 0.5))
+        self.assertEqual(flights['def456']['source'], "Local (north)")
+
+    def test_entries_skip_old_and_unpositioned_aircraft(self):
+        receiver = Receiver("north", source="/n")
+        document = {"now": NOW, "aircraft": [aircraft("a", 61), {"hex": "b", "seen": 1}, aircraft("c", 2)]}
+        self.assertEqual([e[0] for e in receiver.entries(document, NOW)], ["c"])
+        self.assertIs(receiver.entries(document, NOW), receiver.entries(document, NOW))
+
+    def test_stalled_document_is_an_error(self):
+        with self.assertRaises(ValueError):
+            Receiver("north", source="/n").entries({"now": NOW - 120, "aircraft": []}, NOW)
+
+    def test_receiver_needs_one_endpoint(self):
+        with self.assertRaises(ValueError):
+            Receiver("north")
+        with self.assertRaises(ValueError):
+            Receiver("north", source="/n", sbs="host:30003")
+
+class TestReceiverNetwork(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.network = ReceiverNetwork()
+
+    def write(self, name, aircraft_list):
+        path = os.path.join(self.test_dir, f"{name}.json")
+        with open(path, 'w') as f:
+            json.dump({"now": time.time(), "aircraft": aircraft_list}, f)
+        return {"name": name, "source": path}
+
+    def test_fetch_merges_and_reports_down_receivers(self):
+        conf = {"receivers": [
+            self.write("north", [aircraft("abc123", 3.0)]),
+            self.write("south", [aircraft("abc123", 1.0), aircraft("def456", 1.0)]),
+            {"name": "west", "source": os.path.join(self.test_dir, "missing.json")},
+        ]}
+        flights, errors = self.network.fetch(conf)
+
+        self.assertEqual(sorted((f['hex_id'], f['source']) for f in flights),
+                         [("abc123", "Local (south, north)"), ("def456", "Local (south)")])
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0].startswith("Receiver west down: No such file"))
+
+        health = {h['name']: h for h in self.network.health()}
+        self.assertEqual((health['north']['status'], health['north']['aircraft']), ("ok", 1))
+        self.assertEqual((health['west']['status'], health['west']['consecutive_failures']), ("down", 1))
+
+    def test_failing_receiver_backs_off(self):
+        conf = {"receivers": [{"name": "west", "source": os.path.join(self.test_dir, "missing.json")}]}
+        with patch.object(Receiver, 'read', side_effect=OSError("refused")) as read:
+            for _ in range(5):
+                self.network.fetch(conf)
+        self.assertEqual(read.call_count, 3)
+        _, errors = self.network.fetch(conf)
+        self.assertRegex(errors[0], r"^Receiver west down: refused \(retrying in \d+s\)$")
+
+    def test_receivers_are_read_in_parallel(self):
+        barrier = threading.Barrier(8, timeout=2)
+
+        def read(receiver):
+            barrier.wait() # Only returns once all eight reads are in flight
+            return {"now": time.time(), "aircraft": [aircraft(receiver.name, 1.0)]}
+
+        conf = {"receivers": [{"name": f"r{i}", "source": f"/r{i}"} for i in range(8)]}
+        with patch.object(Receiver, 'read', autospec=True, side_effect=read):
+            flights, errors = self.network.fetch(conf)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(flights), 8)
+
+    def test_slow_receiver_times_out(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def read(receiver):
+            release.wait(5)
+            return {"now": time.time(), "aircraft": []}
+
+        conf = {"receivers": [{"name": "slow", "source": "/slow"}], "receiver_timeout_s": 0.05}
+        with patch.object(Receiver, 'read', autospec=True, side_effect=read) as mock_read:
+            _, errors = self.network.fetch(conf)
+            self.assertEqual(errors, ["Receiver slow down: timed out"])
+            self.network.fetch(conf) # Still pending: not read again
+            self.assertEqual(mock_read.call_count, 1)
+
+    def test_health_survives_reconfiguration(self):
+        conf = {"receivers": [self.write("north", [aircraft("abc123", 1.0)])]}
+        self.network.fetch(conf)
+        north = self.network._receivers['north']
+        self.network.configure(conf['receivers'] + [{"name": "south", "source": "/s"}])
+        self.assertIs(self.network._receivers['north'], north)
+        self.network.configure([{"name": "north", "source": "/elsewhere"}])
+        self.assertIsNot(self.network._receivers['north'], north)
+
+    def test_single_sources_without_receivers(self):
+        with patch('tracker.receivers.load_config', return_value={'local_sources': {'dump1090': '/x'}}), \
+             patch('tracker.receivers.fetch_local_data', return_value=([], [])) as fetch_local_data:
+            self.assertEqual(fetch_local_sources(), ([], []))
+        fetch_local_data.assert_called_once_with()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add parent dir to path to import tracker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as tracker_app
+from tracker.ingest import Snapshot
+from tracker.recorder import Recorder, RECORD
+
+HOUR = 3600
+BASE = 1700000000 - 1700000000 % HOUR # Start of an hour
+
+def snapshot(version, created, hex_ids):
+    flights = tuple({
+        "source": "Local (1090) + FA", "hex_id": h, "callsign": f"CS{h}", "lat": 40.0 + version,
+        "lon": -74.0, "altitude": "ground" if h == "gnd" else 10000, "speed": 300,
+        "heading": 90, "type": "A3", "timestamp": int(created)
+    } for h in hex_ids)
+    return Snapshot(version, created, (40.0, -74.0, 50), flights, ())
+
+class TestRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.recorder = Recorder(self.dir)
+        self.recorder.submit(snapshot(1, BASE + 10, ["aaa", "bbb"]))
+        self.recorder.submit(snapshot(2, BASE + 20, ["aaa", "gnd"]))
+        self.recorder.submit(snapshot(3, BASE + HOUR + 5, ["bbb"])) # Next hourly segment
+        self.recorder.flush()
+
+    def test_segments_are_hourly_fixed_records(self):
+        self.recorder.close()
+        rec_files = sorted(f for f in os.listdir(self.dir) if f.endswith(".rec"))
+        self.assertEqual(len(rec_files), 2)
+        size = os.path.getsize(os.path.join(self.dir, rec_files[0]))
+        self.assertEqual(size, 4 * RECORD.size)
+        self.assertEqual(len([f for f in os.listdir(self.dir) if f.endswith(".hex")]), 2)
+
+    def test_query_time_window(self):
+        records = self.recorder.query(BASE + 15, BASE + HOUR + 10)
+        self.assertEqual([(r['version'], r['hex_id']) for r in records], [(2, "aaa"), (2, "gnd"), (3, "bbb")])
+        self.assertEqual(records[0]['source'], "Local (1090) + FA")
+        self.assertIsNone(records[1]['altitude'])
+
+    def test_query_by_hex(self):
+        self.assertEqual([r['version'] for r in self.recorder.query(BASE, BASE + 2 * HOUR, "aaa")], [1, 2])
+        # Closed segments answer hex queries from their hex index
+        self.recorder.close()
+        self.assertEqual([r['version'] for r in Recorder(self.dir).query(BASE, BASE + 2 * HOUR, "bbb")], [1, 3])
+
+    def test_query_by_hex_ignores_case(self):
+        self.recorder.submit(snapshot(4, BASE + 30, ["ABC123", " abc123"]))
+        self.recorder.flush()
+        self.assertEqual([r['hex_id'] for r in self.recorder.query(BASE, BASE + HOUR, "Abc123 ")], ["ABC123", " abc123"])
+        self.recorder.close()
+        self.assertEqual(len(Recorder(self.dir).query(BASE, BASE + HOUR, "abc123")), 2)
+
+    def test_empty_window(self):
+        self.assertEqual(self.recorder.query(BASE - 100, BASE - 50), [])
+
+    def test_window_end_is_inclusive(self):
+        self.assertEqual([r['version'] for r in self.recorder.query(BASE, BASE + 20)], [1, 1, 2, 2])
+        self.assertEqual([r['version'] for r in self.recorder.query(BASE + 20, BASE + 20)], [2, 2])
+
+    def test_limit(self):
+        records = self.recorder.query(BASE, BASE + 2 * HOUR, limit=3)
+        self.assertEqual([r['version'] for r in records], [1, 1, 2])
+
+    def test_invalid_window(self):
+        for start, end in ((0, 1e20), (0, float('nan')), (0, float('inf')), (BASE + 10, BASE), (-1, BASE)):
+            with self.assertRaises(ValueError):
+                self.recorder.query(start, end)
+
+class TestRecordingsEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.recorder = Recorder(self.dir)
+        self.addCleanup(self.recorder.close)
+        self.recorder.submit(snapshot(1, BASE + 10, ["aaa", "bbb"]))
+        self.recorder.submit(snapshot(2, BASE + 20, ["aaa"]))
+        self.recorder.flush()
+        patcher = patch('app.get_engine', return_value=SimpleNamespace(recorder=self.recorder))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = tracker_app.app.test_client()
+
+    def get(self, query):
+        return self.client.get('/api/recordings?' + query)
+
+    def test_invalid_parameters(self):
+        for query in (f"start={BASE}&end=1e20", f"start={BASE}&end=nan", f"start={BASE}&end=inf",
+                      f"start={BASE + 20}&end={BASE}", f"start=0&end={BASE}", f"start={BASE}&end={BASE + 20}&limit=0"):
+            self.assertEqual(self.get(query).status_code, 400, query)
+
+    def test_results_are_capped(self):
+        r = self.get(f"start={BASE}&end={BASE + 20}")
+        self.assertEqual((len(r.json['records']), r.json['truncated']), (3, False))
+        r = self.get(f"start={BASE}&end={BASE + 20}&limit=2")
+        self.assertEqual((len(r.json['records']), r.json['truncated']), (2, True))
+
+if __name__ == '__main__':
+    unittest.main()
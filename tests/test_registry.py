@@ -0,0 +1,180 @@
+import unittest
+import copy
+import os
+import shutil
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+# Add parent dir to path to import tracker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tracker import registry as registry_module
+from tracker.config import DEFAULT_CONFIG
+from tracker.flight import Flight
+from tracker.ingest import IngestionEngine, enrich_registry
+from tracker.registry import Registry, compile_index, open_registry, get_registry, registry_in_use
+from helpers import CountingFetcher, make_flight
+
+OPENSKY_CSV = """'icao24','timestamp','registration','typecode','operator','owner'
+'a0b1c2','2023-01-01','N12345','B738','United Airlines','United'
+'40621d','','G-EUPT','A319','British Airways',''
+'zzzzzz','','BAD','B738','',''
+'abc123','','N1AB','','',''
+'000001','','','','',''
+"""
+
+TAR1090_CSV = """icao,r,t,ownOp
+4CA7B5,EI-DCL,B738,Ryanair
+"""
+
+class RegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_csv(self, text, name="aircraft.csv"):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def open(self, text, **kwargs):
+        path = self.write_csv(text)
+        self.assertGreater(compile_index(path, path + ".idx"), 0)
+        registry = Registry(path + ".idx", **kwargs)
+        self.addCleanup(registry.close)
+        return registry
+
+class TestRegistry(RegistryTest):
+
+    def test_compile_and_lookup(self):
+        registry = self.open(OPENSKY_CSV)
+        self.assertEqual(len(registry), 3) # Bad address and empty row skipped
+        self.assertEqual(registry.lookup("a0b1c2"), ("N12345", "B738", "United Airlines"))
+        self.assertEqual(registry.lookup("40621D"), ("G-EUPT", "A319", "British Airways"))
+        self.assertEqual(registry.lookup("abc123"), ("N1AB", None, None))
+        for missing in ("000001", "ffffff", "000000", "~a0b1c2", "a0b1c", "0a0b1c2", " a0b1c2", None):
+            self.assertIsNone(registry.lookup(missing))
+
+    def test_alternate_column_names(self):
+        registry = self.open(TAR1090_CSV)
+        self.assertEqual(registry.lookup("4ca7b5"), ("EI-DCL", "B738", "Ryanair"))
+
+    def test_binary_search_over_many_entries(self):
+        rows = "".join(f"{address:06x},R{address},B738,\n" for address in range(0, 0xFFFFFF, 4099))
+        registry = self.open("icao24,registration,typecode,operator\n" + rows)
+        for address in range(0, 0xFFFFFF, 4099):
+            self.assertEqual(registry.lookup(f"{address:06x}")[0], f"R{address}")
+            self.assertIsNone(registry.lookup(f"{address + 1:06x}"))
+
+    def test_lru_keeps_recent_entries(self):
+        registry = self.open(OPENSKY_CSV, cache_size=2)
+        for hex_id in ("a0b1c2", "40621d", "a0b1c2", "abc123"):
+            registry.lookup(hex_id)
+        self.assertEqual(list(registry._cache), [0xa0b1c2, 0xabc123])
+
+    def test_rejects_other_files(self):
+        path = self.write_csv("not an index", "bogus.idx")
+        with self.assertRaises(ValueError):
+            Registry(path)
+        with self.assertRaises(ValueError):
+            compile_index(self.write_csv("name,value\n"), path)
+
+    def test_open_registry_requires_prebuilt_index(self):
+        path = self.write_csv(OPENSKY_CSV)
+        self.assertIsNone(open_registry({"enabled": False, "path": path}))
+        with self.assertLogs('tracker.registry', 'ERROR'):
+            self.assertIsNone(open_registry({"enabled": True, "path": path}))
+        self.assertFalse(os.path.exists(path + ".idx")) # Never compiled in process
+
+        compile_index(path, path + ".idx")
+        later = time.time() + 10
+        os.utime(path, (later, later))
+        with self.assertLogs('tracker.registry', 'WARNING'):
+            registry = open_registry({"enabled": True, "path": path})
+        self.assertEqual(len(registry), 3) # A stale index is still used
+        registry.close()
+
+class TestRegistryEnrichment(RegistryTest):
+
+    def setUp(self):
+        super().setUp()
+        self.config = copy.deepcopy(DEFAULT_CONFIG)
+        path = self.write_csv(OPENSKY_CSV)
+        compile_index(path, path + ".idx")
+        self.config['registry'].update(enabled=True, path=path)
+        patcher = patch('tracker.registry.load_config', return_value=self.config)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.reset_registry)
+
+    def reset_registry(self):
+        if registry_module._registry is not None:
+            registry_module._registry.close()
+        registry_module._registry = registry_module._registry_state = None
+
+    def test_get_registry_reopens_on_config_change(self):
+        registry = get_registry()
+        self.config['registry'] = dict(self.config['registry'], cache_size=10)
+        self.assertIs(get_registry(), registry) # Same files: reused
+        self.assertEqual(registry.cache_size, 10)
+
+        self.config['registry'] = dict(self.config['registry'], index_path=self.config['registry']['path'] + ".idx")
+        self.assertIsNot(get_registry(), registry)
+        self.assertTrue(registry.closed) # Replaced with no reader holding it
+        self.config['registry'] = dict(self.config['registry'], enabled=False)
+        self.assertIsNone(get_registry())
+
+    def test_replaced_registry_closes_after_last_reader(self):
+        with registry_in_use() as registry:
+            self.config['registry'] = dict(self.config['registry'], enabled=False)
+            self.assertIsNone(get_registry())
+            # A reader still holding the previous instance can keep using it
+            self.assertEqual(registry.lookup("a0b1c2")[0], "N12345")
+            self.assertFalse(registry.closed)
+        self.assertTrue(registry.closed)
+
+    def test_rebuilt_index_is_picked_up(self):
+        path = self.config['registry']['path']
+        self.assertIsNone(get_registry().lookup("4ca7b5"))
+        self.write_csv(TAR1090_CSV)
+        compile_index(path, path + ".idx")
+        later = time.time() + 10
+        os.utime(path + ".idx", (later, later))
+        self.assertEqual(get_registry().lookup("4ca7b5")[0], "EI-DCL")
+
+    def test_snapshot_flights_are_enriched(self):
+        local = make_flight("a0b1c2", "Local (1090)")
+        local['type'] = "A3" # dump1090 emitter category
+        with patch('tracker.ingest.load_config', return_value=self.config):
+            engine = IngestionEngine({
+                "local": CountingFetcher([local, make_flight("fedcba", "Local (1090)")]),
+                "flightaware": CountingFetcher([]),
+                "flightradar24": CountingFetcher([]),
+            })
+            self.addCleanup(engine.stop)
+            engine.get_snapshot(40.0, -74.0, 50, timeout=0)
+            engine.run_cycle()
+            snapshot = engine.get_snapshot(40.0, -74.0, 50, timeout=0)
+
+        flights = {f['hex_id']: f for f in snapshot.flights}
+        known = flights["a0b1c2"]
+        self.assertEqual((known['registration'], known['type'], known['operator']),
+                         ("N12345", "B738", "United Airlines"))
+        self.assertNotIn('registration', flights["fedcba"])
+        self.assertEqual(snapshot.profile['stages']['registry']['found'], 1)
+
+    def test_idents_are_not_looked_up(self):
+        flights = [make_flight("ABC123", "FlightAware"), make_flight("abc123", "Merged"),
+                   make_flight("abc123", "Flightradar24"), make_flight("abc123", "Local (1090)")]
+        flights = [Flight.from_dict(f) for f in flights]
+        flights[3].callsign = "UAL9"
+        self.assertEqual(enrich_registry(flights, get_registry()), 1)
+        self.assertEqual([f.get('registration') for f in flights], [None, None, None, "N1AB"])
+        self.assertEqual(flights[0].type, "B738")
+
+if __name__ == '__main__':
+    unittest.main()
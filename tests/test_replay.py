@@ -0,0 +1,87 @@
+import unittest
+import json
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+
+# Add parent dir to path to import tracker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tracker.replay import ReplaySource
+
+T0 = 1700000000
+
+def aircraft_json(now, hex_id, lat):
+    return {"now": now, "aircraft": [{"hex": hex_id, "lat": lat, "lon": -74.0, "seen": 1.0, "flight": "TEST1 "}]}
+
+FA_RESPONSE = {"flights": [{"ident": "UAL1", "aircraft_type": "B738", "last_position": {
+    "latitude": 40.5, "longitude": -74.5, "altitude": 350, "groundspeed": 420,
+    "heading": 90, "timestamp": "2023-11-14T22:13:20Z"}}]}
+
+class FakeClock:
+    def __init__(self): self.now = 5000.0
+    def __call__(self): return self.now
+
+def write_captures(root):
+    captures = {
+        f"dump1090/{T0}.json": aircraft_json(T0, "AAA111", 40.0),
+        f"dump1090/{T0 + 10}.json": aircraft_json(T0 + 10, "AAA111", 40.1),
+        f"dump978/{T0 + 5}.json": aircraft_json(T0 + 5, "BBB222", 39.0),
+        f"flightaware/{T0 + 2}.json": FA_RESPONSE,
+    }
+    for name, data in captures.items():
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(data, f)
+
+class TestReplaySource(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        write_captures(self.dir)
+        self.clock = FakeClock()
+
+    def test_frames_follow_accelerated_clock(self):
+        source = ReplaySource(self.dir, speed=10, loop=False, clock=self.clock)
+        flights, errors = source.fetch_local_data()
+        self.assertEqual([(f['hex_id'], f['lat']) for f in flights], [("aaa111", 40.0)])
+        self.assertEqual(source.fetch_flightaware(), ([], []))
+
+        self.clock.now += 0.6 # 6 s of capture time at 10x
+        flights, _ = source.fetch_local_data()
+        self.assertEqual(sorted(f['hex_id'] for f in flights), ["aaa111", "bbb222"])
+        fa, _ = source.fetch_flightaware()
+        self.assertEqual(fa[0]['altitude'], 35000)
+
+        self.clock.now += 100 # Past the end without looping: last frame stays
+        flights, _ = source.fetch_local_data()
+        self.assertIn(("aaa111", 40.1), [(f['hex_id'], f['lat']) for f in flights])
+
+    def test_loops(self):
+        source = ReplaySource(self.dir, speed=1, loop=True, clock=self.clock)
+        self.clock.now += 11 # One second into the second pass
+        flights, _ = source.fetch_local_data()
+        self.assertEqual([f['lat'] for f in flights], [40.0])
+
+    def test_reads_zip_archive(self):
+        archive = os.path.join(self.dir, "captures.zip")
+        with zipfile.ZipFile(archive, 'w') as z:
+            for channel in ("dump1090", "flightaware"):
+                for name in os.listdir(os.path.join(self.dir, channel)):
+                    z.write(os.path.join(self.dir, channel, name), f"run1/{channel}/{name}")
+        source = ReplaySource(archive, speed=1, clock=self.clock)
+        self.clock.now += 3
+        self.assertEqual(len(source.fetch_flightaware()[0]), 1)
+        self.assertEqual(len(source.fetch_local_data()[0]), 1)
+
+    def test_fetchers_plug_into_engine(self):
+        fetchers = ReplaySource(self.dir, clock=self.clock).fetchers()
+        self.assertEqual(set(fetchers), {"local", "flightaware", "flightradar24"})
+        self.assertEqual(fetchers["flightradar24"]((40.0, -74.0, 50)), ([], []))
+
+if __name__ == '__main__':
+    unittest.main()
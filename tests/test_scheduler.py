@@ -0,0 +1,109 @@
+import unittest
+import copy
+import os
+import sys
+from unittest.mock import patch
+
+# Add parent dir to path to import tracker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tracker.config import DEFAULT_CONFIG
+from tracker.ingest import IngestionEngine, Snapshot
+from tracker.scheduler import CallBudget, PollScheduler, local_coverage
+from helpers import CountingFetcher, make_flight
+
+AREA = (40.0, -74.0, 50.0)
+
+def snapshot_with(sources):
+    flights = tuple(dict(make_flight(f"h{i}", source), distance_from_obs=10.0) for i, source in enumerate(sources))
+    return Snapshot(1, 0.0, AREA, flights, ())
+
+class TestCallBudget(unittest.TestCase):
+
+    def test_per_minute_limit_rolls_over(self):
+        budget = CallBudget(per_minute=2)
+        self.assertTrue(budget.try_acquire(0))
+        self.assertTrue(budget.try_acquire(1))
+        self.assertFalse(budget.try_acquire(2))
+        self.assertTrue(budget.try_acquire(60))
+        self.assertEqual(budget.usage(60), (2, 3))
+
+    def test_per_day_limit(self):
+        budget = CallBudget(per_day=1)
+        self.assertTrue(budget.try_acquire(0))
+        self.assertFalse(budget.try_acquire(3600))
+        self.assertTrue(budget.try_acquire(86400))
+
+    def test_min_spacing(self):
+        self.assertEqual(CallBudget().min_spacing(), 0)
+        self.assertEqual(CallBudget(per_minute=6, per_day=1440).min_spacing(), 60)
+
+class TestPollScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = PollScheduler()
+        self.quota = copy.deepcopy(DEFAULT_CONFIG['quota'])
+
+    def test_local_coverage(self):
+        self.assertIsNone(local_coverage(None))
+        self.assertEqual(local_coverage(snapshot_with([])), 1.0)
+        self.assertEqual(local_coverage(snapshot_with(["Local (1090)", "Local (978) + FR24", "FlightAware", "Merged"])), 0.5)
+
+    def test_interval_follows_coverage(self):
+        interval = lambda coverage: self.scheduler.interval("flightaware", AREA, 10, coverage, 1, self.quota)
+        self.assertEqual(interval(None), 10)
+        self.assertEqual(interval(0.3), 10)
+        self.assertAlmostEqual(interval(0.7), 35)
+        self.assertEqual(interval(1.0), 60)
+
+    def test_budget_spreads_calls_across_areas(self):
+        self.quota['flightaware'] = {"per_minute": None, "per_day": 2880}  # one call per 30s
+        self.assertEqual(self.scheduler.interval("flightaware", AREA, 10, None, 3, self.quota), 90)
+
+    def test_usage_message(self):
+        self.assertIsNone(self.scheduler.usage_message("flightaware", "FlightAware", AREA, 0))
+        self.quota['flightaware'] = {"per_minute": 5, "per_day": 100}
+        self.scheduler.budget("flightaware", self.quota).try_acquire(0)
+        self.scheduler.interval("flightaware", AREA, 10, 1.0, 1, self.quota)
+        self.assertEqual(self.scheduler.usage_message("flightaware", "FlightAware", AREA, 1),
+                         "FlightAware budget: 1/5 calls this minute, 1/100 in 24h; polling every 864s (local coverage 100%)")
+
+class TestEngineScheduling(unittest.TestCase):
+
+    def setUp(self):
+        self.config = copy.deepcopy(DEFAULT_CONFIG)
+        patcher = patch('tracker.ingest.load_config', return_value=self.config)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.local = CountingFetcher([make_flight("abc123", "Local (1090)")])
+        self.fa = CountingFetcher([make_flight("abc123", "FlightAware")])
+        self.fr24 = CountingFetcher([])
+        self.engine = IngestionEngine({"local": self.local, "flightaware": self.fa, "flightradar24": self.fr24})
+        self.addCleanup(self.engine.stop)
+        self.engine.get_snapshot(*AREA, timeout=0)
+
+    def test_full_local_coverage_slows_paid_polling(self):
+        self.engine.run_cycle()
+        self.assertEqual(local_coverage(self.engine.get_snapshot(*AREA)), 1.0)
+
+        last = self.engine._last_fetch[("flightaware", AREA)]
+        jobs, _ = self.engine._due_jobs([AREA], last + 30, self.config)
+        self.assertNotIn(("flightaware", AREA), jobs)
+        jobs, _ = self.engine._due_jobs([AREA], last + 60, self.config)
+        self.assertIn(("flightaware", AREA), jobs)
+
+    def test_exhausted_budget_skips_poll_and_reports_usage(self):
+        self.config['quota']['flightaware'] = {"per_minute": 1, "per_day": None}
+        self.engine.run_cycle()
+        self.engine._last_fetch[("flightaware", AREA)] = 0 # Make it due again at once
+        self.engine.run_cycle()
+
+        self.assertEqual(self.fa.calls, 1)
+        snapshot = self.engine.get_snapshot(*AREA)
+        self.assertIn("FlightAware call budget exhausted: poll skipped (showing previous data)", snapshot.messages)
+        self.assertFalse(any(m.startswith("FlightAware budget:") for m in snapshot.messages))
+        self.assertTrue(any(u.startswith("FlightAware budget: 1/1 calls this minute") for u in snapshot.usage))
+
+if __name__ == '__main__':
+    unittest.main()
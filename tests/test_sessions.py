@@ -0,0 +1,81 @@
+import unittest
+import copy
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import patch
+
+# Add parent dir to path to import tracker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tracker.config import DEFAULT_CONFIG
+from tracker import sessions
+
+class TestSessions(unittest.TestCase):
+
+    def setUp(self):
+        self.config = copy.deepcopy(DEFAULT_CONFIG)
+        patcher = patch('tracker.sessions.load_config', return_value=self.config)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        sessions._sessions.clear()
+        sessions._session_settings = None
+
+    def test_session_is_shared(self):
+        self.assertIs(sessions.get_session(), sessions.get_session())
+
+    def test_pool_and_retry_settings_applied(self):
+        self.config['http'] = {"pool_connections": 3, "pool_maxsize": 7, "retries": 4}
+        adapter = sessions.get_session().get_adapter("https://aeroapi.flightaware.com")
+        self.assertEqual(adapter._pool_connections, 3)
+        self.assertEqual(adapter._pool_maxsize, 7)
+        self.assertEqual(adapter.max_retries.total, 4)
+        self.assertIn("gzip", sessions.get_session().headers["Accept-Encoding"])
+
+    def test_paid_session_never_resends_requests(self):
+        free = sessions.get_session().get_adapter("https://aeroapi.flightaware.com").max_retries
+        paid = sessions.get_session(paid=True).get_adapter("https://aeroapi.flightaware.com").max_retries
+        self.assertIsNot(sessions.get_session(paid=True), sessions.get_session())
+        self.assertEqual(set(free.status_forcelist), {502, 503, 504})
+        self.assertEqual((paid.status, paid.read, set(paid.status_forcelist)), (0, 0, set()))
+        self.assertEqual(paid.connect, free.connect)
+
+    def test_paid_5xx_is_one_billed_call(self):
+        hits = []
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                hits.append(self.path)
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            def log_message(self, *args):
+                pass
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.addCleanup(server.server_close)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+
+        url = f"http://127.0.0.1:{server.server_port}/"
+        self.config['http'] = {"retries": 2, "backoff_factor": 0}
+        self.assertEqual(sessions.get_session(paid=True).get(url, timeout=2).status_code, 503)
+        self.assertEqual(len(hits), 1)
+        sessions.get_session().get(url, timeout=2)
+        self.assertEqual(len(hits), 4)
+
+    def test_retries_fit_fetch_budget(self):
+        self.config['ingest']['fetch_budget_s'] = 4
+        self.config['http'] = {"retries": 2, "backoff_factor": 0.3}
+        timeout = sessions.request_timeout(5)
+        self.assertLessEqual(3 * timeout + 0.3 + 0.6, 4)
+        self.assertEqual(sessions.request_timeout(1), 1)
+        self.config['ingest']['fetch_budget_s'] = 0.1
+        self.assertEqual(sessions.request_timeout(5), 0.5)
+
+    def test_config_change_rebuilds_session(self):
+        first = sessions.get_session()
+        self.config['http'] = {"pool_maxsize": 20}
+        self.assertIsNot(sessions.get_session(), first)
+
+if __name__ == '__main__':
+    unittest.main()
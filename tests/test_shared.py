@@ -0,0 +1,164 @@
+import unittest
+import copy
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+# Add parent dir to path to import tracker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as tracker_app
+from tracker.config import DEFAULT_CONFIG
+from tracker.ingest import IngestionEngine, Snapshot
+from tracker.shared import SnapshotPublisher, SnapshotReader, requested_areas, run_ingestor, area_name
+from helpers import CountingFetcher, make_flight
+
+AREA = (40.0, -74.0, 50.0)
+
+def snapshot(version, n_flights=1):
+    flights = tuple(make_flight(f"{i:06x}", "Local (1090)") for i in range(n_flights))
+    return Snapshot(version, 1000.0 + version, AREA, flights, ())
+
+class SharedDirTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.publisher = SnapshotPublisher(self.directory)
+        self.reader = SnapshotReader(self.directory)
+
+    def read(self, coding=None):
+        shared = self.reader.open(AREA, coding)
+        self.addCleanup(shared.close)
+        body = shared.file.read()
+        self.assertEqual(len(body), shared.length)
+        return shared, body
+
+class TestSnapshotFiles(SharedDirTest):
+
+    def test_round_trip(self):
+        self.assertIsNone(self.reader.open(AREA))
+        self.publisher.publish(snapshot(7))
+        shared, body = self.read()
+        self.assertEqual((shared.version, shared.created, shared.coding), (7, 1007.0, None))
+        self.assertEqual(json.loads(body)['version'], 7)
+
+    def test_compressed_form_only_when_current(self):
+        self.publisher.publish(snapshot(1, n_flights=50))
+        shared, body = self.read("gzip")
+        self.assertEqual(shared.coding, "gzip")
+        self.assertEqual(len(json.loads(gzip.decompress(body))['flights']), 50)
+
+        # Too small to compress: the old .gz is left behind but not served
+        self.publisher.publish(snapshot(2, n_flights=1))
+        shared, _ = self.read("gzip")
+        self.assertEqual((shared.version, shared.coding), (2, None))
+
+    def test_restart_clears_previous_snapshots(self):
+        self.reader.request_area(AREA)
+        self.publisher.publish(snapshot(9))
+        SnapshotPublisher(self.directory)
+        self.assertIsNone(self.reader.open(AREA))
+
+    def test_area_markers(self):
+        self.reader.request_area(AREA, now=100)
+        marker = os.path.join(self.directory, "areas", area_name(AREA))
+        os.utime(marker, (100, 100))
+        self.assertEqual(requested_areas(self.directory, 120, now=200), {AREA: 100})
+
+        self.publisher.publish(snapshot(1))
+        self.assertEqual(requested_areas(self.directory, 120, now=300), {})
+        self.assertFalse(os.path.exists(marker))
+        self.assertIsNone(self.reader.open(AREA))
+
+    def test_wait_returns_any_other_snapshot(self):
+        self.publisher.publish(snapshot(5))
+        shared = self.reader.wait(AREA, after_tag=f"{self.publisher.epoch:08x}.8", timeout=0)
+        self.addCleanup(shared.close)
+        self.assertEqual(shared.version, 5)
+
+        # Same version from a restarted publisher
+        SnapshotPublisher(self.directory).publish(snapshot(5))
+        restarted = self.reader.wait(AREA, after_tag=shared.tag, timeout=0)
+        self.addCleanup(restarted.close)
+        self.assertNotEqual(restarted.tag, shared.tag)
+
+class TestIngestor(SharedDirTest):
+
+    def test_worker_request_reaches_engine_and_snapshot_is_published(self):
+        config = copy.deepcopy(DEFAULT_CONFIG)
+        with patch('tracker.ingest.load_config', return_value=config):
+            engine = IngestionEngine({
+                "local": CountingFetcher([make_flight("abc123", "Local (1090)")]),
+                "flightaware": CountingFetcher([]),
+                "flightradar24": CountingFetcher([]),
+            })
+        self.addCleanup(engine.stop)
+        stop = threading.Event()
+        self.addCleanup(stop.set)
+        with patch('tracker.shared.load_config', return_value=config):
+            thread = threading.Thread(target=run_ingestor, args=(engine, self.directory, 0.01, stop), daemon=True)
+            thread.start()
+            self.reader.request_area(AREA)
+            deadline = time.time() + 5
+            while not engine._areas and time.time() < deadline:
+                time.sleep(0.01)
+        self.assertIn(AREA, engine._areas)
+
+        with patch('tracker.ingest.load_config', return_value=config):
+            engine.run_cycle()
+        shared, body = self.read()
+        self.assertEqual(shared.version, engine._snapshots[AREA].version)
+        self.assertEqual(json.loads(body)['flights'][0]['hex_id'], "abc123")
+
+class TestWorkerMode(SharedDirTest):
+
+    def setUp(self):
+        super().setUp()
+        config = copy.deepcopy(DEFAULT_CONFIG)
+        config['server'].update(mode="worker", shared_dir=self.directory)
+        config['ingest']['first_snapshot_timeout_s'] = 0
+        for target, kwargs in (('app.load_config', {"return_value": config}),
+                               ('app.get_engine', {"side_effect": AssertionError("workers never run the engine")})):
+            patcher = patch(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = tracker_app.app.test_client()
+        self.url = '/api/flights?lat=40&lon=-74&radius=50'
+
+    def test_serves_published_snapshot(self):
+        r = self.client.get(self.url)
+        self.assertEqual(r.json['version'], 0)
+
+        self.publisher.publish(snapshot(3, n_flights=50))
+        r = self.client.get(self.url)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.json['flights']), 50)
+        tag = f"{self.publisher.epoch:08x}.3"
+        self.assertEqual(r.headers['ETag'], f'"{tag}"')
+        self.assertEqual(self.client.get(self.url, headers={'If-None-Match': f'"{tag}"'}).status_code, 304)
+
+        r = self.client.get(self.url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual((r.headers['Content-Encoding'], r.headers['ETag']), ('gzip', f'"{tag}-gzip"'))
+        self.assertEqual(len(json.loads(gzip.decompress(r.data))['flights']), 50)
+
+    def test_etag_changes_when_ingestor_restarts(self):
+        self.publisher.publish(snapshot(3, n_flights=2))
+        etag = self.client.get(self.url).headers['ETag']
+        SnapshotPublisher(self.directory).publish(snapshot(3, n_flights=5))
+        r = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.json['flights']), 5)
+
+    def test_engine_endpoints_unavailable(self):
+        for url in ('/api/tracks/abc123', '/api/receivers', '/metrics', '/admin/profile?mode=cprofile'):
+            self.assertEqual(self.client.get(url).status_code, 503, url)
+
+if __name__ == '__main__':
+    unittest.main()
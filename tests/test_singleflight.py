@@ -0,0 +1,91 @@
+import unittest
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+# Add parent dir to path to import tracker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tracker.singleflight import SingleFlight
+from tracker import api
+
+class FakeClock:
+    def __init__(self): self.now = 0.0
+    def __call__(self): return self.now
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "result"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(5)]
+        for t in followers: t.start()
+        release.set()
+        for t in [leader] + followers: t.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["result"] * 6)
+
+    def test_ttl_cache(self):
+        clock = FakeClock()
+        flight = SingleFlight(clock=clock)
+        calls = []
+        fn = lambda: calls.append(1) or len(calls)
+
+        self.assertEqual(flight.do("k", fn, ttl=5), 1)
+        clock.now = 4.9
+        self.assertEqual(flight.do("k", fn, ttl=5), 1)
+        clock.now = 5.1
+        self.assertEqual(flight.do("k", fn, ttl=5), 2)
+        self.assertEqual(flight.do("other", fn, ttl=5), 3)
+
+    def test_expired_results_are_swept(self):
+        clock = FakeClock()
+        flight = SingleFlight(clock=clock)
+        for i in range(1000):
+            flight.do(("area", i), lambda: "result", ttl=0.01)
+        self.assertEqual(len(flight), 1000)
+        clock.now = 1.0
+        flight.do("new", lambda: "result", ttl=5)
+        self.assertEqual(len(flight), 1)
+
+    def test_uncacheable_results_and_errors_are_not_cached(self):
+        flight = SingleFlight()
+        calls = []
+        fn = lambda: calls.append(1) or ([], ["error"])
+        flight.do("k", fn, ttl=5, cacheable=lambda r: not r[1])
+        flight.do("k", fn, ttl=5, cacheable=lambda r: not r[1])
+        self.assertEqual(len(calls), 2)
+
+        def boom(): raise ValueError("boom")
+        with self.assertRaises(ValueError):
+            flight.do("e", boom, ttl=5)
+        self.assertEqual(flight.do("e", lambda: "ok", ttl=5), "ok")
+
+    @patch('tracker.api.load_config')
+    @patch('tracker.api._query_flightaware')
+    def test_fetch_flightaware_coalesces_by_bounding_box(self, mock_query, mock_config):
+        mock_config.return_value = {'api_keys': {'flightaware': 'real-key'}, 'api_cache': {'ttl_s': 5}}
+        mock_query.return_value = ([{"hex_id": "ABC"}], [])
+        api._fa_calls.clear()
+
+        api.fetch_flightaware(40.0, -74.0, 50)
+        api.fetch_flightaware(40.0, -74.0, 50)
+        api.fetch_flightaware(41.0, -74.0, 50)
+        self.assertEqual(mock_query.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import os
+import sys
+
+# Add parent dir to path to import tracker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tracker.tracks import TrackStore, POINT_BYTES
+
+def report(hex_id, ts, lat=40.0, alt=10000):
+    return {"hex_id": hex_id, "timestamp": ts, "lat": lat, "lon": -74.0,
+            "altitude": alt, "speed": 300, "heading": 90}
+
+class TestTrackStore(unittest.TestCase):
+
+    def test_ring_buffer_keeps_latest_points(self):
+        store = TrackStore(points_per_track=3)
+        for ts in range(1, 6):
+            store.record([report("abc", ts, lat=40 + ts)], now=ts)
+
+        points = store.get("abc")
+        self.assertEqual([p[0] for p in points], [3.0, 4.0, 5.0])
+        self.assertEqual(points[-1][1], 45.0)
+        self.assertEqual(store.total_points, 3)
+
+    def test_repeated_reports_are_not_duplicated(self):
+        store = TrackStore()
+        store.record([report("abc", 100)], now=1)
+        store.record([report("abc", 100)], now=2)
+        self.assertEqual(len(store.get("abc")), 1)
+
+    def test_non_numeric_fields_become_none(self):
+        store = TrackStore()
+        store.record([report("abc", 100, alt="ground")], now=1)
+        self.assertIsNone(store.get("abc")[0][3])
+
+    def test_ttl_eviction(self):
+        store = TrackStore(ttl_s=60)
+        store.record([report("old", 1)], now=0)
+        store.record([report("new", 1)], now=50)
+        store.record([report("new", 2)], now=100)
+        self.assertIsNone(store.get("old"))
+        self.assertIsNotNone(store.get("new"))
+
+    def test_memory_cap_evicts_least_recently_updated(self):
+        store = TrackStore(points_per_track=100, max_memory_mb=(4 * POINT_BYTES) / (1024 * 1024))
+        store.record([report("a", 1), report("b", 1)], now=1)
+        store.record([report("b", 2), report("c", 1)], now=2)
+        store.record([report("c", 2)], now=3) # Five points now, over the cap of four
+        self.assertIsNone(store.get("a"))
+        self.assertEqual(store.total_points, 4)
+
+    def test_since(self):
+        store = TrackStore()
+        store.record([report("a", 10), report("b", 10)], now=1)
+        store.record([report("a", 20)], now=2)
+        result = store.since(15)
+        self.assertEqual(list(result), ["a"])
+        self.assertEqual([p[0] for p in result["a"]], [20.0])
+
+    def test_hex_ids_are_case_insensitive(self):
+        store = TrackStore()
+        store.record([report("ABC123", 10)], now=1)
+        store.record([report("abc123", 20)], now=2)
+        self.assertEqual(len(store), 1)
+        self.assertEqual([p[0] for p in store.get("Abc123")], [10.0, 20.0])
+
+if __name__ == '__main__':
+    unittest.main()
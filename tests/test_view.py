@@ -0,0 +1,115 @@
+import unittest
+import copy
+import os
+import sys
+from unittest.mock import patch
+
+# Add parent dir to path to import tracker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as tracker_app
+from tracker.config import DEFAULT_CONFIG
+from tracker.ingest import IngestionEngine
+from tracker.view import parse_bounds, in_bounds, decimate, select_flights
+from helpers import CountingFetcher, make_flight
+
+def located(hex_id, lat, lon, distance):
+    f = make_flight(hex_id, "Local (1090)", lat, lon)
+    f['distance_from_obs'] = distance
+    return f
+
+class TestView(unittest.TestCase):
+
+    def test_parse_bounds(self):
+        self.assertEqual(parse_bounds("39.5,-75,40.5,-73"), (39.5, -75.0, 40.5, -73.0))
+        for bad in ("1,2,3", "41,-75,40,-73", "39,-75,40,x", "39,-190,40,-73"):
+            with self.assertRaises(ValueError):
+                parse_bounds(bad)
+
+    def test_antimeridian(self):
+        bounds = parse_bounds("50,170,60,-170")
+        self.assertTrue(in_bounds(55, 175, bounds))
+        self.assertTrue(in_bounds(55, -175, bounds))
+        self.assertFalse(in_bounds(55, 0, bounds))
+
+    def test_decimate_keeps_closest_per_cell(self):
+        flights = [located("aaa001", 40.0, -74.0, 10), located("aaa002", 40.001, -74.001, 3),
+                   located("bbb001", 45.0, -60.0, 500)]
+        kept, clusters = decimate(flights, 5, 40, 40.0)
+        self.assertEqual([f['hex_id'] for f in kept], ["aaa002", "bbb001"])
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual((clusters[0]['count'], clusters[0]['hex_id']), (2, "aaa002"))
+
+    def test_select_flights(self):
+        flights = [located("aaa001", 40.0, -74.0, 10), located("aaa002", 40.5, -74.0, 30),
+                   located("ccc001", 10.0, 10.0, 4000), make_flight("ddd001", "FlightAware", None, None)]
+        culled, clusters = select_flights(flights, 40.0, bounds=(39, -75, 41, -73))
+        self.assertEqual([f['hex_id'] for f in culled], ["aaa001", "aaa002"])
+        self.assertEqual(clusters, [])
+
+        closest, _ = select_flights(flights, 40.0, limit=2)
+        self.assertEqual([f['hex_id'] for f in closest], ["aaa001", "aaa002"])
+
+        # Above cluster_below_zoom nothing is decimated
+        zoomed, clusters = select_flights(flights, 40.0, zoom=12)
+        self.assertEqual((len(zoomed), clusters), (4, []))
+
+class TestViewEndpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.config = copy.deepcopy(DEFAULT_CONFIG)
+        patcher = patch('app.load_config', return_value=self.config)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        local = [make_flight("abc001", "Local (1090)", 40.0, -74.0),
+                 make_flight("abc002", "Local (1090)", 40.01, -74.01),
+                 make_flight("abc003", "Local (1090)", 40.3, -73.6),
+                 make_flight("abc004", "Local (1090)", 41.4, -72.5)] # Corner of the bounding box
+        with patch('tracker.ingest.load_config', return_value=self.config):
+            self.engine = IngestionEngine({
+                "local": CountingFetcher(local),
+                "flightaware": CountingFetcher([]),
+                "flightradar24": CountingFetcher([]),
+            })
+            self.addCleanup(self.engine.stop)
+            self.engine.get_snapshot(40.0, -74.0, 50, timeout=0)
+            self.engine.run_cycle()
+        patcher = patch('app.get_engine', return_value=self.engine)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = tracker_app.app.test_client()
+        self.url = '/api/flights?lat=40&lon=-74&radius=50'
+
+    def hex_ids(self, r):
+        return [f['hex_id'] for f in r.json['flights']]
+
+    def test_snapshot_is_filtered_to_radius(self):
+        self.assertEqual(sorted(self.hex_ids(self.client.get(self.url))), ["abc001", "abc002", "abc003"])
+
+    def test_bounds_zoom_and_limit(self):
+        r = self.client.get(self.url + '&bounds=39.9,-74.1,40.1,-73.9')
+        self.assertEqual(sorted(self.hex_ids(r)), ["abc001", "abc002"])
+        self.assertEqual(r.json['total'], 3)
+
+        r = self.client.get(self.url + '&zoom=6')
+        self.assertEqual(len(r.json['flights']), 2)
+        self.assertEqual(r.json['clusters'][0]['count'], 2)
+
+        r = self.client.get(self.url + '&limit=1')
+        self.assertEqual(self.hex_ids(r), ["abc001"])
+
+    def test_view_etag_differs_per_view(self):
+        a = self.client.get(self.url + '&limit=1')
+        b = self.client.get(self.url + '&limit=2')
+        self.assertNotEqual(a.headers['ETag'], b.headers['ETag'])
+        self.assertNotEqual(a.headers['ETag'], self.client.get(self.url).headers['ETag'])
+        r = self.client.get(self.url + '&limit=1', headers={'If-None-Match': a.headers['ETag']})
+        self.assertEqual(r.status_code, 304)
+
+    def test_invalid_view(self):
+        for query in ('&bounds=1,2', '&zoom=x', '&zoom=-2000', '&zoom=25', '&limit=0', '&limit=999999'):
+            self.assertEqual(self.client.get(self.url + query).status_code, 400, query)
+
+if __name__ == '__main__':
+    unittest.main()
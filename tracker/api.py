@@ -4,9 +4,23 @@ import logging
 from datetime import datetime, timezone
 from .geo import get_bounding_box
 from .config import load_config
+from .sessions import get_session, request_timeout
+from .singleflight import SingleFlight
+from .flight import Flight
+from .metrics import NORMALIZE_SECONDS
 
 logger = logging.getLogger(__name__)
 
+# Identical bounding-box queries share one in-flight upstream call and a short-lived result
+_fa_calls = SingleFlight()
+_fr24_calls = SingleFlight()
+
+def _no_errors(result):
+    return not result[1]
+
+def _cache_ttl(config):
+    return (config.get('api_cache') or {}).get('ttl_s', 5)
+
 def parse_fa_time(iso_str):
     try:
         # Handle fractional seconds if present by taking only first 19 chars (YYYY-MM-DDTHH:MM:SS)
@@ -22,6 +36,32 @@ def parse_fa_time(iso_str):
         logger.warning(f"Failed to parse FlightAware time {iso_str}: {e}")
         return int(time.time())
 
+def normalize_fa_response(data):
+    """
+    Normalizes an AeroAPI /flights/search response to the internal format.
+    """
+    normalized_flights = []
+    for f in data.get('flights', []):
+        pos = f.get('last_position')
+        if not pos: continue
+
+        ident = f.get('ident') or 'Unknown'
+        ts = parse_fa_time(pos.get('timestamp'))
+
+        normalized_flights.append(Flight(
+            "FlightAware",                                               # source
+            ident,                                                       # hex_id
+            ident,                                                       # callsign
+            pos.get('latitude'),                                         # lat
+            pos.get('longitude'),                                        # lon
+            pos.get('heading', 0),                                       # heading
+            pos.get('altitude', 0) * 100 if pos.get('altitude') else 0,  # altitude
+            pos.get('groundspeed', 0),                                   # speed
+            f.get('aircraft_type', 'Unknown'),                           # type
+            ts                                                           # timestamp
+        ))
+    return normalized_flights
+
 def fetch_flightaware(lat, lon, radius_nm):
     config = load_config()
     api_key = config['api_keys'].get('flightaware')
@@ -30,38 +70,23 @@ def fetch_flightaware(lat, lon, radius_nm):
     if not api_key or str(api_key).strip() == "" or "YOUR_" in str(api_key):
         return [], [] # Return no flights and NO errors - silent disable
 
-    min_lat, max_lat, min_lon, max_lon = get_bounding_box(lat, lon, radius_nm)
+    bbox = get_bounding_box(lat, lon, radius_nm)
+    return _fa_calls.do(bbox, lambda: _query_flightaware(api_key, bbox),
+                        ttl=_cache_ttl(config), cacheable=_no_errors)
+
+def _query_flightaware(api_key, bbox):
+    min_lat, max_lat, min_lon, max_lon = bbox
     url = "https://aeroapi.flightaware.com/aeroapi/flights/search"
     query = f'-latlong "{min_lat} {min_lon} {max_lat} {max_lon}"'
     headers = {"x-apikey": api_key, "Accept": "application/json; charset=UTF-8"}
     params = {"query": query, "max_pages": 1}
 
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=5)
+        response = get_session(paid=True).get(url, headers=headers, params=params, timeout=request_timeout(5))
         response.raise_for_status()
         data = response.json()
-
-        normalized_flights = []
-        for f in data.get('flights', []):
-            pos = f.get('last_position')
-            if not pos: continue
-
-            ident = f.get('ident') or 'Unknown'
-            ts = parse_fa_time(pos.get('timestamp'))
-
-            normalized_flights.append({
-                "source": "FlightAware",
-                "hex_id": ident,
-                "callsign": ident,
-                "lat": pos.get('latitude'),
-                "lon": pos.get('longitude'),
-                "heading": pos.get('heading', 0),
-                "altitude": pos.get('altitude', 0) * 100 if pos.get('altitude') else 0,
-                "speed": pos.get('groundspeed', 0),
-                "type": f.get('aircraft_type', 'Unknown'),
-                "timestamp": ts
-            })
-        return normalized_flights, []
+        with NORMALIZE_SECONDS.labels("flightaware").time():
+            return normalize_fa_response(data), []
 
     except requests.exceptions.RequestException as e:
         logger.error(f"FlightAware API Error: {e}")
@@ -76,6 +101,31 @@ def fetch_flightaware(lat, lon, radius_nm):
         logger.error(f"Unexpected FlightAware Error: {e}")
         return [], [f"FlightAware Error: {str(e)}"]
 
+def normalize_fr24_response(data):
+    """
+    Normalizes an FR24 live flight-positions response to the internal format.
+    """
+    normalized_flights = []
+    for f in data.get('data', []):
+        raw_hex = f.get('hex')
+        safe_hex = str(raw_hex).lower() if raw_hex else None
+        safe_callsign = f.get('callsign') or 'Unknown'
+        ts = f.get('updated', int(time.time()))
+
+        normalized_flights.append(Flight(
+            "Flightradar24",            # source
+            safe_hex or safe_callsign,  # hex_id
+            safe_callsign,              # callsign
+            f.get('lat'),               # lat
+            f.get('lon'),               # lon
+            f.get('track', 0),          # heading
+            f.get('alt', 0),            # altitude
+            f.get('gs', 0),             # speed
+            f.get('type', 'Unknown'),   # type
+            ts                          # timestamp
+        ))
+    return normalized_flights
+
 def fetch_flightradar24(lat, lon, radius_nm):
     config = load_config()
     token = config['api_keys'].get('flightradar24')
@@ -84,7 +134,12 @@ def fetch_flightradar24(lat, lon, radius_nm):
     if not token or str(token).strip() == "" or "YOUR_" in str(token):
         return [], [] # Return no flights and NO errors - silent disable
 
-    min_lat, max_lat, min_lon, max_lon = get_bounding_box(lat, lon, radius_nm)
+    bbox = get_bounding_box(lat, lon, radius_nm)
+    return _fr24_calls.do(bbox, lambda: _query_flightradar24(token, bbox),
+                          ttl=_cache_ttl(config), cacheable=_no_errors)
+
+def _query_flightradar24(token, bbox):
+    min_lat, max_lat, min_lon, max_lon = bbox
     bounds_str = f"{max_lat},{min_lat},{min_lon},{max_lon}"
     url = f"https://fr24api.flightradar24.com/api/live/flight-positions/full?bounds={bounds_str}"
 
@@ -95,30 +150,11 @@ def fetch_flightradar24(lat, lon, radius_nm):
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=5)
+        response = get_session(paid=True).get(url, headers=headers, timeout=request_timeout(5))
         response.raise_for_status()
         data = response.json()
-
-        normalized_flights = []
-        for f in data.get('data', []):
-            raw_hex = f.get('hex')
-            safe_hex = str(raw_hex).lower() if raw_hex else None
-            safe_callsign = f.get('callsign') or 'Unknown'
-            ts = f.get('updated', int(time.time()))
-
-            normalized_flights.append({
-                "source": "Flightradar24",
-                "hex_id": safe_hex or safe_callsign,
-                "callsign": safe_callsign,
-                "lat": f.get('lat'),
-                "lon": f.get('lon'),
-                "heading": f.get('track', 0),
-                "altitude": f.get('alt', 0),
-                "speed": f.get('gs', 0),
-                "type": f.get('type', 'Unknown'),
-                "timestamp": ts
-            })
-        return normalized_flights, []
+        with NORMALIZE_SECONDS.labels("flightradar24").time():
+            return normalize_fr24_response(data), []
 
     except requests.exceptions.RequestException as e:
         logger.error(f"FR24 API Error: {e}")
@@ -1,6 +1,10 @@
 import os
+import threading
+import time
 import yaml
 import logging
+from types import MappingProxyType
+from .watcher import get_watcher
 
 # Configure logger for this module
 logger = logging.getLogger(__name__)
@@ -15,7 +19,15 @@ DEFAULT_CONFIG = {
     },
     "local_sources": {
         "dump1090": "/run/dump1090-fa/aircraft.json",
-        "dump978": "/run/dump978-fa/aircraft.json"
+        "dump978": "/run/dump978-fa/aircraft.json",
+        "sbs": None,   # "host:port" of an SBS-1/BaseStation feed (dump1090 port 30003)
+        "beast": None,  # "host:port" of a Beast binary feed (dump1090 port 30005)
+        # Named receivers fetched in parallel and merged by hex; when set,
+        # they replace the four single entries above. Each has a `name` and
+        # one of `source` (aircraft.json path or URL), `sbs` or `beast`.
+        "receivers": [],
+        "receiver_workers": 16,
+        "receiver_timeout_s": 3
     },
     "observer": {
         "latitude": 39.0,
@@ -25,67 +37,304 @@ DEFAULT_CONFIG = {
     },
     "server": {
         "host": "0.0.0.0",
-        "port": 5000
+        "port": 5000,
+        "mode": "single",  # "worker": serve snapshots published by `python -m tracker.shared`
+        "shared_dir": None # Snapshot directory shared with workers (default /dev/shm/flight-tracker)
+    },
+    "ingest": {
+        "local_interval_s": 2,
+        "flightaware_interval_s": 10,
+        "flightradar24_interval_s": 10,
+        "area_idle_timeout_s": 120,
+        "first_snapshot_timeout_s": 15,
+        "fetch_budget_s": 4,
+        "max_workers": 8,
+        "history_versions": 20
+    },
+    "http": {
+        "pool_connections": 10,
+        "pool_maxsize": 10,
+        "retries": 1,
+        "backoff_factor": 0.3
+    },
+    "quota": {
+        # Call budgets for paid providers (None = unlimited)
+        "flightaware": {"per_minute": None, "per_day": None},
+        "flightradar24": {"per_minute": None, "per_day": None},
+        # Poll intervals stretch to max_interval_s as local coverage rises
+        "coverage_low": 0.5,
+        "coverage_high": 0.9,
+        "max_interval_s": 60
+    },
+    "api_cache": {
+        "ttl_s": 5
+    },
+    "encoding": {
+        "gzip_level": 6,
+        "brotli_quality": 5,
+        "min_compress_bytes": 1024
+    },
+    "profiling": {
+        "request_profile": False,  # Allow /api/flights?profile=1
+        "capture_enabled": False,  # Allow /admin/profile captures
+        "admin_token": None,       # If set, /admin/profile requires it in X-Admin-Token
+        "max_capture_s": 60,
+        "sample_interval_ms": 5
+    },
+    "view": {
+        "filter_radius": True,     # Drop aircraft outside the range ring
+        "cluster_below_zoom": 8,   # Decimate /api/flights?zoom= below this map zoom
+        "cluster_cell_px": 40,     # One aircraft per cell of about this many pixels
+        "max_limit": 5000          # Largest accepted /api/flights?limit=
+    },
+    "registry": {
+        "enabled": False,
+        "path": None,          # Aircraft database CSV (e.g. OpenSky aircraftDatabase.csv)
+        "index_path": None,    # Compiled index; defaults to <path>.idx
+        "cache_size": 4096     # Most recently looked-up aircraft kept decoded
+    },
+    "tracks": {
+        "points_per_track": 360,
+        "max_memory_mb": 64,
+        "ttl_s": 600
+    },
+    "recorder": {
+        "enabled": False,
+        "path": "recordings",
+        "queue_size": 100,
+        "max_query_s": 86400,         # Widest /api/recordings window
+        "max_query_records": 100000   # Records returned per /api/recordings query
+    },
+    "replay": {
+        "enabled": False,
+        "path": "captures",
+        "speed": 1.0,
+        "loop": True
     }
 }
 
-# Simple cache to avoid re-reading file on every request
-_cached_config = None
-_cached_mtime = 0
+# Seconds to wait after a change event before reloading, so an editor's
+# several writes trigger a single reload
+RELOAD_DEBOUNCE_S = 0.2
 
-def load_config():
-    global _cached_config, _cached_mtime
+# Seconds between metadata checks where inotify is unavailable
+POLL_INTERVAL_S = 2
+
+def freeze(value):
+    """
+    Returns a read-only copy: dicts become mapping proxies, lists tuples.
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(v) for key, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+def merge_defaults(config, defaults=DEFAULT_CONFIG):
+    """
+    Fills in every key missing from `config`, at any depth. A section left
+    empty in YAML (null) gets all of its defaults.
+    """
+    merged = dict(defaults)
+    for key, value in config.items():
+        default = defaults.get(key)
+        if isinstance(default, dict) and value is None:
+            continue
+        if isinstance(default, dict) and isinstance(value, dict):
+            merged[key] = merge_defaults(value, default)
+        else:
+            merged[key] = value
+    return merged
+
+def validate_config(config, defaults=DEFAULT_CONFIG, path=""):
+    """
+    Returns a list of problems with a merged config; empty if it is valid.
+    Values must have the type of their default; a default of None accepts
+    anything, and strings and lists may be left empty (null).
+    """
+    problems = []
+    for key, default in defaults.items():
+        if key not in config or default is None:
+            continue
+        value = config[key]
+        where = f"{path}{key}"
+        if isinstance(default, dict):
+            if not isinstance(value, dict):
+                problems.append(f"{where} must be a mapping")
+            else:
+                problems.extend(validate_config(value, default, where + "."))
+        elif isinstance(default, bool):
+            if not isinstance(value, bool):
+                problems.append(f"{where} must be true or false")
+        elif isinstance(default, (int, float)):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                problems.append(f"{where} must be a number")
+        elif isinstance(default, (str, list)) and value is not None and not isinstance(value, type(default)):
+            problems.append(f"{where} must be a {'string' if isinstance(default, str) else 'list'}")
+
+    if not path:
+        names = set()
+        for i, receiver in enumerate(config.get('local_sources', {}).get('receivers') or []):
+            where = f"local_sources.receivers[{i}]"
+            if not isinstance(receiver, dict) or not receiver.get('name'):
+                problems.append(f"{where} needs a name")
+                continue
+            if sum(1 for key in ('source', 'sbs', 'beast') if receiver.get(key)) != 1:
+                problems.append(f"{where} needs exactly one of source, sbs or beast")
+            if receiver['name'] in names:
+                problems.append(f"{where} repeats the name {receiver['name']!r}")
+            names.add(receiver['name'])
+    return problems
+
+class ConfigStore:
+    """
+    Holds the current configuration as an immutable, validated snapshot.
+
+    The file is read once; afterwards `current()` does no I/O at all. Changes
+    are picked up by the inotify watcher (or a metadata poll where inotify is
+    unavailable), debounced, validated and swapped in as a whole, then
+    subscribers are told. A file that fails to parse or validate is rejected
+    and the previous snapshot stays in force.
+    """
+
+    def __init__(self, path=CONFIG_FILE):
+        self.path = path
+        self._current = None
+        self._signature = None
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._timer = None
+        self._watching = False
 
-    if not os.path.exists(CONFIG_FILE):
+    def current(self):
+        snapshot = self._current
+        if snapshot is None:
+            with self._lock:
+                if self._current is None:
+                    self._current = self._read(None) or freeze(DEFAULT_CONFIG)
+                snapshot = self._current
+            self._start_watching()
+        return snapshot
+
+    def subscribe(self, callback):
+        """
+        Calls `callback(old, new)` after every successful reload.
+        """
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        try:
+            self._subscribers.remove(callback)
+        except ValueError:
+            pass
+
+    def reload(self):
+        """
+        Re-reads the file now. Returns True if a new snapshot was applied.
+        """
+        with self._lock:
+            old = self._current
+            new = self._read(old)
+            if new is None or new == old:
+                return False
+            self._current = new
+        logger.info("Configuration reloaded.")
+        for callback in list(self._subscribers):
+            try:
+                callback(old, new)
+            except Exception as e:
+                logger.error(f"Configuration subscriber failed: {e}")
+        return True
+
+    def _file_signature(self):
         try:
-            with open(CONFIG_FILE, 'w') as f:
-                yaml.dump(DEFAULT_CONFIG, f, default_flow_style=False)
-            _cached_config = DEFAULT_CONFIG
-            _cached_mtime = os.path.getmtime(CONFIG_FILE)
-            logger.info(f"Created default configuration file at {CONFIG_FILE}")
-            return DEFAULT_CONFIG
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _read(self, previous):
+        """
+        Returns a new snapshot from the file, or None to keep `previous`.
+        """
+        if not os.path.exists(self.path):
+            try:
+                with open(self.path, 'w') as f:
+                    yaml.dump(DEFAULT_CONFIG, f, default_flow_style=False)
+                logger.info(f"Created default configuration file at {self.path}")
+            except Exception as e:
+                logger.error(f"Failed to create default config file: {e}")
+                return None
+
+        self._signature = self._file_signature()
+        try:
+            with open(self.path, 'r') as f:
+                config = yaml.safe_load(f)
+        except yaml.YAMLError as e:
+            logger.error(f"Error parsing {self.path}: {e}")
+            return None
         except Exception as e:
-            logger.error(f"Failed to create default config file: {e}")
-            return DEFAULT_CONFIG
-
-    # Check if file changed
-    try:
-        current_mtime = os.path.getmtime(CONFIG_FILE)
-        if _cached_config and current_mtime == _cached_mtime:
-            return _cached_config
-
-        logger.info(f"Reloading configuration from {CONFIG_FILE}")
-        with open(CONFIG_FILE, 'r') as f:
-            config = yaml.safe_load(f)
-
-            if not config:
-                logger.warning(f"Configuration file {CONFIG_FILE} is empty.")
-                if _cached_config:
-                     logger.warning("Retaining previous valid configuration.")
-                     return _cached_config
-                logger.warning("Using default configuration.")
-                return DEFAULT_CONFIG
-
-            # Validate/Merge with defaults
-            for section in DEFAULT_CONFIG:
-                if section not in config:
-                    config[section] = DEFAULT_CONFIG[section]
-
-            _cached_config = config
-            _cached_mtime = current_mtime
-            logger.info("Configuration loaded successfully.")
-            return config
-
-    except yaml.YAMLError as e:
-        logger.error(f"Error parsing {CONFIG_FILE}: {e}")
-        if _cached_config:
-            logger.warning("Retaining previous valid configuration due to parse error.")
-            return _cached_config
-        logger.warning("Reverting to default configuration due to parse error.")
-        return DEFAULT_CONFIG
-
-    except Exception as e:
-        logger.error(f"Unexpected error loading config: {e}")
-        if _cached_config:
-            return _cached_config
-        return DEFAULT_CONFIG
+            logger.error(f"Unexpected error loading config: {e}")
+            return None
+
+        if not config:
+            logger.warning(f"Configuration file {self.path} is empty.")
+            return None
+        if not isinstance(config, dict):
+            logger.error(f"Configuration file {self.path} must contain a mapping.")
+            return None
+
+        config = merge_defaults(config)
+        problems = validate_config(config)
+        if problems:
+            for problem in problems:
+                logger.error(f"Invalid configuration: {problem}")
+            return None
+        return freeze(config)
+
+    def _start_watching(self):
+        with self._lock:
+            if self._watching:
+                return
+            self._watching = True
+        watcher = get_watcher()
+        if watcher and watcher.watch(self.path, self._changed):
+            return
+        threading.Thread(target=self._poll, name="config-poll", daemon=True).start()
+
+    def _changed(self, path=None):
+        # Restart the debounce timer on every event
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(RELOAD_DEBOUNCE_S, self.reload)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _poll(self):
+        while True:
+            time.sleep(POLL_INTERVAL_S)
+            if self._file_signature() != self._signature:
+                self._changed()
+
+_store = ConfigStore()
+
+def load_config():
+    """
+    Returns the current configuration: a read-only mapping merged with the
+    defaults. Only the first call reads the file.
+    """
+    return _store.current()
+
+def reload_config():
+    return _store.reload()
+
+def subscribe(callback):
+    """
+    Calls `callback(old, new)` whenever a changed configuration is applied.
+    """
+    return _store.subscribe(callback)
+
+def unsubscribe(callback):
+    _store.unsubscribe(callback)
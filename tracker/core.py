@@ -1,118 +1,359 @@
-from .geo import haversine_distance
+import math
+import time
+from .geo import haversine_distance, EARTH_RADIUS_NM
+from .flight import as_flight
+
+SPATIAL_THRESHOLD_NM = 6.0
+
+class SpatialIndex:
+    """
+    Grid bucket index over merged flights for the spatial deconfliction pass.
+
+    Cells are roughly `threshold_nm` on a side, so a candidate only has to
+    test the handful of cells its search radius overlaps instead of every
+    merged flight. Each stored key keeps the rank it was first inserted with,
+    which lets `nearest` break distance ties exactly like a linear scan over
+    the merged dict would.
+    """
+    # Small slack so floating point rounding never excludes a true match.
+    EPSILON_DEG = 1e-7
+
+    def __init__(self, flights, threshold_nm):
+        self.flights = flights  # key -> flight dict (shared with the caller)
+        self.threshold_nm = threshold_nm
+        reach_deg = math.degrees(threshold_nm * (1 + 1e-6) / EARTH_RADIUS_NM)
+        self.reach_rad = math.radians(reach_deg)
+        self.reach_deg = reach_deg
+        # Longitude cells must tile 360 degrees exactly so the grid wraps at the antimeridian.
+        self.n_cols = max(1, int(360 // reach_deg))
+        self.cell_deg = 360.0 / self.n_cols
+        self.rows = {}     # row -> col -> {key: rank}
+        self.cell_of = {}  # key -> (row, col)
+        self.ranks = {}    # key -> first insertion rank
+        self.positions = {}  # key -> (lat, lon) as last indexed
+        self._next_rank = 0
+        for key in flights:
+            self.add(key)
+
+    def sync(self, flights):
+        """
+        Points the index at a new flights dict, re-indexing only keys that
+        were added, removed or moved. Surviving keys keep their rank.
+        """
+        self.flights = flights
+        for key in [k for k in self.ranks if k not in flights]:
+            self.remove(key)
+            del self.ranks[key]
+            del self.positions[key]
+        for key, f in flights.items():
+            if self.positions.get(key) != (f['lat'], f['lon']) or key not in self.ranks:
+                self.add(key)
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.cell_deg), math.floor(((lon + 180) % 360) / self.cell_deg)
+
+    def add(self, key):
+        """
+        Indexes (or re-indexes) the flight currently stored under `key`.
+        """
+        self.remove(key)
+        if key not in self.ranks:
+            self.ranks[key] = self._next_rank
+            self._next_rank += 1
+        f = self.flights[key]
+        self.positions[key] = (f['lat'], f['lon'])
+        # Same truthiness test as the original linear scan: 0.0 or None is "no position".
+        if not (f['lat'] and f['lon']):
+            return
+        row, col = self._cell(f['lat'], f['lon'])
+        self.rows.setdefault(row, {}).setdefault(col, {})[key] = self.ranks[key]
+        self.cell_of[key] = (row, col)
+
+    def remove(self, key):
+        cell = self.cell_of.pop(key, None)
+        if cell:
+            cols = self.rows[cell[0]]
+            del cols[cell[1]][key]
+            if not cols[cell[1]]:
+                del cols[cell[1]]
+                if not cols:
+                    del self.rows[cell[0]]
+
+    def _max_dlon(self, lat):
+        """
+        Widest longitude offset (degrees) a point within reach can have at `lat`.
+        """
+        cos_lat = math.cos(math.radians(lat))
+        sin_reach = math.sin(self.reach_rad)
+        if sin_reach >= cos_lat:
+            return 180.0 # A pole is within reach
+        return math.degrees(math.asin(sin_reach / cos_lat)) + self.EPSILON_DEG
+
+    def _candidate_cells(self, lat, lon, dlon):
+        row_lo = math.floor((lat - self.reach_deg - self.EPSILON_DEG) / self.cell_deg)
+        row_hi = math.floor((lat + self.reach_deg + self.EPSILON_DEG) / self.cell_deg)
+        col_lo = math.floor((lon - dlon + 180) / self.cell_deg)
+        col_hi = math.floor((lon + dlon + 180) / self.cell_deg)
+        all_cols = dlon >= 180.0 or col_hi - col_lo + 1 >= self.n_cols
+
+        for row in range(row_lo, row_hi + 1):
+            cols = self.rows.get(row)
+            if not cols:
+                continue
+            if all_cols:
+                yield from cols.values()
+                continue
+            for col in range(col_lo, col_hi + 1):
+                cell = cols.get(col % self.n_cols)
+                if cell:
+                    yield cell
+
+    def nearest(self, candidate):
+        """
+        Returns the key of the closest indexed flight within the threshold, or None.
+        """
+        c_lat, c_lon = candidate['lat'], candidate['lon']
+        if not (c_lat and c_lon):
+            return None
+
+        dlon = self._max_dlon(c_lat)
+
+        # Equirectangular pre-filter. Using the smallest cos(lat) any match can
+        # have, and inflating the limit by the worst-case sin(x) ~ x error over
+        # the longitude window, keeps it a strict lower bound on haversine
+        # distance so it never rejects a true match.
+        dlon_rad = math.radians(min(dlon, 180.0))
+        cos_bound = math.cos(math.radians(min(90.0, abs(c_lat) + self.reach_deg)))
+        limit_sq = (self.reach_rad / (1 - dlon_rad * dlon_rad / 24)) ** 2
+        deg = math.pi / 180
+
+        positions = self.positions
+        best_key, best_rank, min_dist = None, None, float('inf')
+        for cell in self._candidate_cells(c_lat, c_lon, dlon):
+            for key, rank in cell.items():
+                m_lat, m_lon = positions[key]
+                dy = (m_lat - c_lat) * deg
+                dx = ((m_lon - c_lon + 180) % 360 - 180) * deg * cos_bound
+                if dx * dx + dy * dy > limit_sq:
+                    continue
+                dist = haversine_distance(m_lat, m_lon, c_lat, c_lon)
+                if dist > self.threshold_nm:
+                    continue
+                if dist < min_dist or (dist == min_dist and rank < best_rank):
+                    best_key, best_rank, min_dist = key, rank, dist
+        return best_key
+
+class Association:
+    """
+    A learned pairing of an FA ident / FR24 callsign with the merged flight it matched.
+    """
+    __slots__ = ("target", "confidence", "expires")
+
+    def __init__(self, target, expires):
+        self.target = target
+        self.confidence = 1
+        self.expires = expires
+
+class Deconflictor:
+    """
+    Deconfliction that carries state from one cycle to the next.
+
+    Whenever the spatial pass pairs an FA ident or FR24 callsign with a
+    merged flight, the pair is remembered. Once a pair has been seen
+    `ASSOCIATION_MIN_CONFIDENCE` times it is trusted: later cycles merge it
+    by dictionary lookup (after a single distance check) instead of a
+    nearest-neighbour search. Pairs not confirmed for `association_ttl_s`
+    expire. The spatial index is also kept between cycles and only
+    re-indexes flights that appeared, disappeared or moved.
+
+    A fresh Deconflictor gives exactly the same result as the original
+    stateless merge; `deconflict_data` is implemented that way.
+    """
+    ASSOCIATION_MIN_CONFIDENCE = 2
+
+    def __init__(self, threshold_nm=SPATIAL_THRESHOLD_NM, association_ttl_s=300, clock=time.time):
+        self.threshold_nm = threshold_nm
+        self.association_ttl_s = association_ttl_s
+        self.clock = clock
+        self.associations = {}  # (source label, candidate id) -> Association
+        self.stats = {"association_hits": 0, "spatial_searches": 0}  # For the last merge
+        self.outcomes = {"merged": 0, "spatial_merged": 0, "unmerged": 0}  # Remote reports, last merge
+        self._index = None
+        self._next_prune = 0
+
+    def _prune(self, now):
+        if now < self._next_prune:
+            return
+        self._next_prune = now + self.association_ttl_s / 2
+        for key in [k for k, a in self.associations.items() if a.expires <= now]:
+            del self.associations[key]
+
+    def _learn(self, source_label, cand_id, target, now):
+        assoc = self.associations.get((source_label, cand_id))
+        if assoc is not None and assoc.target == target:
+            assoc.confidence += 1
+            assoc.expires = now + self.association_ttl_s
+        else:
+            self.associations[(source_label, cand_id)] = Association(target, now + self.association_ttl_s)
+
+    def _associated(self, source_label, cand_id, candidate, merged_results, now):
+        """
+        Returns the trusted association target for a candidate if it is still
+        present and within the threshold, else None.
+        """
+        assoc = self.associations.get((source_label, cand_id))
+        if assoc is None or assoc.expires <= now or assoc.confidence < self.ASSOCIATION_MIN_CONFIDENCE:
+            return None
+        target = merged_results.get(assoc.target)
+        if target is None or not (target.lat and target.lon and candidate.lat and candidate.lon):
+            return None
+        if haversine_distance(target.lat, target.lon, candidate.lat, candidate.lon) > self.threshold_nm:
+            return None # The pair has drifted apart; look again
+        return assoc.target
+
+    def merge(self, fa_data, fr24_data, local_data=None):
+        """
+        Merges data prioritizing Local > ICAO Hex matching + Spatial backup.
+
+        Flight records are merged in place; plain dicts are converted to
+        Flight records first. Returns Flight records sorted by hex_id.
+        """
+        if local_data is None: local_data = []
+        fa_data = [as_flight(f) for f in fa_data]
+        fr24_data = [as_flight(f) for f in fr24_data]
+        local_data = [as_flight(f) for f in local_data]
+        now = self.clock()
+        self._prune(now)
+        stats = self.stats = {"association_hits": 0, "spatial_searches": 0}
+        outcomes = self.outcomes = {"merged": 0, "spatial_merged": 0, "unmerged": 0}
+
+        merged_results = {}
+
+        def clean_id(f): return str(f.hex_id).strip().lower()
+
+        # 1. Start with Local Data (Highest Priority)
+        for f in local_data:
+            # We track sources internally, but no longer store a set directly in the output dict
+            # to avoid JSON serialization issues. We update 'source' string instead.
+            merged_results[clean_id(f)] = f
+
+        # Helper to merge into existing
+        def merge_flight(f_new, source_label):
+            f_id = clean_id(f_new)
+
+            # Exact Match
+            if f_id in merged_results:
+                existing = merged_results[f_id]
+
+                # Timestamp Logic: Keep Freshest Position
+                ts_exist = existing.timestamp
+                ts_new = f_new.timestamp
+
+                if ts_new > ts_exist:
+                    # Update fields
+                    existing.lat = f_new.lat
+                    existing.lon = f_new.lon
+                    existing.heading = f_new.heading
+                    existing.altitude = f_new.altitude
+                    existing.speed = f_new.speed
+                    existing.timestamp = ts_new
+
+                # Update Source Label
+                if "Local" in existing.source:
+                    if source_label not in existing.source:
+                         existing.source = f"{existing.source} + {source_label}"
+                else:
+                    existing.source = "Merged"
+
+                merged_results[f_id] = existing
+                outcomes["merged"] += 1
+                return True
+            return False
+
+        # 2. Process FlightAware
+        unmerged_fa = []
+        for f in fa_data:
+            if not merge_flight(f, "FA"):
+                unmerged_fa.append(f)
+
+        # 3. Process FR24
+        unmerged_fr24 = []
+        for f in fr24_data:
+            if not merge_flight(f, "FR24"):
+                unmerged_fr24.append(f)
+
+        # 4. Spatial Deconfliction
+        # Nearest-match lookups go through a grid index instead of scanning every merged flight.
+        if self._index is None:
+            self._index = SpatialIndex(merged_results, self.threshold_nm)
+        else:
+            self._index.sync(merged_results)
+        index = self._index
+
+        def try_spatial_merge(candidate, source_label):
+            cand_id = clean_id(candidate)
+            best_key = self._associated(source_label, cand_id, candidate, merged_results, now)
+            if best_key is not None:
+                stats["association_hits"] += 1
+            else:
+                stats["spatial_searches"] += 1
+                best_key = index.nearest(candidate)
+            best_match = merged_results[best_key] if best_key is not None else None
+
+            if best_match:
+                self._learn(source_label, cand_id, best_key, now)
+
+                # Merge logic (same as exact match)
+                ts_exist = best_match.timestamp
+                ts_new = candidate.timestamp
+
+                if ts_new > ts_exist:
+                    best_match.lat = candidate.lat
+                    best_match.lon = candidate.lon
+                    best_match.heading = candidate.heading
+                    best_match.altitude = candidate.altitude
+                    best_match.speed = candidate.speed
+                    best_match.timestamp = ts_new
+                    index.add(best_key)
+
+                if "Local" in best_match.source:
+                     if source_label not in best_match.source:
+                         best_match.source += f" + {source_label}"
+                else:
+                     best_match.source = "Merged"
+                outcomes["spatial_merged"] += 1
+                return True
+            return False
+
+        # Try spatial merge for FA
+        final_fa = []
+        for f in unmerged_fa:
+            if not try_spatial_merge(f, "FA"):
+                final_fa.append(f)
+
+        # Add remaining FA to results
+        outcomes["unmerged"] += len(final_fa)
+        for f in final_fa:
+            merged_results[clean_id(f)] = f
+            index.add(clean_id(f))
+
+        # Try spatial merge for FR24
+        final_fr24 = []
+        for f in unmerged_fr24:
+            if not try_spatial_merge(f, "FR24"):
+                final_fr24.append(f)
+
+        # Add remaining FR24
+        outcomes["unmerged"] += len(final_fr24)
+        for f in final_fr24:
+            merged_results[clean_id(f)] = f
+            index.add(clean_id(f))
+
+        sorted_flights = sorted(list(merged_results.values()), key=lambda x: x.hex_id)
+        return sorted_flights
 
 def deconflict_data(fa_data, fr24_data, local_data=None):
     """
     Merges data prioritizing Local > ICAO Hex matching + Spatial backup.
     """
-    SPATIAL_THRESHOLD_NM = 6.0
-    if local_data is None: local_data = []
-
-    merged_results = {}
-
-    def clean_id(f): return str(f['hex_id']).strip().lower()
-
-    # 1. Start with Local Data (Highest Priority)
-    for f in local_data:
-        # We track sources internally, but no longer store a set directly in the output dict
-        # to avoid JSON serialization issues. We update 'source' string instead.
-        merged_results[clean_id(f)] = f
-
-    # Helper to merge into existing
-    def merge_flight(f_new, source_label):
-        f_id = clean_id(f_new)
-
-        # Exact Match
-        if f_id in merged_results:
-            existing = merged_results[f_id]
-
-            # Timestamp Logic: Keep Freshest Position
-            ts_exist = existing.get('timestamp', 0)
-            ts_new = f_new.get('timestamp', 0)
-
-            if ts_new > ts_exist:
-                # Update fields
-                existing['lat'] = f_new['lat']
-                existing['lon'] = f_new['lon']
-                existing['heading'] = f_new['heading']
-                existing['altitude'] = f_new['altitude']
-                existing['speed'] = f_new['speed']
-                existing['timestamp'] = ts_new
-
-            # Update Source Label
-            if "Local" in existing['source']:
-                if source_label not in existing['source']:
-                     existing['source'] = f"{existing['source']} + {source_label}"
-            else:
-                existing['source'] = "Merged"
-
-            merged_results[f_id] = existing
-            return True
-        return False
-
-    # 2. Process FlightAware
-    unmerged_fa = []
-    for f in fa_data:
-        if not merge_flight(f, "FA"):
-            unmerged_fa.append(f)
-
-    # 3. Process FR24
-    unmerged_fr24 = []
-    for f in fr24_data:
-        if not merge_flight(f, "FR24"):
-            unmerged_fr24.append(f)
-
-    # 4. Spatial Deconfliction
-    def try_spatial_merge(candidate, source_label):
-        best_match = None
-        min_dist = float('inf')
-
-        for m in merged_results.values():
-            if m['lat'] and m['lon'] and candidate['lat'] and candidate['lon']:
-                 dist = haversine_distance(m['lat'], m['lon'], candidate['lat'], candidate['lon'])
-                 if dist < min_dist and dist <= SPATIAL_THRESHOLD_NM:
-                     min_dist = dist
-                     best_match = m
-
-        if best_match:
-            # Merge logic (same as exact match)
-            ts_exist = best_match.get('timestamp', 0)
-            ts_new = candidate.get('timestamp', 0)
-
-            if ts_new > ts_exist:
-                best_match['lat'] = candidate['lat']
-                best_match['lon'] = candidate['lon']
-                best_match['heading'] = candidate['heading']
-                best_match['altitude'] = candidate['altitude']
-                best_match['speed'] = candidate['speed']
-                best_match['timestamp'] = ts_new
-
-            if "Local" in best_match['source']:
-                 if source_label not in best_match['source']:
-                     best_match['source'] += f" + {source_label}"
-            else:
-                 best_match['source'] = "Merged"
-            return True
-        return False
-
-    # Try spatial merge for FA
-    final_fa = []
-    for f in unmerged_fa:
-        if not try_spatial_merge(f, "FA"):
-            final_fa.append(f)
-
-    # Add remaining FA to results
-    for f in final_fa:
-        merged_results[clean_id(f)] = f
-
-    # Try spatial merge for FR24
-    final_fr24 = []
-    for f in unmerged_fr24:
-        if not try_spatial_merge(f, "FR24"):
-            final_fr24.append(f)
-
-    # Add remaining FR24
-    for f in final_fr24:
-        merged_results[clean_id(f)] = f
-
-    sorted_flights = sorted(list(merged_results.values()), key=lambda x: x['hex_id'])
-    return sorted_flights
+    return Deconflictor().merge(fa_data, fr24_data, local_data)
@@ -0,0 +1,98 @@
+import gzip
+import json
+import logging
+from .flight import json_default
+from .metrics import STAGE_SECONDS, SNAPSHOT_BYTES
+
+try:
+    import orjson
+except ImportError: # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError: # brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Per-snapshot cap on cached ("view", ...) bodies. Viewport requests make
+# many distinct variants; past the cap they are encoded per request. Full and
+# delta bodies (one per retained version) are always cached.
+MAX_CACHED_VIEWS = 64
+
+DEFAULT_ENCODING = {
+    "gzip_level": 6,
+    "brotli_quality": 5,
+    "min_compress_bytes": 1024
+}
+
+def dumps(obj):
+    """
+    Encodes `obj` as compact UTF-8 JSON bytes, serializing Flight records
+    as dicts. With orjson, non-finite floats are written as null.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=json_default)
+    return json.dumps(obj, default=json_default, separators=(',', ':')).encode('utf-8')
+
+def supported_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+def negotiate(accept_encodings):
+    """
+    Picks the content coding for a request from its parsed Accept-Encoding
+    (werkzeug's `request.accept_encodings`), preferring brotli, or None for
+    an uncompressed response.
+    """
+    return accept_encodings.best_match(supported_encodings())
+
+def compress(body, encoding, conf):
+    if encoding == "br":
+        return brotli.compress(body, quality=conf.get('brotli_quality', 5))
+    if encoding == "gzip":
+        # mtime=0 keeps the output identical across calls
+        return gzip.compress(body, compresslevel=conf.get('gzip_level', 6), mtime=0)
+    raise ValueError(f"Unsupported content coding {encoding!r}")
+
+def full_body(snapshot):
+    return {"version": snapshot.version, "flights": list(snapshot.flights), "messages": list(snapshot.messages),
+            "usage": list(snapshot.usage)}
+
+def encode_snapshot(snapshot, variant, build, encoding=None, conf=None):
+    """
+    Returns (body bytes, content coding actually used) for one response
+    variant of a snapshot, e.g. ("full",) or ("delta", since).
+
+    The JSON is built and encoded once per snapshot and variant, and each
+    compressed form once per coding; every later reader gets the cached
+    bytes. Bodies under `min_compress_bytes` are always sent uncompressed.
+    """
+    conf = conf or DEFAULT_ENCODING
+    cache = snapshot.encodings
+    key = (variant, encoding)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    with snapshot.encode_lock:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached # Built by another reader while we waited
+
+        store = variant[0] != "view" or sum(1 for v, _ in cache if v[0] == "view") < MAX_CACHED_VIEWS
+        plain = cache.get((variant, None))
+        if plain is None:
+            with STAGE_SECONDS.labels("serialize").time():
+                plain = (dumps(build()), None)
+            SNAPSHOT_BYTES.observe(len(plain[0]))
+            if store:
+                cache[(variant, None)] = plain
+        if encoding is None or len(plain[0]) < conf.get('min_compress_bytes', 1024):
+            result = plain
+        else:
+            with STAGE_SECONDS.labels("compress").time():
+                result = (compress(plain[0], encoding, conf), encoding)
+        if store:
+            cache[key] = result
+        return result
@@ -0,0 +1,412 @@
+import logging
+import math
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SBS_PORT = 30003
+BEAST_PORT = 30005
+
+# Aircraft not heard from for this long are dropped from the live table
+STALE_AFTER_S = 60
+
+# CPR even/odd position pairs further apart than this are not combined
+CPR_MAX_PAIR_AGE_S = 10
+
+class LiveStateTable:
+    """
+    Latest known state per aircraft, built up one message at a time.
+
+    Entries use dump1090 aircraft.json field names, so `document` can be fed
+    straight to local.normalize_aircraft_json and streamed aircraft come out
+    in the same schema as polled ones.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._aircraft = {}   # hex -> aircraft.json style dict
+        self._last_seen = {}  # hex -> clock() of the last message
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._aircraft)
+
+    def update(self, hex_id, **fields):
+        hex_id = hex_id.lower()
+        now = self.clock()
+        with self._lock:
+            aircraft = self._aircraft.get(hex_id)
+            if aircraft is None:
+                aircraft = self._aircraft[hex_id] = {"hex": hex_id}
+            aircraft.update(fields)
+            self._last_seen[hex_id] = now
+
+    def get(self, hex_id):
+        with self._lock:
+            aircraft = self._aircraft.get(hex_id.lower())
+            return dict(aircraft) if aircraft else None
+
+    def document(self):
+        """
+        Returns the table as an aircraft.json document, expiring stale aircraft.
+        """
+        now = self.clock()
+        with self._lock:
+            for hex_id in [h for h, seen in self._last_seen.items() if now - seen > STALE_AFTER_S]:
+                del self._aircraft[hex_id]
+                del self._last_seen[hex_id]
+            aircraft = [dict(a, seen=now - self._last_seen[h]) for h, a in self._aircraft.items()]
+        return {"now": now, "aircraft": aircraft}
+
+# --- SBS-1 (BaseStation) ---------------------------------------------------
+
+def _sbs_number(value, kind=float):
+    try:
+        return kind(value) if value else None
+    except ValueError:
+        return None
+
+def parse_sbs_line(line):
+    """
+    Parses one SBS-1 "MSG" line into (hex, aircraft.json fields), or None.
+
+    Only the fields present in the message are returned; SBS transmission
+    types each carry a different subset.
+    """
+    parts = line.strip().split(',')
+    if len(parts) < 22 or parts[0] != 'MSG' or not parts[4]:
+        return None
+
+    fields = {}
+    callsign = parts[10].strip()
+    if callsign:
+        fields['flight'] = callsign
+    altitude = _sbs_number(parts[11], int)
+    if altitude is not None:
+        fields['alt_baro'] = "ground" if parts[21] == '-1' else altitude
+    for key, index in (('gs', 12), ('track', 13), ('lat', 14), ('lon', 15)):
+        value = _sbs_number(parts[index])
+        if value is not None:
+            fields[key] = value
+    if parts[17]:
+        fields['squawk'] = parts[17]
+    return parts[4], fields
+
+class SBSDecoder:
+    """
+    Splits an SBS-1 byte stream into lines and applies them to a table.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._buffer = b''
+
+    def feed(self, data):
+        lines = (self._buffer + data).split(b'\n')
+        self._buffer = lines.pop()
+        for line in lines:
+            parsed = parse_sbs_line(line.decode('ascii', 'replace'))
+            if parsed and parsed[1]:
+                self.table.update(parsed[0], **parsed[1])
+
+# --- Beast binary / Mode S -------------------------------------------------
+
+BEAST_ESCAPE = 0x1a
+# Frame type -> Mode A/C or Mode S payload length
+BEAST_FRAME_LENGTHS = {0x31: 2, 0x32: 7, 0x33: 14}
+BEAST_HEADER_LENGTH = 7  # 48-bit MLAT timestamp + signal level
+
+def split_beast_frames(buffer):
+    """
+    Splits a Beast byte stream into frames. Returns a list of
+    (type, mlat timestamp, signal, payload) and the number of bytes consumed;
+    an incomplete trailing frame is left unconsumed.
+
+    Within a frame a literal 0x1a is sent twice; a lone 0x1a starts a frame.
+    """
+    frames = []
+    pos, n = 0, len(buffer)
+    while True:
+        start = buffer.find(BEAST_ESCAPE, pos)
+        if start < 0:
+            return frames, n
+        if start + 1 >= n:
+            return frames, start
+        length = BEAST_FRAME_LENGTHS.get(buffer[start + 1])
+        if length is None:
+            pos = start + 1 # Status frame, escaped 0x1a or noise: resync
+            continue
+
+        body = bytearray()
+        i = start + 2
+        wanted = BEAST_HEADER_LENGTH + length
+        truncated = False
+        while len(body) < wanted and i < n:
+            byte = buffer[i]
+            if byte == BEAST_ESCAPE:
+                if i + 1 >= n:
+                    break
+                if buffer[i + 1] != BEAST_ESCAPE:
+                    truncated = True # A new frame started before this one ended
+                    break
+                i += 1
+            body.append(byte)
+            i += 1
+        if truncated:
+            pos = i
+            continue
+        if len(body) < wanted:
+            return frames, start
+
+        frames.append((buffer[start + 1], int.from_bytes(body[:6], 'big'), body[6], bytes(body[7:])))
+        pos = i
+
+MODES_CRC_POLY = 0xfff409
+
+def _crc_table():
+    table = []
+    for byte in range(256):
+        crc = byte << 16
+        for _ in range(8):
+            crc = (crc << 1) ^ MODES_CRC_POLY if crc & 0x800000 else crc << 1
+        table.append(crc & 0xffffff)
+    return table
+
+_CRC_TABLE = _crc_table()
+
+def modes_crc(data):
+    """
+    Mode S CRC-24 over all but the last three (parity) bytes.
+    """
+    crc = 0
+    for byte in data[:-3]:
+        crc = ((crc << 8) & 0xffffff) ^ _CRC_TABLE[((crc >> 16) ^ byte) & 0xff]
+    return crc
+
+IDENT_CHARSET = "#ABCDEFGHIJKLMNOPQRSTUVWXYZ##### ###############0123456789######"
+
+def cpr_nl(lat):
+    """
+    Number of CPR longitude zones at a latitude.
+    """
+    lat = abs(lat)
+    if lat == 0:
+        return 59
+    if lat == 87:
+        return 2
+    if lat > 87:
+        return 1
+    a = 1 - math.cos(math.pi / 30)
+    b = math.cos(math.radians(lat)) ** 2
+    return int(math.floor(2 * math.pi / math.acos(1 - a / b)))
+
+def cpr_global(even, odd, newest_odd):
+    """
+    Decodes an airborne position from an even and an odd CPR pair of
+    (lat_cpr, lon_cpr). Returns (lat, lon), or None if the pair straddles
+    a longitude zone boundary.
+    """
+    lat0, lon0 = even[0] / 131072, even[1] / 131072
+    lat1, lon1 = odd[0] / 131072, odd[1] / 131072
+
+    j = math.floor(59 * lat0 - 60 * lat1 + 0.5)
+    rlat0 = 6.0 * (j % 60 + lat0)
+    rlat1 = (360.0 / 59) * (j % 59 + lat1)
+    if rlat0 >= 270: rlat0 -= 360
+    if rlat1 >= 270: rlat1 -= 360
+    if cpr_nl(rlat0) != cpr_nl(rlat1):
+        return None
+
+    lat = rlat1 if newest_odd else rlat0
+    nl = cpr_nl(lat)
+    ni = max(nl - 1 if newest_odd else nl, 1)
+    m = math.floor(lon0 * (nl - 1) - lon1 * nl + 0.5)
+    lon = (360.0 / ni) * (m % ni + (lon1 if newest_odd else lon0))
+    if lon >= 180: lon -= 360
+    return round(lat, 6), round(lon, 6)
+
+class ModeSDecoder:
+    """
+    Decodes DF17/18 extended squitters (identification, airborne position
+    and airborne velocity) into a LiveStateTable.
+
+    Positions need one even and one odd CPR frame from the same aircraft,
+    so an aircraft gets a position from its second position message on.
+    Surface positions need a reference location and are skipped. Frames of
+    aircraft silent for STALE_AFTER_S are dropped, as the table drops them.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._cpr = {}  # hex -> {0: (lat_cpr, lon_cpr, t), 1: (...)}
+        self._last_prune = table.clock()
+
+    def _prune(self, now):
+        # At most once per STALE_AFTER_S, so the sweep stays off the per-message path
+        if now - self._last_prune < STALE_AFTER_S:
+            return
+        self._last_prune = now
+        for hex_id in [h for h, frames in self._cpr.items()
+                       if now - max(t for _, _, t in frames.values()) > STALE_AFTER_S]:
+            del self._cpr[hex_id]
+
+    def decode(self, msg):
+        if len(msg) != 14:
+            return
+        df = msg[0] >> 3
+        if df not in (17, 18) or modes_crc(msg) != int.from_bytes(msg[11:14], 'big'):
+            return
+        hex_id = msg[1:4].hex()
+        me = int.from_bytes(msg[4:11], 'big')
+        tc = me >> 51
+
+        if 1 <= tc <= 4:
+            self._identification(hex_id, tc, me)
+        elif 9 <= tc <= 18:
+            self._airborne_position(hex_id, me)
+        elif tc == 19:
+            self._velocity(hex_id, me)
+
+    def _identification(self, hex_id, tc, me):
+        callsign = ''.join(IDENT_CHARSET[(me >> (42 - 6 * i)) & 0x3f] for i in range(8))
+        fields = {"flight": callsign.replace('#', '').strip()}
+        ca = (me >> 48) & 0x7
+        if ca:
+            fields['category'] = f"{'DCBA'[tc - 1]}{ca}"
+        self.table.update(hex_id, **fields)
+
+    def _airborne_position(self, hex_id, me):
+        fields = {}
+        alt = (me >> 36) & 0xfff
+        if alt & 0x10: # Q bit: 25 ft increments; Gillham-coded altitudes are not decoded
+            n = ((alt & 0xfe0) >> 1) | (alt & 0xf)
+            fields['alt_baro'] = n * 25 - 1000
+
+        odd = (me >> 34) & 1
+        now = self.table.clock()
+        self._prune(now)
+        frames = self._cpr.setdefault(hex_id, {})
+        frames[odd] = ((me >> 17) & 0x1ffff, me & 0x1ffff, now)
+        other = frames.get(1 - odd)
+        if other and now - other[2] <= CPR_MAX_PAIR_AGE_S:
+            position = cpr_global(frames[0], frames[1], bool(odd))
+            if position:
+                fields['lat'], fields['lon'] = position
+        if fields:
+            self.table.update(hex_id, **fields)
+
+    def _velocity(self, hex_id, me):
+        subtype = (me >> 48) & 0x7
+        if subtype not in (1, 2):
+            return # Airspeed subtypes carry heading, not ground track
+        v_ew = (me >> 32) & 0x3ff
+        v_ns = (me >> 21) & 0x3ff
+        if not v_ew or not v_ns:
+            return
+        scale = 4 if subtype == 2 else 1
+        vx = (v_ew - 1) * scale * (-1 if (me >> 42) & 1 else 1)
+        vy = (v_ns - 1) * scale * (-1 if (me >> 31) & 1 else 1)
+        self.table.update(hex_id,
+                          gs=round(math.hypot(vx, vy), 1),
+                          track=round(math.degrees(math.atan2(vx, vy)) % 360, 1))
+
+class BeastDecoder:
+    """
+    Reassembles Beast frames from a byte stream and decodes Mode S long frames.
+    """
+
+    def __init__(self, table):
+        self.modes = ModeSDecoder(table)
+        self._buffer = b''
+
+    def feed(self, data):
+        frames, consumed = split_beast_frames(self._buffer + data)
+        self._buffer = (self._buffer + data)[consumed:]
+        for frame_type, _, _, payload in frames:
+            if frame_type == 0x33:
+                self.modes.decode(payload)
+
+# --- TCP client ------------------------------------------------------------
+
+DECODERS = {"sbs": SBSDecoder, "beast": BeastDecoder}
+DEFAULT_PORTS = {"sbs": SBS_PORT, "beast": BEAST_PORT}
+
+def parse_address(address, default_port):
+    host, _, port = str(address).rpartition(':')
+    if not host:
+        return port, default_port
+    return host, int(port)
+
+class FeedClient:
+    """
+    Keeps a TCP connection to a receiver's SBS-1 or Beast output open on a
+    background thread, reconnecting with backoff, and decodes everything it
+    receives into `table`.
+    """
+
+    def __init__(self, address, protocol, table=None, reconnect_max_s=30):
+        if protocol not in DECODERS:
+            raise ValueError(f"Unknown feed protocol {protocol!r}")
+        self.host, self.port = parse_address(address, DEFAULT_PORTS[protocol])
+        self.protocol = protocol
+        self.table = table or LiveStateTable()
+        self.reconnect_max_s = reconnect_max_s
+        self.connected = threading.Event()
+        self._stop = threading.Event()
+        self._sock = None
+        self._thread = threading.Thread(target=self._run, name=f"{protocol}-feed", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        sock = self._sock
+        if sock:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        delay = 1
+        while not self._stop.is_set():
+            try:
+                with socket.create_connection((self.host, self.port), timeout=10) as sock:
+                    self._sock = sock
+                    sock.settimeout(None)
+                    self.connected.set()
+                    logger.info(f"Connected to {self.protocol} feed at {self.host}:{self.port}")
+                    delay = 1
+                    decoder = DECODERS[self.protocol](self.table)
+                    while True:
+                        data = sock.recv(65536)
+                        if not data:
+                            break
+                        decoder.feed(data)
+            except OSError as e:
+                if not self._stop.is_set():
+                    logger.warning(f"{self.protocol} feed {self.host}:{self.port} unavailable: {e}")
+            finally:
+                self._sock = None
+                self.connected.clear()
+            if self._stop.wait(delay):
+                return
+            delay = min(delay * 2, self.reconnect_max_s)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_feed(address, protocol):
+    """
+    Returns the shared, started FeedClient for an address, creating it on first use.
+    """
+    with _clients_lock:
+        client = _clients.get((protocol, address))
+        if client is None:
+            client = _clients[(protocol, address)] = FeedClient(address, protocol).start()
+        return client
@@ -0,0 +1,133 @@
+from collections.abc import Mapping, MutableMapping
+
+# Normalized fields every source provides, in serialization order
+FIELDS = ("source", "hex_id", "callsign", "lat", "lon", "heading", "altitude", "speed", "type", "timestamp")
+
+# Observer-relative fields added by ingest.enrich_flights, and aircraft
+# database fields added by ingest.enrich_registry
+ENRICHED_FIELDS = ("distance_from_obs", "azimuth", "elevation", "registration", "operator")
+
+ALL_FIELDS = FIELDS + ENRICHED_FIELDS
+_FIELD_SET = frozenset(ALL_FIELDS)
+_MISSING = object()
+
+class Flight(MutableMapping):
+    """
+    One normalized aircraft report.
+
+    A slotted record replacing the per-flight dict: roughly a quarter of the
+    memory and no per-instance hash table. It still implements the mutable
+    mapping protocol over its field names (`f['lat']`, `f.get(...)`,
+    `dict(f)`, equality with dicts), so code and tests written against dicts
+    keep working. Enrichment fields are absent until set, exactly like
+    missing dict keys. Other keys are rejected.
+    """
+    __slots__ = ALL_FIELDS
+
+    def __init__(self, source, hex_id, callsign, lat, lon, heading, altitude, speed, type, timestamp):
+        self.source = source
+        self.hex_id = hex_id
+        self.callsign = callsign
+        self.lat = lat
+        self.lon = lon
+        self.heading = heading
+        self.altitude = altitude
+        self.speed = speed
+        self.type = type
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_dict(cls, d):
+        flight = cls(*(d[name] for name in FIELDS))
+        for name in ENRICHED_FIELDS:
+            if name in d:
+                setattr(flight, name, d[name])
+        return flight
+
+    def __getitem__(self, key):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key not in _FIELD_SET:
+            raise KeyError(f"Flight has no field {key!r}")
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        if key not in _FIELD_SET or not hasattr(self, key):
+            raise KeyError(key)
+        delattr(self, key)
+
+    def __contains__(self, key):
+        return key in _FIELD_SET and hasattr(self, key)
+
+    def __iter__(self):
+        return (name for name in ALL_FIELDS if hasattr(self, name))
+
+    def __bool__(self):
+        return True # Never empty; spares `if flight:` a call to __len__
+
+    def __len__(self):
+        return sum(1 for name in ENRICHED_FIELDS if hasattr(self, name)) + len(FIELDS)
+
+    def get(self, key, default=None):
+        if key not in _FIELD_SET:
+            return default
+        return getattr(self, key, default)
+
+    def to_dict(self):
+        """
+        The dict this record replaces, with keys in the same order.
+        """
+        d = {"source": self.source, "hex_id": self.hex_id, "callsign": self.callsign,
+             "lat": self.lat, "lon": self.lon, "heading": self.heading, "altitude": self.altitude,
+             "speed": self.speed, "type": self.type, "timestamp": self.timestamp}
+        for name in ENRICHED_FIELDS:
+            try:
+                d[name] = getattr(self, name)
+            except AttributeError:
+                pass # Not enriched (yet)
+        return d
+
+    def copy(self):
+        flight = Flight(self.source, self.hex_id, self.callsign, self.lat, self.lon,
+                        self.heading, self.altitude, self.speed, self.type, self.timestamp)
+        for name in ENRICHED_FIELDS:
+            try:
+                setattr(flight, name, getattr(self, name))
+            except AttributeError:
+                pass
+        return flight
+
+    __copy__ = copy
+
+    def __eq__(self, other):
+        if isinstance(other, Flight):
+            return all(getattr(self, name, _MISSING) == getattr(other, name, _MISSING) for name in ALL_FIELDS)
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Flight({self.to_dict()!r})"
+
+def as_flight(f):
+    """
+    Returns `f` itself if it is a Flight, else a Flight built from its fields.
+    """
+    return f if isinstance(f, Flight) else Flight.from_dict(f)
+
+def json_default(obj):
+    """
+    `default` hook for json.dumps / orjson.dumps: serializes a Flight as the
+    dict it replaces, so responses carry the same fields and values.
+    """
+    if isinstance(obj, Flight):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
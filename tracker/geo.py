@@ -1,7 +1,14 @@
 import math
 
+try:
+    import numpy as np
+except ImportError: # NumPy is optional; batch functions fall back to pure Python
+    np = None
+
+EARTH_RADIUS_NM = 3440.065
+
 def get_bounding_box(lat, lon, radius_nm):
-    R = 3440.065
+    R = EARTH_RADIUS_NM
     max_lat = lat + math.degrees(radius_nm / R)
     min_lat = lat - math.degrees(radius_nm / R)
     max_lon = lon + math.degrees(radius_nm / R / math.cos(math.radians(lat)))
@@ -9,7 +16,7 @@ def get_bounding_box(lat, lon, radius_nm):
     return round(min_lat, 4), round(max_lat, 4), round(min_lon, 4), round(max_lon, 4)
 
 def haversine_distance(lat1, lon1, lat2, lon2):
-    R = 3440.065
+    R = EARTH_RADIUS_NM
     phi1, phi2 = math.radians(lat1), math.radians(lat2)
     dphi = math.radians(lat2 - lat1)
     dlambda = math.radians(lon2 - lon1)
@@ -17,12 +24,14 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
     return R * c
 
+EARTH_RADIUS_M = 6371000.0
+
 def calculate_az_el(obs_lat, obs_lon, obs_alt_m, target_lat, target_lon, target_alt_m):
     """
     Calculates the Azimuth (degrees) and Elevation (degrees) of a target
     relative to an observer using a spherical earth model.
     """
-    R_EARTH = 6371000.0 # meters
+    R_EARTH = EARTH_RADIUS_M
 
     lat1_rad = math.radians(obs_lat)
     lon1_rad = math.radians(obs_lon)
@@ -76,3 +85,107 @@ def calculate_az_el(obs_lat, obs_lon, obs_alt_m, target_lat, target_lon, target_
     elevation_deg = 90.0 - math.degrees(phi)
 
     return round(azimuth_deg, 1), round(elevation_deg, 1)
+
+def haversine_distance_batch(lat, lon, target_lats, target_lons):
+    """
+    Distance (NM) from one point to many targets. Returns a list of floats.
+    """
+    if np is not None:
+        return _haversine_distance_np(lat, lon, target_lats, target_lons).tolist()
+
+    R = EARTH_RADIUS_NM
+    phi1 = math.radians(lat)
+    cos_phi1 = math.cos(phi1)
+    distances = []
+    for t_lat, t_lon in zip(target_lats, target_lons):
+        phi2 = math.radians(t_lat)
+        dphi = math.radians(t_lat - lat)
+        dlambda = math.radians(t_lon - lon)
+        a = math.sin(dphi/2)**2 + cos_phi1*math.cos(phi2)*math.sin(dlambda/2)**2
+        distances.append(R * 2 * math.atan2(math.sqrt(a), math.sqrt(1-a)))
+    return distances
+
+def _haversine_distance_np(lat, lon, target_lats, target_lons):
+    phi1 = math.radians(lat)
+    lats = np.asarray(target_lats, dtype=float)
+    lons = np.asarray(target_lons, dtype=float)
+    phi2 = np.radians(lats)
+    dphi = np.radians(lats - lat)
+    dlambda = np.radians(lons - lon)
+    a = np.sin(dphi/2)**2 + math.cos(phi1)*np.cos(phi2)*np.sin(dlambda/2)**2
+    return EARTH_RADIUS_NM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+
+def calculate_az_el_batch(obs_lat, obs_lon, obs_alt_m, target_lats, target_lons, target_alts_m):
+    """
+    Batch version of calculate_az_el. Returns (azimuths, elevations) as lists.
+
+    Observer trig terms are computed once per call. Coincident points and
+    the zenith-angle clamp behave exactly as in the scalar function.
+    """
+    if np is not None:
+        return _calculate_az_el_np(obs_lat, obs_lon, obs_alt_m, target_lats, target_lons, target_alts_m)
+
+    lat1_rad = math.radians(obs_lat)
+    lon1_rad = math.radians(obs_lon)
+    sin_lat1, cos_lat1 = math.sin(lat1_rad), math.cos(lat1_rad)
+    r_obs = EARTH_RADIUS_M + obs_alt_m
+
+    azimuths, elevations = [], []
+    for t_lat, t_lon, t_alt in zip(target_lats, target_lons, target_alts_m):
+        lat2_rad = math.radians(t_lat)
+        d_lon = math.radians(t_lon) - lon1_rad
+        sin_lat2, cos_lat2 = math.sin(lat2_rad), math.cos(lat2_rad)
+        cos_dlon = math.cos(d_lon)
+
+        y = math.sin(d_lon) * cos_lat2
+        x = cos_lat1 * sin_lat2 - sin_lat1 * cos_lat2 * cos_dlon
+        azimuth_deg = (math.degrees(math.atan2(y, x)) + 360) % 360
+
+        a = math.sin((lat2_rad - lat1_rad) / 2)**2 + cos_lat1 * cos_lat2 * math.sin(d_lon / 2)**2
+        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+        r_target = EARTH_RADIUS_M + t_alt
+        s_sq = r_obs**2 + r_target**2 - 2 * r_obs * r_target * math.cos(c)
+
+        if s_sq <= 0.0001:
+            if r_target > r_obs: az, el = 0.0, 90.0
+            elif r_target < r_obs: az, el = 0.0, -90.0
+            else: az, el = 0.0, 0.0
+        else:
+            s = math.sqrt(s_sq)
+            cos_phi = (r_target**2 - r_obs**2 - s_sq) / (2 * r_obs * s)
+            cos_phi = max(-1.0, min(1.0, cos_phi))
+            az = round(azimuth_deg, 1)
+            el = round(90.0 - math.degrees(math.acos(cos_phi)), 1)
+        azimuths.append(az)
+        elevations.append(el)
+    return azimuths, elevations
+
+def _calculate_az_el_np(obs_lat, obs_lon, obs_alt_m, target_lats, target_lons, target_alts_m):
+    lat1_rad = math.radians(obs_lat)
+    lon1_rad = math.radians(obs_lon)
+    sin_lat1, cos_lat1 = math.sin(lat1_rad), math.cos(lat1_rad)
+    r_obs = EARTH_RADIUS_M + obs_alt_m
+
+    lat2_rad = np.radians(np.asarray(target_lats, dtype=float))
+    d_lon = np.radians(np.asarray(target_lons, dtype=float)) - lon1_rad
+    sin_lat2, cos_lat2 = np.sin(lat2_rad), np.cos(lat2_rad)
+
+    y = np.sin(d_lon) * cos_lat2
+    x = cos_lat1 * sin_lat2 - sin_lat1 * cos_lat2 * np.cos(d_lon)
+    azimuth_deg = (np.degrees(np.arctan2(y, x)) + 360) % 360
+
+    a = np.sin((lat2_rad - lat1_rad) / 2)**2 + cos_lat1 * cos_lat2 * np.sin(d_lon / 2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    r_target = EARTH_RADIUS_M + np.asarray(target_alts_m, dtype=float)
+    s_sq = r_obs**2 + r_target**2 - 2 * r_obs * r_target * np.cos(c)
+
+    coincident = s_sq <= 0.0001
+    s = np.sqrt(np.where(coincident, 1.0, s_sq))
+    cos_phi = np.clip((r_target**2 - r_obs**2 - s_sq) / (2 * r_obs * s), -1.0, 1.0)
+    elevation_deg = 90.0 - np.degrees(np.arccos(cos_phi))
+
+    azimuths = np.where(coincident, 0.0, np.round(azimuth_deg, 1))
+    elevations = np.where(coincident, 90.0 * np.sign(r_target - r_obs), np.round(elevation_deg, 1))
+    return azimuths.tolist(), elevations.tolist()
@@ -0,0 +1,542 @@
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from .config import load_config, subscribe, unsubscribe
+from .api import fetch_flightaware, fetch_flightradar24
+from .receivers import fetch_local_sources
+from .core import Deconflictor
+from .geo import haversine_distance_batch, calculate_az_el_batch
+from .tracks import TrackStore
+from .recorder import Recorder
+from .replay import ReplaySource
+from .scheduler import PollScheduler, local_coverage
+from .metrics import (FETCH_SECONDS, STAGE_SECONDS, UPSTREAM_ERRORS, UPSTREAM_TIMEOUTS,
+                      DECONFLICT_FLIGHTS, SNAPSHOT_FLIGHTS, SNAPSHOTS_PUBLISHED)
+from .profiling import Stopwatch, profiled
+from .view import filter_radius
+from .registry import registry_in_use
+
+logger = logging.getLogger(__name__)
+
+# name -> (config key for the poll interval, default interval, polled per area?)
+SOURCES = {
+    "local": ("local_interval_s", 2, False),
+    "flightaware": ("flightaware_interval_s", 10, True),
+    "flightradar24": ("flightradar24_interval_s", 10, True),
+}
+
+# Order in which source messages are reported, matching the old request path.
+SOURCE_ORDER = ("local", "flightaware", "flightradar24")
+
+SOURCE_LABELS = {"local": "Local", "flightaware": "FlightAware", "flightradar24": "FR24"}
+
+# Sources whose calls cost money and are rationed by the PollScheduler
+PAID_SOURCES = ("flightaware", "flightradar24")
+
+_versions = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    One published, deconflicted view of an area. Request handlers only read it.
+    """
+    version: int
+    created: float
+    area: tuple
+    flights: tuple
+    messages: tuple
+    # Paid API budget usage lines; informational, unlike `messages`
+    usage: tuple = ()
+    # Response bodies encoded by tracker.encoding, built on first read and shared by all readers
+    encodings: dict = field(default_factory=dict, compare=False, repr=False)
+    encode_lock: threading.Lock = field(default_factory=threading.Lock, compare=False, repr=False)
+    # Stage timings and counts of the cycle that built it, for /api/flights?profile=1
+    profile: dict = field(default_factory=dict, compare=False, repr=False)
+
+
+def area_key(lat, lon, radius_nm):
+    """
+    Normalizes request parameters so equivalent dashboards share one area.
+    """
+    return (round(lat, 4), round(lon, 4), round(radius_nm, 2))
+
+
+def enrich_flights(flights, lat, lon, obs_alt_m):
+    """
+    Adds distance (NM), azimuth and elevation relative to the observer to
+    each Flight record.
+
+    Geometry for the whole fleet is computed in one batch call.
+    """
+    positioned = [f for f in flights if f.lat is not None and f.lon is not None]
+    lats = [f.lat for f in positioned]
+    lons = [f.lon for f in positioned]
+    # Aircraft altitude is in feet in our normalized data (from FR24/FA/Local)
+    # and needs to be in meters for the Az/El calculation.
+    alts_m = [(f.altitude or 0) * 0.3048 for f in positioned]
+
+    distances = haversine_distance_batch(lat, lon, lats, lons)
+    azimuths, elevations = calculate_az_el_batch(lat, lon, obs_alt_m, lats, lons, alts_m)
+
+    for f, dist, az, el in zip(positioned, distances, azimuths, elevations):
+        f.distance_from_obs = dist
+        f.azimuth = az
+        f.elevation = el
+
+    for f in flights:
+        if f.lat is None or f.lon is None:
+            f.distance_from_obs = float('inf')
+            f.azimuth = 0
+            f.elevation = 0
+    return flights
+
+
+# Sources whose hex_id is a flight ident, not an ICAO address: FlightAware
+# reports only idents, and "Merged" flights are FA flights FR24 matched
+IDENT_SOURCES = {"FlightAware", "Merged"}
+
+def has_icao_address(f):
+    """
+    False when the flight's hex_id is an ident or callsign standing in for
+    the address (an ident like "ACA123" would otherwise parse as hex).
+    """
+    if f.source in IDENT_SOURCES:
+        return False
+    return not (f.source == "Flightradar24" and f.hex_id == f.callsign) # FR24 without a hex
+
+
+def enrich_registry(flights, registry):
+    """
+    Adds registration and operator from the aircraft database, and replaces
+    `type` with its ICAO type designator where known (local receivers only
+    report an emitter category). Returns the number of aircraft found.
+    """
+    found = 0
+    for f in flights:
+        if not has_icao_address(f):
+            continue
+        entry = registry.lookup(f.hex_id)
+        if entry is None:
+            continue
+        registration, type_code, operator = entry
+        f.registration = registration
+        f.operator = operator
+        if type_code:
+            f.type = type_code
+        found += 1
+    return found
+
+
+def diff_snapshots(old, new):
+    """
+    Describes how `new` differs from `old`, keyed by hex_id.
+
+    Returns {"added": [...], "updated": [...], "removed": [hex_id, ...]}.
+    """
+    old_flights = {f['hex_id']: f for f in old.flights}
+    added, updated = [], []
+    for f in new.flights:
+        previous = old_flights.pop(f['hex_id'], None)
+        if previous is None:
+            added.append(f)
+        elif previous != f:
+            updated.append(f)
+    return {"added": added, "updated": updated, "removed": list(old_flights)}
+
+
+def _default_fetchers():
+    replay = ReplaySource.from_config(load_config())
+    if replay:
+        return replay.fetchers()
+    return {
+        "local": lambda area: fetch_local_sources(),
+        "flightaware": lambda area: fetch_flightaware(*area),
+        "flightradar24": lambda area: fetch_flightradar24(*area),
+    }
+
+
+class IngestionEngine:
+    """
+    Polls every source on its own schedule in a background thread and
+    publishes an immutable Snapshot per active area.
+
+    Areas become active when a request asks for them and are dropped once no
+    request has read them for `area_idle_timeout_s`, so upstream traffic scales
+    with the number of distinct areas rather than the number of open dashboards.
+    """
+
+    def __init__(self, fetchers=None, tracks=None, recorder=None):
+        self.fetchers = fetchers or _default_fetchers()
+        self.tracks = tracks if tracks is not None else TrackStore.from_config(load_config())
+        self.recorder = recorder # Optional Recorder; snapshots are queued to it, never written inline
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._areas = {}        # area -> last read time
+        self._results = {}      # (source, area or None) -> (data, errors)
+        self._last_fetch = {}   # (source, area or None) -> time of last fetch
+        self._snapshots = {}    # area -> Snapshot
+        self._history = {}      # area -> deque of recent Snapshots, oldest first
+        self._pending = {}      # (source, area or None) -> Future that overran its budget
+        self._blocked = set()   # (source, area) due but skipped for lack of call budget
+        self._deconflictors = {}  # area -> Deconflictor, keeping association state between cycles
+        self._fetch_profiles = {} # (source, area or None) -> timings of its last completed fetch
+        self._listeners = []      # Called with every published snapshot, on the ingestion thread
+        self.scheduler = PollScheduler()
+
+        self._max_workers = load_config().get('ingest', {}).get('max_workers', 8)
+        self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="fetch")
+        subscribe(self._config_changed)
+
+    # Lifecycle
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ingestion", daemon=True)
+        self._thread.start()
+        logger.info("Ingestion engine started")
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self._executor.shutdown(wait=False)
+        unsubscribe(self._config_changed)
+
+    def _config_changed(self, old, new):
+        # Run a cycle at once so new intervals, sources and pool size take effect
+        self._wake.set()
+
+    def _resize_pool(self, max_workers):
+        """
+        Replaces the fetch pool when `max_workers` changes. Called on the
+        ingestion thread only, between cycles' submissions; fetches already
+        running finish on the old pool.
+        """
+        if max_workers == self._max_workers:
+            return
+        old_executor = self._executor
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+        self._max_workers = max_workers
+        old_executor.shutdown(wait=False)
+        logger.info(f"Fetch pool resized to {max_workers} workers")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                profiled(self.run_cycle)
+            except Exception as e:
+                logger.error(f"Ingestion cycle failed: {e}")
+            self._wake.wait(self._tick())
+            self._wake.clear()
+
+    def _tick(self):
+        ingest_conf = load_config().get('ingest', {})
+        intervals = [ingest_conf.get(key, default) for key, default, _ in SOURCES.values()]
+        return max(0.1, min(intervals) / 2)
+
+    # Reading
+
+    def get_snapshot(self, lat, lon, radius_nm, timeout=None):
+        """
+        Returns the latest snapshot for an area, registering the area if new.
+
+        The first read of a new area waits (up to `first_snapshot_timeout_s`)
+        for the background thread to produce its first snapshot.
+        """
+        if timeout is None:
+            timeout = load_config().get('ingest', {}).get('first_snapshot_timeout_s', 15)
+
+        snapshot = self.wait_for_snapshot(lat, lon, radius_nm, 0, timeout)
+        if snapshot is None:
+            return Snapshot(0, time.time(), area_key(lat, lon, radius_nm), (), ("Waiting for first data cycle",))
+        return snapshot
+
+    def wait_for_snapshot(self, lat, lon, radius_nm, after_version=0, timeout=15):
+        """
+        Blocks until the area has a snapshot newer than `after_version`.
+
+        Returns the latest snapshot (which may still be `after_version` itself,
+        or None for an area with no data yet) if `timeout` expires first.
+        Every call counts as a read and keeps the area active.
+        """
+        area = area_key(lat, lon, radius_nm)
+
+        def is_newer():
+            snapshot = self._snapshots.get(area)
+            return snapshot is not None and snapshot.version > after_version
+
+        with self._cond:
+            self._areas[area] = time.time()
+            if area not in self._snapshots:
+                self._wake.set()
+            self._cond.wait_for(is_newer, timeout)
+            return self._snapshots.get(area)
+
+    def touch_area(self, area, last_read):
+        """
+        Marks an area as read at `last_read` (registering it if new) on
+        behalf of a reader in another process.
+        """
+        with self._lock:
+            if area not in self._areas:
+                self._wake.set()
+            self._areas[area] = max(self._areas.get(area, 0), last_read)
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def get_version(self, lat, lon, radius_nm, version):
+        """
+        Returns a recently published snapshot of the area by version, or None
+        once it has fallen out of the `history_versions` window.
+        """
+        area = area_key(lat, lon, radius_nm)
+        with self._lock:
+            for snapshot in self._history.get(area, ()):
+                if snapshot.version == version:
+                    return snapshot
+        return None
+
+    # Ingestion
+
+    def _active_areas(self, now, idle_timeout):
+        with self._lock:
+            for area, last_read in list(self._areas.items()):
+                if now - last_read > idle_timeout:
+                    logger.info(f"Dropping idle area {area}")
+                    del self._areas[area]
+                    self._snapshots.pop(area, None)
+                    self._history.pop(area, None)
+                    self.scheduler.forget(area)
+                    self._deconflictors.pop(area, None)
+                    self._blocked = {k for k in self._blocked if k[1] != area}
+                    for key in [k for k in {**self._last_fetch, **self._pending} if k[1] == area]:
+                        self._results.pop(key, None)
+                        self._last_fetch.pop(key, None)
+                        self._pending.pop(key, None)
+                        self._fetch_profiles.pop(key, None)
+            return list(self._areas)
+
+    def _due_jobs(self, areas, now, config):
+        """
+        Returns (keys to fetch now, paid keys that are due but over budget).
+        """
+        ingest_conf = config.get('ingest', {})
+        quota_conf = config.get('quota', {})
+        jobs, blocked = [], []
+        for name, (interval_key, default, per_area) in SOURCES.items():
+            interval = ingest_conf.get(interval_key, default)
+            keys = [(name, area) for area in areas] if per_area else [(name, None)]
+            # Areas waiting longest get first claim on a paid provider's budget
+            for key in sorted(keys, key=lambda k: self._last_fetch.get(k, 0)):
+                if key in self._pending:
+                    continue # Still in flight; collected by _fetch
+                key_interval = interval
+                if name in PAID_SOURCES:
+                    coverage = local_coverage(self._snapshots.get(key[1])) if key in self._results else None
+                    key_interval = self.scheduler.interval(name, key[1], interval, coverage, len(areas), quota_conf)
+                if now - self._last_fetch.get(key, 0) < key_interval:
+                    continue
+                if name in PAID_SOURCES and not self.scheduler.budget(name, quota_conf).try_acquire(now):
+                    blocked.append(key)
+                    continue
+                jobs.append(key)
+        return jobs, blocked
+
+    def _result_of(self, key, future):
+        try:
+            return future.result()
+        except Exception as e:
+            name = SOURCE_LABELS[key[0]]
+            logger.error(f"Source {name} failed: {e}")
+            return [], [f"{name} Error: {e}"]
+
+    def _timed_fetch(self, key):
+        with Stopwatch() as timer:
+            result = profiled(self.fetchers[key[0]], key[1])
+        FETCH_SECONDS.labels(key[0]).observe(timer.wall)
+        self._fetch_profiles[key] = timer.as_dict(completed=time.time())
+        return result
+
+    def _fetch(self, jobs, budget):
+        """
+        Runs the due fetches concurrently, waiting at most `budget` seconds.
+
+        Returns ({key: (data, errors)}, keys that missed the deadline). A late
+        fetch keeps running and its result is collected by a later cycle; it
+        is not resubmitted while still in flight.
+        """
+        results = {}
+        for key, future in list(self._pending.items()):
+            if future.done():
+                del self._pending[key]
+                results[key] = self._result_of(key, future)
+
+        futures = {}
+        for key in jobs:
+            if key in self._pending or key in results:
+                continue
+            futures[key] = self._executor.submit(self._timed_fetch, key)
+
+        done, _ = wait(futures.values(), timeout=budget)
+
+        late = []
+        for key, future in futures.items():
+            if future in done:
+                results[key] = self._result_of(key, future)
+            else:
+                logger.warning(f"Source {SOURCE_LABELS[key[0]]} missed the {budget}s fetch budget")
+                UPSTREAM_TIMEOUTS.labels(key[0]).inc()
+                self._pending[key] = future
+                late.append(key)
+        return results, late
+
+    def run_cycle(self):
+        """
+        Fetches every due source once and republishes the affected areas.
+        """
+        config = load_config()
+        ingest_conf = config.get('ingest', {})
+        now = time.time()
+
+        areas = self._active_areas(now, ingest_conf.get('area_idle_timeout_s', 120))
+        if not areas:
+            return
+        self._resize_pool(ingest_conf.get('max_workers', 8))
+
+        jobs, blocked = self._due_jobs(areas, now, config)
+        results, late = self._fetch(jobs, ingest_conf.get('fetch_budget_s', 4))
+        for key, result in results.items():
+            if result[1]:
+                UPSTREAM_ERRORS.labels(key[0]).inc(len(result[1]))
+            self._results[key] = result
+            self._last_fetch[key] = now
+
+        # Republish when a source first runs out of budget so readers learn why
+        # its data stopped updating; staying blocked changes nothing further.
+        newly_blocked = set(blocked) - self._blocked
+        self._blocked = set(blocked)
+        changed = list(results) + late + list(newly_blocked)
+        obs_alt = config['observer'].get('altitude_m', 0)
+        for area in areas:
+            if area in self._snapshots and not any(k[1] in (None, area) for k in changed):
+                continue
+            self._publish(area, obs_alt, now)
+
+    def _inputs(self, area):
+        inputs = {}
+        for name, (_, _, per_area) in SOURCES.items():
+            key = (name, area if per_area else None)
+            data, errors = self._results.get(key, ([], []))
+            if key in self._pending:
+                state = "showing previous data" if key in self._results else "no data yet"
+                errors = errors + [f"{SOURCE_LABELS[name]} late: still waiting for response ({state})"]
+            elif key in self._blocked:
+                state = "showing previous data" if key in self._results else "no data yet"
+                errors = errors + [f"{SOURCE_LABELS[name]} call budget exhausted: poll skipped ({state})"]
+            # Deconflictor.merge merges into the dicts it is given, so each cycle
+            # works on copies and cached source results stay pristine.
+            inputs[name] = ([f.copy() for f in data], errors)
+        return inputs
+
+    def _source_profiles(self, area, inputs):
+        profiles = {}
+        for name, (_, _, per_area) in SOURCES.items():
+            key = (name, area if per_area else None)
+            data, errors = inputs[name]
+            profiles[name] = {**self._fetch_profiles.get(key, {}), "flights": len(data), "errors": len(errors),
+                              "pending": key in self._pending}
+        return profiles
+
+    def _publish(self, area, obs_alt, now):
+        inputs = self._inputs(area)
+        deconflictor = self._deconflictors.get(area)
+        if deconflictor is None:
+            deconflictor = self._deconflictors[area] = Deconflictor()
+        flights_in = sum(len(data) for data, _ in inputs.values())
+        with Stopwatch() as deconflict_time:
+            clean_data = deconflictor.merge(inputs["flightaware"][0], inputs["flightradar24"][0], inputs["local"][0])
+        STAGE_SECONDS.labels("deconflict").observe(deconflict_time.wall)
+        for result, count in deconflictor.outcomes.items():
+            DECONFLICT_FLIGHTS.labels(result).inc(count)
+        with Stopwatch() as enrich_time:
+            enrich_flights(clean_data, area[0], area[1], obs_alt)
+        STAGE_SECONDS.labels("enrich").observe(enrich_time.wall)
+        merged_count = len(clean_data)
+        if load_config().get('view', {}).get('filter_radius', True):
+            clean_data = filter_radius(clean_data, area[2])
+        registry_found = 0
+        with registry_in_use() as registry, Stopwatch() as registry_time:
+            if registry is not None:
+                registry_found = enrich_registry(clean_data, registry)
+        STAGE_SECONDS.labels("registry").observe(registry_time.wall)
+
+        messages = []
+        for name in SOURCE_ORDER:
+            messages.extend(inputs[name][1])
+        usage = []
+        for name in PAID_SOURCES:
+            line = self.scheduler.usage_message(name, SOURCE_LABELS[name], area, now)
+            if line:
+                usage.append(line)
+
+        profile = {
+            "sources": self._source_profiles(area, inputs),
+            "stages": {
+                "deconflict": deconflict_time.as_dict(flights_in=flights_in, flights_out=merged_count,
+                                                      **deconflictor.outcomes, **deconflictor.stats),
+                "enrich": enrich_time.as_dict(flights=merged_count, in_radius=len(clean_data)),
+                "registry": registry_time.as_dict(found=registry_found),
+            },
+        }
+        snapshot = Snapshot(next(_versions), now, area, tuple(clean_data), tuple(messages), tuple(usage),
+                            profile=profile)
+        SNAPSHOT_FLIGHTS.observe(len(clean_data))
+        SNAPSHOTS_PUBLISHED.inc()
+        self.tracks.record(clean_data, now)
+        if self.recorder:
+            self.recorder.submit(snapshot)
+        history_len = load_config().get('ingest', {}).get('history_versions', 20)
+        with self._cond:
+            published = area in self._areas
+            if published:
+                self._snapshots[area] = snapshot
+                history = self._history.get(area)
+                if history is None or history.maxlen != history_len:
+                    history = self._history[area] = deque(history or (), maxlen=history_len)
+                history.append(snapshot)
+            self._cond.notify_all()
+        for listener in self._listeners if published else ():
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error(f"Snapshot listener failed: {e}")
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    Returns the process-wide ingestion engine, starting it on first use.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = IngestionEngine(recorder=Recorder.from_config(load_config()))
+            _engine.start()
+        return _engine
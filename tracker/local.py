@@ -1,12 +1,33 @@
 import json
 import logging
+import threading
 import time
 import os
-import requests
 from .config import load_config
+from .feeds import get_feed
+from .flight import Flight
+from .metrics import NORMALIZE_SECONDS
+from .sessions import get_session, request_timeout
+from .watcher import get_watcher
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError: # orjson is optional; fall back to the stdlib decoder
+    _json_loads = json.loads
 
 logger = logging.getLogger(__name__)
 
+# path_or_url -> (change marker, parsed document). For files the marker is
+# (inode, mtime_ns, size) plus the watcher generation; for URLs the
+# ETag/Last-Modified validators. An unchanged source returns the very same
+# document object, which lets normalized results be reused too.
+_json_cache = {}
+
+# source name -> (document it was built from, normalized flights)
+_normalized_cache = {}
+_cache_lock = threading.Lock()
+
 DEFAULT_PATHS = {
     "dump1090": "/run/dump1090-fa/aircraft.json",
     "dump978": "/run/dump978-fa/aircraft.json"
@@ -17,24 +38,72 @@ DEFAULT_URLS = {
     "dump978": "http://localhost:8978/data/aircraft.json" # Common port for skyaware978
 }
 
+def _read_json_file(path):
+    """
+    Parses a JSON file, skipping the parse if the file is unchanged.
+
+    With inotify the unchanged case costs no syscalls at all; otherwise the
+    file's (inode, mtime, size) is compared against the cached copy.
+    """
+    cached = _json_cache.get(path)
+    watcher = get_watcher()
+    generation = watcher.generation(path) if watcher and watcher.watch(path) else None
+    if cached and generation is not None and cached[0][1] == generation:
+        return cached[1]
+
+    # The generation is read before stat/open, so a write racing with this
+    # read bumps it again and the next call re-checks the file.
+    st = os.stat(path)
+    signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+    if cached and cached[0][0] == signature:
+        _json_cache[path] = ((signature, generation), cached[1])
+        return cached[1]
+
+    with open(path, 'rb') as f:
+        data = _json_loads(f.read())
+    _json_cache[path] = ((signature, generation), data)
+    logger.info(f"Successfully fetched local data from file: {path}")
+    return data
+
+def _read_json_url(url):
+    """
+    Fetches JSON from a URL, using a conditional GET so an unchanged
+    document comes back as a 304 and is not reparsed.
+    """
+    cached = _json_cache.get(url)
+    headers = {}
+    if cached:
+        etag, last_modified = cached[0]
+        if etag: headers['If-None-Match'] = etag
+        if last_modified: headers['If-Modified-Since'] = last_modified
+
+    response = get_session().get(url, headers=headers, timeout=request_timeout(2))
+    if response.status_code == 304 and cached:
+        return cached[1]
+    response.raise_for_status()
+    data = _json_loads(response.content)
+    _json_cache[url] = ((response.headers.get('ETag'), response.headers.get('Last-Modified')), data)
+    logger.info(f"Successfully fetched local data from URL: {url}")
+    return data
+
+def read_json_source(path_or_url):
+    """
+    Reads JSON from a local file path or a URL, raising on failure.
+    """
+    if path_or_url.startswith("http://") or path_or_url.startswith("https://"):
+        return _read_json_url(path_or_url)
+    if not os.path.exists(path_or_url):
+        raise FileNotFoundError(f"No such file: {path_or_url}")
+    return _read_json_file(path_or_url)
+
 def fetch_json_from_path_or_url(path_or_url):
     """
-    Reads JSON from a local file path or a URL.
+    Reads JSON from a local file path or a URL, or returns None.
     """
     try:
-        if path_or_url.startswith("http://") or path_or_url.startswith("https://"):
-            response = requests.get(path_or_url, timeout=2)
-            response.raise_for_status()
-            logger.info(f"Successfully fetched local data from URL: {path_or_url}")
-            return response.json()
-        else:
-            if os.path.exists(path_or_url):
-                with open(path_or_url, 'r') as f:
-                    data = json.load(f)
-                    logger.info(f"Successfully fetched local data from file: {path_or_url}")
-                    return data
-            else:
-                logger.debug(f"Local file not found: {path_or_url}")
+        return read_json_source(path_or_url)
+    except FileNotFoundError:
+        logger.debug(f"Local file not found: {path_or_url}")
     except Exception as e:
         logger.warning(f"Failed to read local data from {path_or_url}: {e}")
     return None
@@ -57,18 +126,49 @@ def normalize_local_flight(f, source_name):
     # Handle 'flight' (callsign) - typically has trailing spaces in dump1090
     callsign = f.get('flight', '').strip() or hex_id
 
-    return {
-        "source": source_name,
-        "hex_id": hex_id.lower(),
-        "callsign": callsign,
-        "lat": lat,
-        "lon": lon,
-        "heading": f.get('track', 0),
-        "altitude": f.get('alt_baro', f.get('alt_geom', 0)),
-        "speed": f.get('gs', 0),
-        "type": f.get('category', 'Unknown'),
-        "timestamp": 0 # Placeholder
-    }
+    return Flight(
+        source_name,                              # source
+        hex_id.lower(),                           # hex_id
+        callsign,                                 # callsign
+        lat,                                      # lat
+        lon,                                      # lon
+        f.get('track', 0),                        # heading
+        f.get('alt_baro', f.get('alt_geom', 0)),  # altitude
+        f.get('gs', 0),                           # speed
+        f.get('category', 'Unknown'),             # type
+        0                                         # timestamp (Placeholder)
+    )
+
+def normalize_aircraft_json(data, source_name):
+    """
+    Normalizes a whole dump1090/978 aircraft.json document, skipping
+    aircraft not heard from in the last 60 seconds.
+    """
+    flights = []
+    now_ts = data.get('now', time.time())
+    for f in data.get('aircraft', []):
+        seen = f.get('seen', 999)
+        if seen > 60: continue
+        norm = normalize_local_flight(f, source_name)
+        if norm:
+            norm.timestamp = int(now_ts - seen)
+            flights.append(norm)
+    return flights
+
+def normalize_aircraft_json_cached(data, source_name):
+    """
+    normalize_aircraft_json, reusing the previous result while the reader
+    keeps returning the same (unchanged) document.
+    """
+    with _cache_lock:
+        cached = _normalized_cache.get(source_name)
+        if cached and cached[0] is data:
+            return list(cached[1])
+    with NORMALIZE_SECONDS.labels("local").time():
+        flights = normalize_aircraft_json(data, source_name)
+    with _cache_lock:
+        _normalized_cache[source_name] = (data, flights)
+    return list(flights)
 
 def fetch_local_data():
     """
@@ -106,14 +206,7 @@ def fetch_local_data():
             break
 
     if data_1090:
-        now_ts = data_1090.get('now', time.time())
-        for f in data_1090.get('aircraft', []):
-            seen = f.get('seen', 999)
-            if seen > 60: continue
-            norm = normalize_local_flight(f, "Local (1090)")
-            if norm:
-                norm['timestamp'] = int(now_ts - seen)
-                flights.append(norm)
+        flights.extend(normalize_aircraft_json_cached(data_1090, "Local (1090)"))
     else:
         # Only log if we tried specific config and failed, or if neither default worked
         pass
@@ -125,13 +218,14 @@ def fetch_local_data():
         if data_978: break
 
     if data_978:
-        now_ts = data_978.get('now', time.time())
-        for f in data_978.get('aircraft', []):
-            seen = f.get('seen', 999)
-            if seen > 60: continue
-            norm = normalize_local_flight(f, "Local (978)")
-            if norm:
-                norm['timestamp'] = int(now_ts - seen)
-                flights.append(norm)
+        flights.extend(normalize_aircraft_json_cached(data_978, "Local (978)"))
+
+    # Streaming feeds come last: they are the freshest, and later local
+    # entries replace earlier ones with the same hex during deconfliction.
+    for protocol, label in (("sbs", "Local (SBS)"), ("beast", "Local (Beast)")):
+        address = local_conf.get(protocol)
+        if address:
+            feed = get_feed(address, protocol)
+            flights.extend(normalize_aircraft_json(feed.table.document(), label))
 
     return flights, []
@@ -0,0 +1,131 @@
+import cProfile
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+class CaptureBusy(Exception):
+    """
+    Raised when a capture is requested while another one is running.
+    """
+
+class Stopwatch:
+    """
+    Wall-clock and CPU time (of the calling thread) spent in a with-block.
+    """
+    __slots__ = ("wall", "cpu", "_start")
+
+    def __enter__(self):
+        self._start = (time.perf_counter(), time.thread_time())
+        return self
+
+    def __exit__(self, *exc):
+        self.wall = time.perf_counter() - self._start[0]
+        self.cpu = time.thread_time() - self._start[1]
+
+    def as_dict(self, **counts):
+        return {"wall_ms": round(self.wall * 1000, 3), "cpu_ms": round(self.cpu * 1000, 3), **counts}
+
+class Capture:
+    """
+    Collects cProfile data for calls routed through `profiled` while active.
+
+    cProfile only sees the thread that enables it, so every profiled call
+    gets its own profiler and the results are combined at the end.
+    """
+
+    def __init__(self):
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    def run(self, fn, *args):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError: # Another profiler owns this thread
+            return fn(*args)
+        try:
+            return fn(*args)
+        finally:
+            profile.disable()
+            with self._lock:
+                self._profiles.append(profile)
+
+    def dump(self):
+        """
+        Returns the combined stats in the marshal format of
+        `pstats.Stats.dump_stats`, loadable by pstats, snakeviz or gprof2dot.
+        """
+        stats = pstats.Stats()
+        with self._lock:
+            for profile in self._profiles:
+                stats.add(profile)
+        return marshal.dumps(stats.stats)
+
+_capture = None
+_capture_lock = threading.Lock()
+
+def profiled(fn, *args):
+    """
+    Calls fn(*args), under the active cProfile capture if there is one.
+    """
+    capture = _capture
+    if capture is None:
+        return fn(*args)
+    return capture.run(fn, *args)
+
+def capture_cprofile(seconds):
+    """
+    Profiles the ingestion engine's cycles and fetches for `seconds` and
+    returns a pstats dump.
+    """
+    global _capture
+    if not _capture_lock.acquire(blocking=False):
+        raise CaptureBusy()
+    try:
+        _capture = capture = Capture()
+        logger.info(f"cProfile capture started for {seconds}s")
+        time.sleep(seconds)
+    finally:
+        _capture = None
+        _capture_lock.release()
+    return capture.dump()
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def sample_stacks(seconds, interval_s=0.005):
+    """
+    Samples the stacks of every other thread for `seconds` and returns them
+    in the collapsed format read by flamegraph.pl and speedscope: one line
+    per distinct stack, root first, followed by its sample count.
+    """
+    if not _capture_lock.acquire(blocking=False):
+        raise CaptureBusy()
+    try:
+        counts = Counter()
+        me = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        logger.info(f"Stack sampling started for {seconds}s")
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                counts[";".join(reversed(stack))] += 1
+            time.sleep(interval_s)
+    finally:
+        _capture_lock.release()
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
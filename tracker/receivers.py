@@ -0,0 +1,252 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from .config import load_config, subscribe
+from .feeds import get_feed
+from .local import read_json_source, normalize_local_flight, fetch_local_data
+from .metrics import NORMALIZE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+MAX_SEEN_S = 60         # Aircraft not heard from for longer are dropped
+STALE_DOCUMENT_S = 60   # An aircraft.json whose `now` is older means a stalled decoder
+FAILURES_BEFORE_BACKOFF = 3
+MAX_BACKOFF_S = 60
+
+class Receiver:
+    """
+    One named entry of `local_sources.receivers`: an aircraft.json file or
+    URL (`source`), or a streaming `sbs` / `beast` feed, with its health.
+
+    After FAILURES_BEFORE_BACKOFF consecutive failures a receiver is retried
+    with exponential backoff instead of every cycle, so a dead site costs
+    nothing while it is down.
+    """
+
+    def __init__(self, name, source=None, sbs=None, beast=None):
+        if sum(1 for v in (source, sbs, beast) if v) != 1:
+            raise ValueError(f"Receiver {name!r} needs exactly one of source, sbs or beast")
+        self.name = name
+        if source:
+            self.protocol, self.address = None, source
+        else:
+            self.protocol, self.address = ("sbs", sbs) if sbs else ("beast", beast)
+
+        self.status = "unknown"  # unknown | ok | down
+        self.failures = 0        # consecutive
+        self.last_ok = None
+        self.last_error = None
+        self.latency_s = None
+        self.aircraft = 0
+        self.retry_at = 0.0
+        self.pending = None      # Future of a read that outlived its timeout
+
+        # Document the entries below were extracted from; an unchanged
+        # source returns the same object, so they are reused as-is.
+        self._document = None
+        self._entries = ()
+
+    @classmethod
+    def from_config(cls, conf):
+        return cls(conf['name'], source=conf.get('source'), sbs=conf.get('sbs'), beast=conf.get('beast'))
+
+    def same_endpoint(self, other):
+        return (self.protocol, self.address) == (other.protocol, other.address)
+
+    def read(self):
+        if self.protocol:
+            return get_feed(self.address, self.protocol).table.document()
+        return read_json_source(self.address)
+
+    def entries(self, document, now):
+        """
+        Returns [(hex, seen_at, aircraft)] for positioned aircraft heard from
+        in the last MAX_SEEN_S seconds.
+        """
+        doc_now = document.get('now', now)
+        if now - doc_now > STALE_DOCUMENT_S:
+            raise ValueError(f"data is {now - doc_now:.0f}s old")
+        if document is self._document:
+            return self._entries
+        entries = []
+        for a in document.get('aircraft', ()):
+            hex_id = a.get('hex')
+            seen = a.get('seen', 999)
+            if not hex_id or seen > MAX_SEEN_S or a.get('lat') is None or a.get('lon') is None:
+                continue
+            entries.append((hex_id.lower(), doc_now - seen, a))
+        self._document, self._entries = document, entries
+        return entries
+
+    def succeeded(self, now, latency, aircraft):
+        if self.status != "ok":
+            logger.info(f"Receiver {self.name} is up ({aircraft} aircraft)")
+        self.status = "ok"
+        self.failures = 0
+        self.last_ok = now
+        self.last_error = None
+        self.latency_s = latency
+        self.aircraft = aircraft
+        self.retry_at = 0.0
+
+    def failed(self, now, error):
+        self.failures += 1
+        self.last_error = str(error) or type(error).__name__
+        self.aircraft = 0
+        if self.status != "down":
+            logger.warning(f"Receiver {self.name} is down: {self.last_error}")
+        self.status = "down"
+        if self.failures >= FAILURES_BEFORE_BACKOFF:
+            self.retry_at = now + min(MAX_BACKOFF_S, 2 ** (self.failures - FAILURES_BEFORE_BACKOFF + 1))
+
+    def error_message(self, now):
+        message = f"Receiver {self.name} down: {self.last_error}"
+        if self.retry_at > now:
+            message += f" (retrying in {self.retry_at - now:.0f}s)"
+        return message
+
+    def health(self):
+        return {
+            "name": self.name,
+            "source": self.address,
+            "protocol": self.protocol or "json",
+            "status": self.status,
+            "aircraft": self.aircraft,
+            "latency_s": self.latency_s,
+            "last_ok": self.last_ok,
+            "consecutive_failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+def merge_receivers(results):
+    """
+    Merges [(receiver, entries)] by hex. Each aircraft keeps the report with
+    the freshest `seen`, and its source label names every receiver that saw
+    it, freshest first: "Local (north, south)".
+    """
+    best = {}  # hex -> [seen_at, aircraft, receiver names]
+    for receiver, entries in results:
+        name = receiver.name
+        for hex_id, seen_at, a in entries:
+            entry = best.get(hex_id)
+            if entry is None:
+                best[hex_id] = [seen_at, a, [name]]
+            elif seen_at > entry[0]:
+                entry[0] = seen_at
+                entry[1] = a
+                entry[2].insert(0, name)
+            else:
+                entry[2].append(name)
+
+    flights = []
+    for seen_at, a, names in best.values():
+        flight = normalize_local_flight(a, f"Local ({', '.join(names)})")
+        flight.timestamp = int(seen_at)
+        flights.append(flight)
+    return flights
+
+class ReceiverNetwork:
+    """
+    Fetches every configured receiver in parallel and merges the results.
+
+    Reads run on a shared thread pool and the cycle waits at most
+    `receiver_timeout_s` for them, so the fetch time follows the slowest
+    receiver rather than the number of receivers. A read that overruns is
+    counted as a failure and left to finish in the background; the
+    receiver is not read again until it has.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._receivers = {}  # name -> Receiver, in config order
+        self._executor = None
+        self._workers = None
+        self._lock = threading.Lock()
+
+    def configure(self, receiver_confs):
+        """
+        Applies the receiver list, keeping the health of receivers whose
+        name and endpoint are unchanged.
+        """
+        receivers = {}
+        for conf in receiver_confs:
+            receiver = Receiver.from_config(conf)
+            previous = self._receivers.get(receiver.name)
+            receivers[receiver.name] = previous if previous and previous.same_endpoint(receiver) else receiver
+        self._receivers = receivers
+        return list(receivers.values())
+
+    def reconfigure(self, local_conf):
+        with self._lock:
+            self.configure(local_conf.get('receivers') or [])
+
+    def _pool(self, workers):
+        if self._executor is None or self._workers != workers:
+            if self._executor:
+                self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="receiver")
+            self._workers = workers
+        return self._executor
+
+    def fetch(self, local_conf):
+        with self._lock:
+            receivers = self.configure(local_conf.get('receivers') or [])
+            now = self.clock()
+            due = [r for r in receivers if r.retry_at <= now and (r.pending is None or r.pending.done())]
+            pool = self._pool(local_conf.get('receiver_workers', 16))
+            futures = {pool.submit(self._timed_read, r): r for r in due}
+            done, _ = wait(futures, timeout=local_conf.get('receiver_timeout_s', 3))
+
+            results = []
+            now = self.clock()
+            for future, receiver in futures.items():
+                receiver.pending = None
+                if future not in done:
+                    receiver.pending = future
+                    receiver.failed(now, TimeoutError("timed out"))
+                    continue
+                try:
+                    document, latency = future.result()
+                    entries = receiver.entries(document, now)
+                except Exception as e:
+                    receiver.failed(now, e)
+                    continue
+                receiver.succeeded(now, latency, len(entries))
+                results.append((receiver, entries))
+
+            errors = [r.error_message(now) for r in receivers if r.status == "down"]
+        with NORMALIZE_SECONDS.labels("local").time():
+            flights = merge_receivers(results)
+        return flights, errors
+
+    def _timed_read(self, receiver):
+        start = time.perf_counter()
+        document = receiver.read()
+        return document, time.perf_counter() - start
+
+    def health(self):
+        return [r.health() for r in self._receivers.values()]
+
+_network = ReceiverNetwork()
+
+def _config_changed(old, new):
+    local_conf = new.get('local_sources', {})
+    if old.get('local_sources') != local_conf:
+        _network.reconfigure(local_conf)
+
+subscribe(_config_changed)
+
+def get_network():
+    return _network
+
+def fetch_local_sources():
+    """
+    Local fetcher for the ingestion engine: the receiver network when
+    `local_sources.receivers` is configured, else the single dump1090 /
+    dump978 / feed entries.
+    """
+    local_conf = load_config().get('local_sources', {})
+    if local_conf.get('receivers'):
+        return _network.fetch(local_conf)
+    return fetch_local_data()
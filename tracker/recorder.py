@@ -0,0 +1,294 @@
+import glob
+import json
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+from datetime import datetime, timezone
+from .tracks import track_key
+
+logger = logging.getLogger(__name__)
+
+# One fixed-size record per aircraft per snapshot
+RECORD = struct.Struct('<Qdd12s12sddfff24s8s')
+RECORD_FIELDS = ("version", "snapshot_time", "timestamp", "hex_id", "callsign", "lat", "lon",
+                 "altitude", "speed", "heading", "source", "type")
+TEXT_FIELDS = {"hex_id", "callsign", "source", "type"}
+
+# One index entry per snapshot: (snapshot_time, first record number, record count)
+INDEX_ENTRY = struct.Struct('<dQI')
+
+SEGMENT_FORMAT = "%Y%m%dT%H"
+
+# Last second datetime can name a segment for (9999-12-31T23:59:59 UTC)
+MAX_TIMESTAMP = 253402300799.0
+
+def segment_name(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime(SEGMENT_FORMAT)
+
+def _text(value, size):
+    return str(value if value is not None else "").encode('utf-8')[:size]
+
+def _num(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+def pack_snapshot(snapshot):
+    """
+    Encodes every flight of a snapshot as consecutive fixed-size records.
+    """
+    buf = bytearray(RECORD.size * len(snapshot.flights))
+    for i, f in enumerate(snapshot.flights):
+        RECORD.pack_into(buf, i * RECORD.size,
+                         snapshot.version, snapshot.created, _num(f.get('timestamp')),
+                         _text(f.get('hex_id'), 12), _text(f.get('callsign'), 12),
+                         _num(f.get('lat')), _num(f.get('lon')),
+                         _num(f.get('altitude')), _num(f.get('speed')), _num(f.get('heading')),
+                         _text(f.get('source'), 24), _text(f.get('type'), 8))
+    return buf
+
+def unpack_record(buf, offset):
+    values = RECORD.unpack_from(buf, offset)
+    record = {}
+    for name, value in zip(RECORD_FIELDS, values):
+        if name in TEXT_FIELDS:
+            value = value.rstrip(b'\0').decode('utf-8', 'replace')
+        elif isinstance(value, float) and value != value:
+            value = None # NaN marks a missing or non-numeric field
+        record[name] = value
+    return record
+
+class _Segment:
+    """
+    The segment currently being appended to: `<name>.rec` records,
+    `<name>.idx` time index and, once closed, a `<name>.hex` hex index.
+    """
+
+    def __init__(self, directory, name):
+        self.name = name
+        self.base = os.path.join(directory, name)
+        self.rec = open(self.base + ".rec", "ab")
+        self.idx = open(self.base + ".idx", "ab")
+        self.count = self.rec.tell() // RECORD.size
+        # Reopening a closed segment: the saved hex index becomes stale as soon
+        # as we append, so keep it in memory only until this segment closes.
+        self.hex_ranges = _load_hex_index(self.base) or {}
+        if os.path.exists(self.base + ".hex"):
+            os.remove(self.base + ".hex")
+
+    def append(self, snapshot):
+        data = pack_snapshot(snapshot)
+        first = self.count
+        self.rec.write(data)
+        self.rec.flush()
+        # The index entry is written only after its records are on disk, so
+        # readers never see an entry that points past the end of the file.
+        self.idx.write(INDEX_ENTRY.pack(snapshot.created, first, len(snapshot.flights)))
+        self.idx.flush()
+        self.count += len(snapshot.flights)
+
+        for i, f in enumerate(snapshot.flights):
+            hex_id = track_key(f.get('hex_id'))
+            rng = self.hex_ranges.get(hex_id)
+            if rng is None:
+                self.hex_ranges[hex_id] = [first + i, first + i]
+            else:
+                rng[1] = first + i
+
+    def close(self):
+        self.rec.close()
+        self.idx.close()
+        with open(self.base + ".hex", "w") as f:
+            json.dump(self.hex_ranges, f)
+
+def _load_hex_index(base):
+    """
+    Loads a segment's hex index keyed by `track_key`. Indexes written before
+    hex ids were normalized have one range per spelling; those are merged.
+    """
+    try:
+        with open(base + ".hex") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    hex_ranges = {}
+    for hex_id, (lo, hi) in saved.items():
+        rng = hex_ranges.setdefault(track_key(hex_id), [lo, hi])
+        rng[0], rng[1] = min(rng[0], lo), max(rng[1], hi)
+    return hex_ranges
+
+def _map(path):
+    """
+    Memory-maps a file read-only, returning None if it is missing or empty.
+    """
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except OSError:
+        return None
+
+def _first_entry_at_or_after(idx, n_entries, ts):
+    lo, hi = 0, n_entries
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if INDEX_ENTRY.unpack_from(idx, mid * INDEX_ENTRY.size)[0] < ts:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+def _first_entry_after(idx, n_entries, ts):
+    lo, hi = 0, n_entries
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if INDEX_ENTRY.unpack_from(idx, mid * INDEX_ENTRY.size)[0] <= ts:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+def check_window(start, end):
+    """
+    Raises ValueError unless [start, end] is a finite Unix time window that
+    segment names can represent.
+    """
+    if not 0 <= start <= end <= MAX_TIMESTAMP: # Also false for NaN
+        raise ValueError(f"Invalid time window [{start}, {end}]")
+
+class Recorder:
+    """
+    Append-only flight recorder.
+
+    Snapshots are queued by `submit` and written by a background thread into
+    hourly segments of fixed-size records, so recording never blocks the
+    ingestion or request path. `query` reads segments through mmap, using the
+    per-segment time index (and hex index where available) to touch only the
+    records in the requested window.
+    """
+
+    def __init__(self, directory, queue_size=100):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._segment = None
+        self._thread = threading.Thread(target=self._run, name="recorder", daemon=True)
+        self._thread.start()
+        logger.info(f"Flight recorder writing to {directory}")
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Returns a Recorder if `recorder.enabled` is set, else None.
+        """
+        conf = config.get('recorder') or {}
+        if not conf.get('enabled'):
+            return None
+        return cls(conf.get('path', 'recordings'), conf.get('queue_size', 100))
+
+    def submit(self, snapshot):
+        try:
+            self._queue.put_nowait(snapshot)
+        except queue.Full:
+            logger.warning(f"Recorder queue full, dropping snapshot {snapshot.version}")
+
+    def flush(self):
+        """
+        Blocks until every submitted snapshot has been written.
+        """
+        self._queue.join()
+
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            snapshot = self._queue.get()
+            try:
+                if snapshot is None:
+                    if self._segment:
+                        self._segment.close()
+                        self._segment = None
+                    return
+                self._write(snapshot)
+            except Exception as e:
+                logger.error(f"Recorder failed to write snapshot: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, snapshot):
+        name = segment_name(snapshot.created)
+        if self._segment is None or self._segment.name != name:
+            if self._segment:
+                self._segment.close()
+            self._segment = _Segment(self.directory, name)
+        self._segment.append(snapshot)
+
+    def _segments(self, start, end):
+        # Segment names sort chronologically, so the window is a plain string range
+        first, last = segment_name(start), segment_name(end)
+        names = sorted(os.path.basename(p)[:-4] for p in glob.glob(os.path.join(self.directory, "*.rec")))
+        return [n for n in names if first <= n <= last]
+
+    def query(self, start, end, hex_id=None, limit=None):
+        """
+        Returns records with snapshot_time in [start, end], optionally for one
+        hex_id (matched case-insensitively), oldest first and at most `limit` of them.
+        """
+        check_window(start, end)
+        records = []
+        for name in self._segments(start, end):
+            remaining = None if limit is None else limit - len(records)
+            if remaining is not None and remaining <= 0:
+                break
+            records.extend(self._query_segment(os.path.join(self.directory, name), start, end, hex_id, remaining))
+        return records
+
+    def _query_segment(self, base, start, end, hex_id, limit=None):
+        idx = _map(base + ".idx")
+        if idx is None:
+            return []
+        rec = _map(base + ".rec")
+        try:
+            n_entries = len(idx) // INDEX_ENTRY.size
+            first = _first_entry_at_or_after(idx, n_entries, start)
+            last = _first_entry_after(idx, n_entries, end)
+            if first >= last or rec is None:
+                return []
+
+            lo = INDEX_ENTRY.unpack_from(idx, first * INDEX_ENTRY.size)[1]
+            _, last_first, last_count = INDEX_ENTRY.unpack_from(idx, (last - 1) * INDEX_ENTRY.size)
+            hi = last_first + last_count
+
+            if hex_id is not None:
+                hex_id = track_key(hex_id)
+                hex_ranges = _load_hex_index(base)
+                if hex_ranges is not None:
+                    rng = hex_ranges.get(hex_id)
+                    if rng is None:
+                        return []
+                    lo, hi = max(lo, rng[0]), min(hi, rng[1] + 1)
+
+            results = []
+            wanted = _text(hex_id, 12) if hex_id is not None else None
+            hex_offset = struct.calcsize('<Qdd')
+            for n in range(lo, hi):
+                offset = n * RECORD.size
+                # Compare the raw hex bytes before decoding the whole record
+                if wanted is not None and rec[offset + hex_offset:offset + hex_offset + 12].rstrip(b'\0').strip().lower() != wanted:
+                    continue
+                results.append(unpack_record(rec, offset))
+                if limit is not None and len(results) >= limit:
+                    break
+            return results
+        finally:
+            idx.close()
+            if rec is not None:
+                rec.close()
@@ -0,0 +1,307 @@
+import csv
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from .config import load_config
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"UFAR"
+LAYOUT_VERSION = 1
+
+# magic, layout version, aircraft count
+HEADER = struct.Struct("<4sHxxI")
+KEY = struct.Struct("<I")     # 24-bit ICAO address
+OFFSET = struct.Struct("<I")  # Start of an entry in the string table
+
+# A 24-bit ICAO address as sources report it
+ICAO_HEX = re.compile(r"[0-9a-fA-F]{6}")
+
+# Stored per aircraft, as UTF-8 joined by SEPARATOR
+ENTRY_FIELDS = ("registration", "type", "operator")
+SEPARATOR = "\x1f"
+
+# Accepted (lower-case) CSV header names for each column: the OpenSky
+# aircraft database, ADSBExchange / tar1090 exports and similar
+COLUMNS = {
+    "hex_id": ("icao24", "icao", "hex", "hex_id", "modes"),
+    "registration": ("registration", "reg", "r"),
+    "type": ("typecode", "icaotype", "icao_type", "type", "t"),
+    "operator": ("operator", "ownop", "owner", "operatorname"),
+}
+
+def _column(header, names):
+    lowered = [h.strip().strip("'").lower() for h in header]
+    for name in names:
+        if name in lowered:
+            return lowered.index(name)
+    return None
+
+def _cell(row, index):
+    if index is None or index >= len(row):
+        return ""
+    return row[index].strip().strip("'").replace(SEPARATOR, " ")
+
+def compile_index(csv_path, index_path):
+    """
+    Compiles an aircraft database CSV into the index file Registry maps.
+    Returns the number of aircraft written.
+
+    Rows without a valid 24-bit ICAO address or any metadata are skipped; a
+    repeated address keeps its last row.
+    """
+    entries = {}
+    with open(csv_path, newline='', encoding='utf-8', errors='replace') as f:
+        # The OpenSky dumps quote every field with single quotes
+        quotechar = "'" if f.read(1) == "'" else '"'
+        f.seek(0)
+        reader = csv.reader(f, quotechar=quotechar)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f"{csv_path} is empty")
+        columns = {name: _column(header, aliases) for name, aliases in COLUMNS.items()}
+        if columns["hex_id"] is None:
+            raise ValueError(f"{csv_path} has no ICAO address column")
+
+        for row in reader:
+            try:
+                address = int(_cell(row, columns["hex_id"]), 16)
+            except ValueError:
+                continue
+            if not 0 <= address <= 0xFFFFFF:
+                continue
+            values = [_cell(row, columns[name]) for name in ENTRY_FIELDS]
+            if any(values):
+                entries[address] = SEPARATOR.join(values).encode('utf-8')
+
+    addresses = sorted(entries)
+    offsets = []
+    strings = bytearray()
+    for address in addresses:
+        offsets.append(len(strings))
+        strings += entries[address]
+    offsets.append(len(strings))
+
+    directory = os.path.dirname(os.path.abspath(index_path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, LAYOUT_VERSION, len(addresses)))
+            f.write(struct.pack(f"<{len(addresses)}I", *addresses))
+            f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+            f.write(strings)
+        os.replace(tmp, index_path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return len(addresses)
+
+class Registry:
+    """
+    Read-only aircraft metadata (registration, ICAO type, operator) keyed by
+    ICAO address, served from an index built by `compile_index`.
+
+    The index is a sorted table of addresses followed by entry offsets and a
+    string table. It is memory-mapped rather than loaded, so opening even a
+    500k-aircraft database parses nothing and the kernel pages in only what
+    lookups touch. A lookup binary-searches the address table (about 19
+    probes at 500k aircraft); the `cache_size` most recently used results,
+    misses included, are answered from an LRU instead.
+
+    A replaced instance is `retire`d rather than closed: its mapping is
+    closed once the last reader holding it (see `registry_in_use`) is done.
+    """
+
+    def __init__(self, index_path, cache_size=4096):
+        with open(index_path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            self._map.close()
+            raise ValueError(f"Truncated aircraft index {index_path}")
+        magic, layout, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or layout != LAYOUT_VERSION:
+            self._map.close()
+            raise ValueError(f"Unrecognized aircraft index {index_path}")
+        self.count = count
+        self._offsets_at = HEADER.size + count * KEY.size
+        self._strings_at = self._offsets_at + (count + 1) * OFFSET.size
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # address -> entry tuple or None
+        self._lock = threading.Lock()
+        self._readers = 0
+        self._retired = False
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def closed(self):
+        return self._map.closed
+
+    def close(self):
+        with self._lock:
+            self._cache.clear()
+            self._map.close()
+
+    def acquire(self):
+        with self._lock:
+            self._readers += 1
+
+    def release(self):
+        with self._lock:
+            self._readers -= 1
+            if self._retired and not self._readers:
+                self._cache.clear()
+                self._map.close()
+
+    def retire(self):
+        """
+        Closes the mapping now, or when the last reader releases it.
+        """
+        with self._lock:
+            self._retired = True
+            if not self._readers:
+                self._cache.clear()
+                self._map.close()
+
+    def _find(self, address):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if KEY.unpack_from(self._map, HEADER.size + mid * KEY.size)[0] < address:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and KEY.unpack_from(self._map, HEADER.size + lo * KEY.size)[0] == address:
+            return lo
+        return None
+
+    def _entry(self, index):
+        start, end = struct.unpack_from("<II", self._map, self._offsets_at + index * OFFSET.size)
+        values = self._map[self._strings_at + start:self._strings_at + end].decode('utf-8').split(SEPARATOR)
+        return tuple(value or None for value in values)
+
+    def lookup(self, hex_id):
+        """
+        Returns (registration, type, operator) for an ICAO hex address, any
+        of which may be None, or None if the aircraft is not in the database.
+        Anything but exactly six hex digits (e.g. dump1090's "~"-prefixed
+        non-ICAO TIS-B addresses) is never looked up.
+        """
+        if not isinstance(hex_id, str) or not ICAO_HEX.fullmatch(hex_id):
+            return None
+        address = int(hex_id, 16)
+        with self._lock:
+            try:
+                entry = self._cache[address]
+                self._cache.move_to_end(address)
+                return entry
+            except KeyError:
+                pass
+            index = self._find(address)
+            entry = self._entry(index) if index is not None else None
+            self._cache[address] = entry
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return entry
+
+def index_path(conf):
+    return conf.get('index_path') or conf['path'] + ".idx"
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+def open_registry(conf):
+    """
+    Opens the configured registry's prebuilt index, or returns None when it
+    is disabled, missing or unusable.
+
+    Indexes are built by `python -m tracker.registry`, never here: compiling
+    a large CSV would stall snapshot publishing for seconds and hold every
+    row in memory.
+    """
+    if not conf.get('enabled') or not conf.get('path'):
+        return None
+    csv_path, path = conf['path'], index_path(conf)
+    index_mtime = _mtime(path)
+    if index_mtime is None:
+        logger.error(f"Aircraft registry index {path} not found; build it with "
+                     f"`python -m tracker.registry {csv_path} {path}`")
+        return None
+    csv_mtime = _mtime(csv_path)
+    if csv_mtime is not None and csv_mtime > index_mtime:
+        logger.warning(f"{csv_path} is newer than its index {path}; rebuild it with "
+                       f"`python -m tracker.registry {csv_path} {path}`")
+    try:
+        registry = Registry(path, conf.get('cache_size', 4096))
+    except (OSError, ValueError) as e:
+        logger.error(f"Aircraft registry unavailable: {e}")
+        return None
+    logger.info(f"Aircraft registry {path}: {len(registry)} aircraft")
+    return registry
+
+_registry = None
+_registry_state = None  # (enabled, path, index path, index mtime) _registry was opened with
+_registry_lock = threading.Lock()
+
+def _configured():
+    """
+    The Registry for the current config, reopening it when the `registry`
+    file settings change or the index file is replaced (e.g. rebuilt by
+    `python -m tracker.registry`); the replaced instance is retired. Call
+    with _registry_lock held.
+    """
+    global _registry, _registry_state
+    conf = dict(load_config().get('registry') or {})
+    enabled = bool(conf.get('enabled') and conf.get('path'))
+    state = (enabled, conf.get('path'), conf.get('index_path'), _mtime(index_path(conf)) if enabled else None)
+    if state != _registry_state:
+        if _registry is not None:
+            _registry.retire()
+        _registry = open_registry(conf)
+        _registry_state = state
+    if _registry is not None:
+        _registry.cache_size = conf.get('cache_size', 4096)
+    return _registry
+
+def get_registry():
+    """
+    Returns the configured Registry, or None. Use `registry_in_use` when
+    the instance must stay open while the configuration may change.
+    """
+    with _registry_lock:
+        return _configured()
+
+@contextmanager
+def registry_in_use():
+    """
+    Yields the configured Registry (or None), kept open until the block
+    exits even if it is replaced meanwhile.
+    """
+    with _registry_lock:
+        registry = _configured()
+        if registry is not None:
+            registry.acquire()
+    try:
+        yield registry
+    finally:
+        if registry is not None:
+            registry.release()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if len(sys.argv) not in (2, 3):
+        sys.exit("usage: python -m tracker.registry <aircraft.csv> [index path]")
+    source = sys.argv[1]
+    target = sys.argv[2] if len(sys.argv) == 3 else source + ".idx"
+    print(f"{compile_index(source, target)} aircraft written to {target}")
@@ -0,0 +1,168 @@
+import bisect
+import json
+import logging
+import os
+import re
+import tarfile
+import threading
+import time
+import zipfile
+from .api import normalize_fa_response, normalize_fr24_response
+from .local import normalize_aircraft_json
+
+logger = logging.getLogger(__name__)
+
+# Capture layout: <root>/<channel>/<unix timestamp>.json, as a directory or a
+# .zip / .tar(.gz) archive of the same tree.
+CHANNELS = ("dump1090", "dump978", "flightaware", "flightradar24")
+
+_TIMESTAMP_RE = re.compile(r'(\d{9,}(?:\.\d+)?)')
+
+def _capture_time(name):
+    match = _TIMESTAMP_RE.search(os.path.basename(name))
+    return float(match.group(1)) if match else None
+
+def _channel_of(name):
+    parts = name.replace('\\', '/').split('/')
+    return parts[-2] if len(parts) >= 2 and parts[-2] in CHANNELS else None
+
+class _DirectoryCaptures:
+    def __init__(self, root):
+        self.root = root
+
+    def names(self):
+        for channel in CHANNELS:
+            folder = os.path.join(self.root, channel)
+            if os.path.isdir(folder):
+                for entry in os.listdir(folder):
+                    yield f"{channel}/{entry}"
+
+    def read(self, name):
+        with open(os.path.join(self.root, name), 'rb') as f:
+            return f.read()
+
+class _ZipCaptures:
+    def __init__(self, path):
+        self.archive = zipfile.ZipFile(path)
+        self.lock = threading.Lock()
+
+    def names(self):
+        return self.archive.namelist()
+
+    def read(self, name):
+        with self.lock:
+            return self.archive.read(name)
+
+class _TarCaptures:
+    def __init__(self, path):
+        self.archive = tarfile.open(path)
+        self.lock = threading.Lock()
+
+    def names(self):
+        return [m.name for m in self.archive.getmembers() if m.isfile()]
+
+    def read(self, name):
+        with self.lock:
+            return self.archive.extractfile(name).read()
+
+def open_captures(path):
+    if os.path.isdir(path):
+        return _DirectoryCaptures(path)
+    if zipfile.is_zipfile(path):
+        return _ZipCaptures(path)
+    if tarfile.is_tarfile(path):
+        return _TarCaptures(path)
+    raise ValueError(f"Replay path {path} is not a directory, zip or tar archive")
+
+class ReplaySource:
+    """
+    Serves captured aircraft.json and FA/FR24 responses as if they were live.
+
+    Capture time advances `speed` times faster than wall-clock time from the
+    moment the source is created. Each fetch returns the latest capture at or
+    before the current capture time, normalized by the same functions the
+    live fetchers use. With `loop` the recording restarts once it runs out.
+    """
+
+    def __init__(self, path, speed=1.0, loop=True, clock=time.time):
+        if speed <= 0:
+            raise ValueError("Replay speed must be positive")
+        self.captures = open_captures(path)
+        self.speed = speed
+        self.loop = loop
+        self.clock = clock
+
+        self.frames = {channel: [] for channel in CHANNELS}  # channel -> [(ts, name)] sorted
+        for name in self.captures.names():
+            channel, ts = _channel_of(name), _capture_time(name)
+            if channel and ts is not None and name.endswith('.json'):
+                self.frames[channel].append((ts, name))
+        for frames in self.frames.values():
+            frames.sort()
+
+        all_times = [ts for frames in self.frames.values() for ts, _ in frames]
+        if not all_times:
+            raise ValueError(f"No captures found in {path}")
+        self.start_ts, self.end_ts = min(all_times), max(all_times)
+        self.wall_start = clock()
+
+        self._cache = {}  # channel -> (name, normalized flights)
+        self._lock = threading.Lock()
+        logger.info(f"Replaying {len(all_times)} captures from {path} at {speed}x")
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Returns a ReplaySource if `replay.enabled` is set, else None.
+        """
+        conf = config.get('replay') or {}
+        if not conf.get('enabled'):
+            return None
+        return cls(conf['path'], conf.get('speed', 1.0), conf.get('loop', True))
+
+    def capture_time(self):
+        elapsed = (self.clock() - self.wall_start) * self.speed
+        duration = self.end_ts - self.start_ts
+        if elapsed > duration:
+            elapsed = elapsed % (duration or 1) if self.loop else duration
+        return self.start_ts + elapsed
+
+    def _frame_name(self, channel):
+        frames = self.frames[channel]
+        i = bisect.bisect_right(frames, self.capture_time(), key=lambda frame: frame[0])
+        return frames[i - 1][1] if i else None
+
+    def _normalized(self, channel, normalize):
+        name = self._frame_name(channel)
+        if name is None:
+            return []
+        with self._lock:
+            cached = self._cache.get(channel)
+            if cached and cached[0] == name:
+                return cached[1]
+        flights = normalize(json.loads(self.captures.read(name)))
+        with self._lock:
+            self._cache[channel] = (name, flights)
+        return flights
+
+    def fetch_local_data(self):
+        flights = self._normalized("dump1090", lambda d: normalize_aircraft_json(d, "Local (1090)"))
+        flights = flights + self._normalized("dump978", lambda d: normalize_aircraft_json(d, "Local (978)"))
+        return flights, []
+
+    def fetch_flightaware(self):
+        return self._normalized("flightaware", normalize_fa_response), []
+
+    def fetch_flightradar24(self):
+        return self._normalized("flightradar24", normalize_fr24_response), []
+
+    def fetchers(self):
+        """
+        Fetchers for IngestionEngine. Captures were taken for a fixed area,
+        so the requested area is ignored.
+        """
+        return {
+            "local": lambda area: self.fetch_local_data(),
+            "flightaware": lambda area: self.fetch_flightaware(),
+            "flightradar24": lambda area: self.fetch_flightradar24(),
+        }
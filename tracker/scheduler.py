@@ -0,0 +1,144 @@
+import threading
+from collections import deque
+
+MINUTE = 60
+DAY = 24 * 60 * 60
+
+class CallBudget:
+    """
+    Rolling per-minute and per-day call limits for one paid provider.
+
+    A limit of None means unlimited. Calls are counted when they are made,
+    whether or not the provider later answers.
+    """
+
+    def __init__(self, per_minute=None, per_day=None):
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self._calls = deque()         # call times within the last day, oldest first
+        self._recent_calls = deque()  # call times within the last minute, oldest first
+        self._lock = threading.Lock()
+
+    def _usage(self, now):
+        while self._calls and now - self._calls[0] >= DAY:
+            self._calls.popleft()
+        while self._recent_calls and now - self._recent_calls[0] >= MINUTE:
+            self._recent_calls.popleft()
+        return len(self._recent_calls), len(self._calls)
+
+    def usage(self, now):
+        """
+        Returns (calls in the last minute, calls in the last 24 hours).
+        """
+        with self._lock:
+            return self._usage(now)
+
+    def try_acquire(self, now):
+        """
+        Records a call and returns True if both limits allow it.
+        """
+        with self._lock:
+            last_minute, last_day = self._usage(now)
+            if self.per_minute is not None and last_minute >= self.per_minute:
+                return False
+            if self.per_day is not None and last_day >= self.per_day:
+                return False
+            self._calls.append(now)
+            self._recent_calls.append(now)
+            return True
+
+    def min_spacing(self):
+        """
+        Seconds between calls that spread the budget evenly over its windows.
+        """
+        spacing = 0.0
+        if self.per_minute:
+            spacing = max(spacing, MINUTE / self.per_minute)
+        if self.per_day:
+            spacing = max(spacing, DAY / self.per_day)
+        return spacing
+
+def local_coverage(snapshot):
+    """
+    Fraction of aircraft within the snapshot's radius that local receivers
+    see, or None without a snapshot. An empty sky counts as fully covered.
+    """
+    if snapshot is None:
+        return None
+    radius = snapshot.area[2]
+    in_range = [f for f in snapshot.flights if f.get('distance_from_obs', float('inf')) <= radius]
+    if not in_range:
+        return 1.0
+    return sum(1 for f in in_range if "Local" in f['source']) / len(in_range)
+
+class PollScheduler:
+    """
+    Decides how often each paid provider is polled for each area.
+
+    The configured interval is stretched towards `max_interval_s` as local
+    coverage rises from `coverage_low` to `coverage_high`, then stretched
+    again so that every active area together stays within the provider's
+    call budget. A call the budget cannot afford is skipped and retried on a
+    later cycle.
+    """
+
+    def __init__(self):
+        self._budgets = {}   # provider -> CallBudget
+        self._coverage = {}  # (provider, area) -> last coverage used
+        self._interval = {}  # (provider, area) -> last interval used
+
+    def budget(self, provider, quota_conf):
+        limits = quota_conf.get(provider) or {}
+        budget = self._budgets.get(provider)
+        if budget is None:
+            budget = self._budgets[provider] = CallBudget()
+        # Limits are re-read every cycle so config edits apply without losing usage
+        budget.per_minute = limits.get('per_minute')
+        budget.per_day = limits.get('per_day')
+        return budget
+
+    def interval(self, provider, area, base_interval, coverage, n_areas, quota_conf):
+        low = quota_conf.get('coverage_low', 0.5)
+        high = quota_conf.get('coverage_high', 0.9)
+        max_interval = max(base_interval, quota_conf.get('max_interval_s', 60))
+
+        if coverage is None or coverage <= low:
+            interval = base_interval
+        elif coverage >= high:
+            interval = max_interval
+        else:
+            interval = base_interval + (coverage - low) / (high - low) * (max_interval - base_interval)
+
+        interval = max(interval, self.budget(provider, quota_conf).min_spacing() * n_areas)
+        self._coverage[(provider, area)] = coverage
+        self._interval[(provider, area)] = interval
+        return interval
+
+    def forget(self, area):
+        for key in [k for k in self._interval if k[1] == area]:
+            self._coverage.pop(key, None)
+            self._interval.pop(key, None)
+
+    def usage_message(self, provider, label, area, now):
+        """
+        Describes budget usage and the current poll interval, or None when
+        the provider has no budget configured.
+        """
+        budget = self._budgets.get(provider)
+        if budget is None or (budget.per_minute is None and budget.per_day is None):
+            return None
+        last_minute, last_day = budget.usage(now)
+        parts = []
+        if budget.per_minute is not None:
+            parts.append(f"{last_minute}/{budget.per_minute} calls this minute")
+        if budget.per_day is not None:
+            parts.append(f"{last_day}/{budget.per_day} in 24h")
+        message = f"{label} budget: {', '.join(parts)}"
+
+        interval = self._interval.get((provider, area))
+        if interval is not None:
+            message += f"; polling every {interval:.0f}s"
+            coverage = self._coverage.get((provider, area))
+            if coverage is not None:
+                message += f" (local coverage {coverage:.0%})"
+        return message
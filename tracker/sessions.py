@@ -0,0 +1,90 @@
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .config import load_config, subscribe
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HTTP = {
+    "pool_connections": 10,  # Number of per-host pools kept alive
+    "pool_maxsize": 10,      # Keep-alive connections per host
+    "retries": 1,
+    "backoff_factor": 0.3
+}
+
+# Shared sessions (free and paid), rebuilt only when the `http` config section changes
+_sessions = {}          # paid -> Session
+_session_settings = None
+_session_lock = threading.Lock()
+
+def _http_settings(config):
+    http_conf = config.get('http') or {}
+    return tuple(http_conf.get(key, default) for key, default in DEFAULT_HTTP.items())
+
+def build_session(pool_connections, pool_maxsize, retries, backoff_factor, paid=False):
+    """
+    Creates a keep-alive session with pooled connections and retry on transient failures.
+
+    A `paid` session only retries connection failures, where the request
+    never reached the provider. Retrying a 5xx or a read timeout would send
+    another billed call that the provider's CallBudget never counted.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0 if paid else retries,
+        status=0 if paid else retries,
+        other=0,
+        backoff_factor=backoff_factor,
+        status_forcelist=() if paid else (502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False # Hand the last response back so callers still see the real status
+    )
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate"})
+    return session
+
+def get_session(paid=False):
+    """
+    Returns the process-wide HTTP session; `paid` selects the one for
+    per-call billed providers (FlightAware, FR24).
+    """
+    global _session_settings
+    settings = _http_settings(load_config())
+
+    with _session_lock:
+        if settings != _session_settings:
+            if _sessions:
+                # In-flight requests keep using the old sessions until they finish
+                logger.info("HTTP settings changed, rebuilding connection pools")
+            _sessions.clear()
+            _session_settings = settings
+        session = _sessions.get(paid)
+        if session is None:
+            session = _sessions[paid] = build_session(*settings, paid=paid)
+        return session
+
+def request_timeout(limit):
+    """
+    Per-attempt timeout, at most `limit`, that keeps a request and all of its
+    retries and backoff sleeps inside `ingest.fetch_budget_s`, so a retried
+    fetch finishes within the cycle that started it.
+    """
+    config = load_config()
+    budget = (config.get('ingest') or {}).get('fetch_budget_s', 4)
+    _, _, retries, backoff_factor = _http_settings(config)
+    backoff = sum(backoff_factor * 2 ** i for i in range(retries))
+    return max(min(limit, (budget - backoff) / (retries + 1)), 0.5)
+
+def _config_changed(old, new):
+    # Rebuild the pools as soon as the new settings are applied rather than on the next fetch
+    if _http_settings(old) != _http_settings(new):
+        get_session()
+
+subscribe(_config_changed)
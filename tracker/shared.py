@@ -0,0 +1,247 @@
+import logging
+import os
+import secrets
+import struct
+import tempfile
+import time
+from .config import load_config
+from .encoding import encode_snapshot, full_body, supported_encodings
+from .ingest import get_engine
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"UFTS"
+LAYOUT_VERSION = 2
+
+# magic, layout version, publisher epoch, snapshot version, created, body length
+HEADER = struct.Struct("<4sHxxQQdQ")
+
+# Suffix of each encoded form's file; None is the uncompressed JSON
+SUFFIXES = {None: "json", "gzip": "json.gz", "br": "json.br"}
+
+def default_directory():
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "flight-tracker")
+
+def shared_directory(config):
+    return config.get('server', {}).get('shared_dir') or default_directory()
+
+def area_name(area):
+    lat, lon, radius_nm = area
+    return f"{lat:.4f}_{lon:.4f}_{radius_nm:.2f}"
+
+def parse_area_name(name):
+    lat, lon, radius_nm = name.split("_")
+    return (float(lat), float(lon), float(radius_nm))
+
+def _write_atomic(path, data):
+    directory = os.path.dirname(path)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def remove_snapshot(directory, area):
+    name = area_name(area)
+    for suffix in SUFFIXES.values():
+        try:
+            os.unlink(os.path.join(directory, f"{name}.{suffix}"))
+        except FileNotFoundError:
+            pass
+
+class SnapshotPublisher:
+    """
+    The ingestion side of multi-process serving. Writes each published
+    snapshot's full body, in every supported content coding, to
+    `<area>.<suffix>` files under a shared directory (tmpfs /dev/shm by
+    default). Register `publish` as an ingestion engine listener.
+
+    Each file starts with a fixed header carrying the snapshot version, so
+    workers answer ETag checks from the header alone, then hand the body to
+    the server as a file, which servers such as gunicorn send with
+    sendfile(2) straight from the page cache. Files are replaced
+    atomically, so an open file always holds one complete snapshot.
+
+    Versions restart with the ingestion process, so every file also carries
+    a random `epoch` chosen per publisher; workers put it in ETags so a
+    restarted publisher's version 37 never matches the previous one's.
+    """
+
+    def __init__(self, directory, encoding_conf=None):
+        self.directory = directory
+        self.encoding_conf = encoding_conf
+        self.epoch = secrets.randbits(32)
+        os.makedirs(os.path.join(directory, "areas"), exist_ok=True)
+        # Versions restart with the process; files from a previous run would
+        # otherwise be mistaken for newer ones
+        for name in os.listdir(os.path.join(directory, "areas")):
+            try:
+                remove_snapshot(directory, parse_area_name(name))
+            except ValueError:
+                pass
+
+    def publish(self, snapshot):
+        name = area_name(snapshot.area)
+        for coding in (None,) + supported_encodings():
+            body, used = encode_snapshot(snapshot, ("full",), lambda: full_body(snapshot), coding,
+                                         self.encoding_conf)
+            if used != coding:
+                continue # Too small to compress; workers fall back to the plain file
+            header = HEADER.pack(MAGIC, LAYOUT_VERSION, self.epoch, snapshot.version, snapshot.created, len(body))
+            _write_atomic(os.path.join(self.directory, f"{name}.{SUFFIXES[coding]}"), header + body)
+
+class SharedSnapshot:
+    """
+    An open snapshot file. `file` is positioned at the start of the body.
+    """
+    __slots__ = ("epoch", "version", "created", "length", "coding", "file")
+
+    def __init__(self, epoch, version, created, length, coding, file):
+        self.epoch = epoch
+        self.version = version
+        self.created = created
+        self.length = length
+        self.coding = coding
+        self.file = file
+
+    @property
+    def tag(self):
+        """
+        Identifies the snapshot across publisher restarts, e.g. "1a2b3c4d.37".
+        """
+        return f"{self.epoch:08x}.{self.version}"
+
+    def close(self):
+        self.file.close()
+
+class SnapshotReader:
+    """
+    The worker side: requests areas and opens their published snapshots.
+
+    Workers ask for an area by touching a marker file in `areas/`; the
+    ingestion process polls every area whose marker was touched within
+    `area_idle_timeout_s`.
+    """
+
+    def __init__(self, directory, touch_interval_s=1.0):
+        self.directory = directory
+        self.touch_interval_s = touch_interval_s
+        self._touched = {}  # area name -> last time this process touched its marker
+        os.makedirs(os.path.join(directory, "areas"), exist_ok=True)
+
+    def request_area(self, area, now=None):
+        """
+        Tells the ingestion process the area is being read. The marker's
+        mtime is its last read time; it is touched at most once per
+        `touch_interval_s` per process.
+        """
+        now = time.time() if now is None else now
+        name = area_name(area)
+        if now - self._touched.get(name, 0) < self.touch_interval_s:
+            return
+        path = os.path.join(self.directory, "areas", name)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            open(path, 'ab').close()
+        self._touched[name] = now
+
+    def _open(self, name, coding):
+        try:
+            f = open(os.path.join(self.directory, f"{name}.{SUFFIXES[coding]}"), 'rb')
+        except FileNotFoundError:
+            return None
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            f.close()
+            return None
+        magic, layout, epoch, version, created, length = HEADER.unpack(header)
+        if magic != MAGIC or layout != LAYOUT_VERSION:
+            f.close()
+            raise ValueError(f"Unrecognized snapshot file for area {name}")
+        return SharedSnapshot(epoch, version, created, length, coding, f)
+
+    def open(self, area, coding=None):
+        """
+        Opens the area's latest snapshot, compressed with `coding` if that
+        form is as new as the plain one, or returns None before the first.
+        The caller closes it.
+        """
+        name = area_name(area)
+        plain = self._open(name, None)
+        if plain is None or coding is None:
+            return plain
+        encoded = self._open(name, coding)
+        if encoded is None:
+            return plain
+        if encoded.tag != plain.tag:
+            encoded.close() # Stale form left from a larger snapshot
+            return plain
+        plain.close()
+        return encoded
+
+    def wait(self, area, after_tag=None, timeout=15, coding=None, poll_s=0.05):
+        """
+        Like IngestionEngine.wait_for_snapshot, by polling the file header.
+        Any snapshot whose `tag` differs from `after_tag` counts as newer,
+        since versions restart when the ingestion process does.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            self.request_area(area)
+            snapshot = self.open(area, coding)
+            if snapshot is not None and snapshot.tag != after_tag:
+                return snapshot
+            if time.monotonic() >= deadline:
+                return snapshot
+            if snapshot is not None:
+                snapshot.close()
+            time.sleep(poll_s)
+
+def requested_areas(directory, idle_timeout, now=None):
+    """
+    Returns {area: last read time} for markers touched within `idle_timeout`,
+    deleting older markers and their snapshot files.
+    """
+    now = time.time() if now is None else now
+    areas_dir = os.path.join(directory, "areas")
+    areas = {}
+    for name in os.listdir(areas_dir):
+        path = os.path.join(areas_dir, name)
+        try:
+            area = parse_area_name(name)
+            last_read = os.stat(path).st_mtime
+        except (ValueError, FileNotFoundError):
+            continue
+        if now - last_read > idle_timeout:
+            os.unlink(path)
+            remove_snapshot(directory, area)
+            continue
+        areas[area] = last_read
+    return areas
+
+def run_ingestor(engine=None, directory=None, poll_s=0.25, stop=None):
+    """
+    Runs the ingestion engine for worker processes: relays their area
+    requests to it and publishes its snapshots to `directory`.
+    """
+    config = load_config()
+    directory = directory or shared_directory(config)
+    engine = engine or get_engine()
+    publisher = SnapshotPublisher(directory, config.get('encoding'))
+    engine.add_listener(publisher.publish)
+    logger.info(f"Publishing snapshots to {directory}")
+
+    while stop is None or not stop.is_set():
+        idle_timeout = load_config().get('ingest', {}).get('area_idle_timeout_s', 120)
+        for area, last_read in requested_areas(directory, idle_timeout).items():
+            engine.touch_area(area, last_read)
+        time.sleep(poll_s)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    run_ingestor()
@@ -0,0 +1,71 @@
+import threading
+import time
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one, with a short TTL result cache.
+
+    While a call for `key` is in flight, other callers with the same key wait
+    for it and share its result instead of issuing their own. Results that
+    pass `cacheable` are then served from memory for `ttl` seconds. Expired
+    results are swept whenever a new one is stored, so keys that are never
+    asked for again (e.g. an area nobody watches any more) don't stay cached.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> _Call in flight
+        self._cache = {}  # key -> (expires_at, result)
+
+    def do(self, key, fn, ttl=0, cacheable=None):
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached:
+                if cached[0] > self._clock():
+                    return cached[1]
+                del self._cache[key]
+
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None and ttl > 0 and (cacheable is None or cacheable(call.result)):
+                    now = self._clock()
+                    self._sweep(now)
+                    self._cache[key] = (now + ttl, call.result)
+            call.done.set()
+        return call.result
+
+    def _sweep(self, now):
+        expired = [key for key, (expires_at, _) in self._cache.items() if expires_at <= now]
+        for key in expired:
+            del self._cache[key]
+
+    def __len__(self):
+        return len(self._cache)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
@@ -0,0 +1,155 @@
+import math
+import threading
+from array import array
+from collections import OrderedDict
+
+FIELDS = ("timestamp", "lat", "lon", "altitude", "speed", "heading")
+
+# Bytes used per stored point: one double per field
+POINT_BYTES = len(FIELDS) * array('d').itemsize
+
+def _num(value):
+    """
+    Converts a field to float, storing missing or non-numeric values
+    (e.g. dump1090's "ground" altitude) as NaN.
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+def _out(value):
+    return None if math.isnan(value) else value
+
+class Track:
+    """
+    Ring buffer of recent positions for one aircraft, stored column-wise in
+    `array('d')` buffers. Buffers grow until `capacity`, then wrap.
+    """
+    __slots__ = ("columns", "capacity", "head", "last_seen")
+
+    def __init__(self, capacity):
+        self.columns = tuple(array('d') for _ in FIELDS)
+        self.capacity = capacity
+        self.head = 0          # Index of the oldest point once the buffer is full
+        self.last_seen = 0.0   # Wall-clock time of the last update
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    @property
+    def last_timestamp(self):
+        if not len(self):
+            return None
+        return self.columns[0][(self.head - 1) % len(self)]
+
+    def append(self, values):
+        if len(self) < self.capacity:
+            for column, value in zip(self.columns, values):
+                column.append(value)
+            return True
+        for column, value in zip(self.columns, values):
+            column[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        return False
+
+    def points(self, since=None):
+        """
+        Returns points oldest first as lists in FIELDS order.
+        """
+        n = len(self)
+        rows = []
+        for i in range(n):
+            idx = (self.head + i) % n
+            ts = self.columns[0][idx]
+            if since is not None and ts <= since:
+                continue
+            rows.append([_out(column[idx]) for column in self.columns])
+        return rows
+
+def track_key(hex_id):
+    """
+    Tracks are keyed like Deconflictor keys flights: sources report hex ids
+    (and FlightAware idents standing in for them) in mixed case.
+    """
+    return str(hex_id).strip().lower()
+
+class TrackStore:
+    """
+    Bounded per-aircraft track history keyed by lower-case hex_id.
+
+    Tracks are kept in least-recently-updated order. Aircraft not updated
+    for `ttl_s` are dropped, and the least recently updated tracks are
+    evicted whenever total storage exceeds `max_memory_mb`.
+    """
+
+    def __init__(self, points_per_track=360, max_memory_mb=64, ttl_s=600):
+        self.points_per_track = points_per_track
+        self.max_points = int(max_memory_mb * 1024 * 1024 // POINT_BYTES)
+        self.ttl_s = ttl_s
+        self._tracks = OrderedDict()
+        self._total_points = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        conf = config.get('tracks') or {}
+        return cls(conf.get('points_per_track', 360), conf.get('max_memory_mb', 64), conf.get('ttl_s', 600))
+
+    def __len__(self):
+        return len(self._tracks)
+
+    @property
+    def total_points(self):
+        return self._total_points
+
+    def record(self, flights, now):
+        """
+        Appends the position of every flight whose timestamp moved on since
+        its last recorded point, then applies TTL and memory eviction.
+        """
+        with self._lock:
+            for f in flights:
+                if f.get('lat') is None or f.get('lon') is None:
+                    continue
+                hex_id = track_key(f['hex_id'])
+                track = self._tracks.get(hex_id)
+                if track is None:
+                    track = self._tracks[hex_id] = Track(self.points_per_track)
+                else:
+                    self._tracks.move_to_end(hex_id)
+                track.last_seen = now
+
+                ts = _num(f.get('timestamp'))
+                last_ts = track.last_timestamp
+                if last_ts is not None and ts <= last_ts:
+                    continue # Same report seen again (another area or an unchanged source)
+                if track.append([ts] + [_num(f.get(field)) for field in FIELDS[1:]]):
+                    self._total_points += 1
+            self._evict(now)
+
+    def _evict(self, now):
+        while self._tracks:
+            hex_id, track = next(iter(self._tracks.items()))
+            if now - track.last_seen <= self.ttl_s and self._total_points <= self.max_points:
+                break
+            del self._tracks[hex_id]
+            self._total_points -= len(track)
+
+    def get(self, hex_id, since=None):
+        with self._lock:
+            track = self._tracks.get(track_key(hex_id))
+            return track.points(since) if track is not None else None
+
+    def since(self, since):
+        """
+        Returns {hex_id: points newer than `since`} for every track with new points.
+        """
+        with self._lock:
+            result = {}
+            for hex_id, track in self._tracks.items():
+                last_ts = track.last_timestamp
+                if last_ts is None or last_ts <= since:
+                    continue
+                result[hex_id] = track.points(since)
+            return result
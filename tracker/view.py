@@ -0,0 +1,95 @@
+import math
+
+DEFAULT_VIEW = {
+    "filter_radius": True,
+    "cluster_below_zoom": 8,
+    "cluster_cell_px": 40,
+    "max_limit": 5000
+}
+
+# Web Mercator tiles are 256px wide; at zoom z the world is 256 * 2**z px
+TILE_PX = 256
+MAX_ZOOM = 24
+
+def parse_bounds(text):
+    """
+    Parses "south,west,north,east" (Google Maps LatLngBounds.toUrlValue()).
+    West may exceed east for a viewport crossing the antimeridian.
+    """
+    south, west, north, east = (float(v) for v in text.split(","))
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        raise ValueError(f"Invalid bounds {text!r}")
+    return (south, west, north, east)
+
+def has_position(f):
+    return f.get('lat') is not None and f.get('lon') is not None
+
+def in_bounds(lat, lon, bounds):
+    south, west, north, east = bounds
+    if not south <= lat <= north:
+        return False
+    if west <= east:
+        return west <= lon <= east
+    return lon >= west or lon <= east
+
+def cell_size_deg(zoom, cell_px):
+    """
+    Longitude span of a `cell_px`-wide screen cell at a zoom level
+    (0..MAX_ZOOM).
+    """
+    return cell_px * 360.0 / (TILE_PX * 2 ** zoom)
+
+def decimate(flights, zoom, cell_px, ref_lat):
+    """
+    Keeps one flight per screen cell of about `cell_px` pixels: the one
+    closest to the observer. Returns (kept flights, clusters), where each
+    cluster describes a cell that held more than one flight as
+    {"lat", "lon", "count", "hex_id"} with its centroid and the hex_id of
+    the flight shown for it.
+    """
+    lon_step = cell_size_deg(zoom, cell_px)
+    # Mercator cells are shorter in latitude away from the equator
+    lat_step = lon_step * max(math.cos(math.radians(ref_lat)), 0.01)
+
+    cells = {}  # (row, col) -> [flights]
+    for f in flights:
+        cells.setdefault((math.floor(f['lat'] / lat_step), math.floor(f['lon'] / lon_step)), []).append(f)
+
+    kept, clusters = [], []
+    for members in cells.values():
+        best = min(members, key=lambda f: f.get('distance_from_obs', math.inf))
+        kept.append(best)
+        if len(members) > 1:
+            clusters.append({
+                "lat": round(sum(f['lat'] for f in members) / len(members), 5),
+                "lon": round(sum(f['lon'] for f in members) / len(members), 5),
+                "count": len(members),
+                "hex_id": best['hex_id'],
+            })
+    kept.sort(key=lambda f: f['hex_id'])
+    clusters.sort(key=lambda c: c["hex_id"])
+    return kept, clusters
+
+def filter_radius(flights, radius_nm):
+    """
+    Drops flights outside the range ring. The remote APIs are queried with
+    the ring's bounding box, so without this its corners are shipped too.
+    """
+    return [f for f in flights if f.get('distance_from_obs', math.inf) <= radius_nm]
+
+def select_flights(flights, ref_lat, bounds=None, zoom=None, limit=None, conf=None):
+    """
+    Applies a client's view to a snapshot's flights: viewport culling, then
+    decimation below `cluster_below_zoom`, then the `limit` closest
+    aircraft. Returns (flights, clusters).
+    """
+    conf = conf or DEFAULT_VIEW
+    if bounds is not None:
+        flights = [f for f in flights if has_position(f) and in_bounds(f['lat'], f['lon'], bounds)]
+    clusters = []
+    if zoom is not None and zoom < conf.get('cluster_below_zoom', 8):
+        positioned = [f for f in flights if has_position(f)]
+        flights, clusters = decimate(positioned, zoom, conf.get('cluster_cell_px', 40), ref_lat)
+    if limit is not None:
+        flights = sorted(flights, key=lambda f: f.get('distance_from_obs', math.inf))[:limit]
+    return list(flights), clusters
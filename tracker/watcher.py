@@ -0,0 +1,141 @@
+import ctypes
+import ctypes.util
+import itertools
+import logging
+import os
+import struct
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+class FileWatcher:
+    """
+    Tracks changes to individual files using Linux inotify.
+
+    The parent directory of each file is watched, so files that are replaced
+    by rename (as dump1090 does with aircraft.json) are still noticed. Every
+    change gives the file a new generation marker; callers compare markers
+    to learn whether a file may have changed without touching the disk.
+    """
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._fd = libc.inotify_init1(IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self._lock = threading.Lock()
+        self._dirs = {}         # watch descriptor -> directory
+        self._watched = {}      # directory -> {basename: path}
+        self._generations = {}  # path -> change marker, unique across re-watches
+        self._markers = itertools.count(1)
+        self._callbacks = {}    # path -> [callback]
+        threading.Thread(target=self._run, name="file-watcher", daemon=True).start()
+
+    def watch(self, path, callback=None):
+        """
+        Starts watching `path`. Returns False if its directory cannot be watched.
+        """
+        path = os.path.abspath(path)
+        directory, name = os.path.split(path)
+        with self._lock:
+            if callback:
+                self._callbacks.setdefault(path, []).append(callback)
+            if name in self._watched.get(directory, {}):
+                return True
+            wd = self._add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                logger.debug(f"Cannot watch {directory}: {os.strerror(ctypes.get_errno())}")
+                return False
+            self._dirs[wd] = directory
+            self._watched.setdefault(directory, {})[name] = path
+            if path not in self._generations:
+                self._generations[path] = next(self._markers)
+            return True
+
+    def is_watching(self, path):
+        path = os.path.abspath(path)
+        with self._lock:
+            return path in self._generations
+
+    def generation(self, path):
+        with self._lock:
+            return self._generations.get(os.path.abspath(path))
+
+    def _run(self):
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except OSError as e:
+                logger.error(f"File watcher stopped: {e}")
+                return
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _, name_len = EVENT_HEADER.unpack_from(buf, offset)
+                name = buf[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + name_len].rstrip(b'\0')
+                offset += EVENT_HEADER.size + name_len
+                self._handle(wd, mask, os.fsdecode(name))
+
+    def _handle(self, wd, mask, name):
+        with self._lock:
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost: treat every file as changed
+                paths = list(self._generations)
+            elif mask & IN_IGNORED:
+                # The directory went away; forget it so the next watch() re-adds it
+                directory = self._dirs.pop(wd, None)
+                paths = list(self._watched.pop(directory, {}).values())
+            else:
+                path = self._watched.get(self._dirs.get(wd), {}).get(name)
+                paths = [path] if path else []
+
+            for path in paths:
+                if mask & IN_IGNORED:
+                    self._generations.pop(path, None)
+                else:
+                    self._generations[path] = next(self._markers)
+            callbacks = [(path, cb) for path in paths for cb in self._callbacks.get(path, ())]
+
+        for path, callback in callbacks:
+            try:
+                callback(path)
+            except Exception as e:
+                logger.error(f"File watcher callback for {path} failed: {e}")
+
+_watcher = None
+_watcher_lock = threading.Lock()
+_watcher_failed = False
+
+def get_watcher():
+    """
+    Returns the shared FileWatcher, or None where inotify is unavailable
+    (callers then fall back to polling file metadata).
+    """
+    global _watcher, _watcher_failed
+    with _watcher_lock:
+        if _watcher is None and not _watcher_failed:
+            if not sys.platform.startswith('linux'):
+                _watcher_failed = True
+                return None
+            try:
+                _watcher = FileWatcher()
+            except (OSError, AttributeError) as e:
+                logger.info(f"inotify unavailable, polling files instead: {e}")
+                _watcher_failed = True
+        return _watcher